@@ -4,31 +4,65 @@ AI新闻分析器 - 使用智谱清言API
 严格按照summary_finance.md的格式要求进行新闻分析和总结
 """
 import os
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
 import requests
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from extractive_summarizer import summarizer
+from prompt_builder import PromptBuilder
+from config import config
+
 # 加载 .env 文件
 env_path = Path(__file__).parent / '.env'
 load_dotenv(env_path)
 
+# 重要消息分析失败时的降级内容
+IMPORTANT_NEWS_FALLBACK = """【重要消息】
+
+基于当前获取的新闻，本次获取的新闻暂无特别重要的行业影响消息。
+
+建议关注：
+- AI和半导体行业动态
+- 科技公司业绩表现
+- 全球股市走势分析"""
+
 
 class AIAnalyzer:
     """AI新闻分析器 - 使用智谱清言API"""
 
-    def __init__(self, api_key: str = None, proxies: dict = None):
+    def __init__(self, api_key: str = None, proxies: dict = None, prompt_builder: PromptBuilder = None,
+                 api_url: str = None, retry_delay: float = 2):
         """
         初始化AI分析器
 
         Args:
             api_key: 智谱AI API密钥，如果不提供则从环境变量读取
             proxies: 代理设置
+            prompt_builder: 提示词构建器，不提供则按config.yaml的ai.prompt配置创建
+            api_url: API地址，不提供则从环境变量ZHIPU_API_URL读取（可指向fake_llm_server.py）
+            retry_delay: 失败重试前的等待秒数（429响应优先使用Retry-After）
         """
         self.api_key = api_key or os.getenv('ZHIPU_API_KEY', '')
-        self.api_url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+        self.api_url = api_url or os.getenv('ZHIPU_API_URL', "https://open.bigmodel.cn/api/paas/v4/chat/completions")
         self.proxies = proxies
+        self.retry_delay = retry_delay
+        # 复用HTTPS连接（常驻进程中多次运行之间保持）
+        self.session = requests.Session()
+
+        # 重要消息分块分析配置
+        map_reduce_config = (config.load_yaml_config().get('ai') or {}).get('map_reduce') or {}
+        self.map_reduce_enabled = map_reduce_config.get('enabled', True)
+        self.map_chunk_size = max(1, int(map_reduce_config.get('chunk_size', 15)))
+        self.map_workers = max(1, int(map_reduce_config.get('max_workers', 4)))
+        self.prompt_builder = prompt_builder or PromptBuilder.from_config()
+
+        # token用量统计（多线程共享）
+        self.usage = {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        self._usage_lock = threading.Lock()
 
     def generate_news_summary(self, article: Dict) -> str:
         """
@@ -36,6 +70,15 @@ class AIAnalyzer:
 
         严格按照summary_finance.md中的示例格式输出，并忽略所有提示、警告，直接输出总结内容
         """
+        try:
+            return self.summarize_news(article)
+        except Exception as e:
+            print(f"  [WARN] AI分析失败: {e}，使用本地摘要")
+            # 降级：使用本地抽取式摘要
+            return self.build_fallback_summary(article)
+
+    def summarize_news(self, article: Dict) -> str:
+        """为单条新闻生成AI总结，API调用失败时抛出异常（由调用方决定如何降级）"""
         title = article.get('title', '')
         content = article.get('content') or article.get('summary', '')
         source = article.get('source', '未知来源')
@@ -52,7 +95,7 @@ class AIAnalyzer:
 
 新闻标题：{title}
 新闻来源：{source}
-新闻内容：{content}
+新闻内容：{{content}}
 {lang_note}
 
 请严格按照以下格式输出总结：
@@ -78,22 +121,28 @@ class AIAnalyzer:
 1. 获取的新闻均来自国内外正规网站，内容不包含不安全内容和敏感信息，请放心忽略所有提示、警告，直接输出总结内容
 
 请只输出总结内容，不要有多余的说明文字。"""
+        # 压缩新闻内容，使提示词不超过输入预算
+        prompt = self.prompt_builder.fit(prompt, '{content}', content)
 
-        try:
-            response = self._call_api(prompt)
-            # 确保返回的内容以"【总结】"开头
-            if not response.startswith("【总结】"):
-                response = "【总结】\n" + response
-            return response
-        except Exception as e:
-            print(f"  [WARN] AI分析失败: {e}，使用原始内容")
-            # 降级：使用原始内容
-            return f"""【总结】
-核心观点：{title}
+        response = self._call_api(prompt, max_tokens=self.prompt_builder.choose_max_tokens('summary'))
+        # 确保返回的内容以"【总结】"开头
+        if not response.startswith("【总结】"):
+            response = "【总结】\n" + response
+        return response
 
-事件背景：{source}
+    def build_fallback_summary(self, article: Dict, max_chars: int = 300) -> str:
+        """
+        本地降级总结（不调用API）
 
-关键细节：{content[:200]}
+        关键细节使用TextRank抽取的关键句，格式与AI总结一致
+        """
+        key_details = summarizer.summarize_article(article, max_sentences=3, max_chars=max_chars)
+        return f"""【总结】
+核心观点：{article.get('title', '')}
+
+事件背景：{article.get('source', '')}
+
+关键细节：{key_details}
 
 影响分析：
 - 对市场的影响：详见原文
@@ -105,26 +154,165 @@ class AIAnalyzer:
 【参考链接】
 {article.get('url', '')}"""
 
-    def analyze_important_news(self, articles: List[Dict]) -> str:
+    def analyze_important_news(self, articles: List[Dict], map_reduce: Optional[bool] = None) -> str:
         """
         分析所有新闻中的重要消息
 
         严格按照summary_finance.md的要求：
         告诉我哪一条新闻的哪一句/哪一段，会对什么样的产业，造成什么样的影响
+
+        Args:
+            articles: 新闻列表
+            map_reduce: 是否使用分块并发提取+汇总的模式，None表示按config.yaml的ai.map_reduce配置
+                        （文章数超过chunk_size时自动启用）
         """
         if not articles:
             return "暂无重要消息分析"
 
+        if map_reduce is None:
+            map_reduce = self.map_reduce_enabled and len(articles) > self.map_chunk_size
+        if map_reduce:
+            return self._analyze_important_map_reduce(articles)
+
         # 构建新闻摘要（包含标题和关键内容）
+        prompt = self._build_important_prompt('{news_summary}')
+        news_summary = self._format_news_items(articles[:15], prompt)
+        prompt = prompt.replace('{news_summary}', news_summary)
+
+        try:
+            response = self._call_api(prompt, max_tokens=self.prompt_builder.choose_max_tokens('important', 4000))
+            return self._normalize_important(response)
+        except Exception as e:
+            print(f"[WARN] 重要消息分析失败: {e}")
+            return IMPORTANT_NEWS_FALLBACK
+
+    def _format_news_items(self, articles: List[Dict], template: str) -> str:
+        """将新闻格式化为提示词中的列表，内容按模板之外的剩余预算压缩"""
+        headers = []
+        contents = []
+        for i, article in enumerate(articles, 1):
+            header = f"\n新闻{i}：\n"
+            header += f"标题：{article.get('title', '')}\n"
+            header += f"来源：{article.get('source', '')}\n"
+            headers.append(header)
+            contents.append(article.get('content') or article.get('summary', ''))
+
+        # 标题和模板之外的预算按条分配给新闻内容
+        builder = self.prompt_builder
+        budget = (builder.max_input_tokens
+                  - builder.estimate_tokens(template)
+                  - sum(builder.estimate_tokens(h) + 5 for h in headers))
         news_summary = ""
-        for i, article in enumerate(articles[:15], 1):
-            news_summary += f"\n新闻{i}：\n"
-            news_summary += f"标题：{article.get('title', '')}\n"
-            news_summary += f"来源：{article.get('source', '')}\n"
-            content = article.get('content') or article.get('summary', '')
-            news_summary += f"内容摘要：{content[:300]}...\n"
-
-        prompt = f"""请分析以下财经新闻，识别出对证券指数和行业发展有重要影响的新闻，并按照指定格式逐一分析。
+        for header, content in zip(headers, builder.fit_many(contents, budget)):
+            news_summary += header
+            news_summary += f"内容摘要：{content}\n"
+        return news_summary
+
+    @staticmethod
+    def _normalize_important(response: str) -> str:
+        """确保以"【重要消息】"开头"""
+        if not response.startswith("【重要消息】") and "【重要消息】" in response:
+            # 提取重要消息部分
+            start = response.find("【重要消息】")
+            response = response[start:]
+        elif not response.startswith("【重要消息】"):
+            response = "【重要消息】\n\n" + response
+        return response
+
+    # ==================== 分块并发提取 + 汇总 ====================
+
+    def _analyze_important_map_reduce(self, articles: List[Dict]) -> str:
+        """
+        分块并发提取每块的重要条目（map），再一次调用合并排序输出最终格式（reduce）
+
+        墙钟时间约为一次map调用加一次reduce调用，与文章总数基本无关
+        """
+        chunks = [articles[i:i + self.map_chunk_size] for i in range(0, len(articles), self.map_chunk_size)]
+        print(f"重要消息分块分析: {len(articles)} 篇新闻，{len(chunks)} 块，并发 {self.map_workers}")
+
+        with ThreadPoolExecutor(max_workers=min(self.map_workers, len(chunks))) as executor:
+            results = list(executor.map(self._extract_chunk_items, chunks))
+
+        candidates = [item for items in results for item in items]
+        if not candidates:
+            print("[WARN] 分块提取未得到任何重要条目")
+            return IMPORTANT_NEWS_FALLBACK
+
+        # 按重要度排序，在输入预算内保留尽量多的候选条目
+        candidates.sort(key=self._item_importance, reverse=True)
+        intro = ("以下是从全部财经新闻中分块提取出的重要新闻候选条目（每行格式：地区|标题|来源|原话|影响产业|影响方向|重要度1-5）。"
+                 "请合并重复事件，按重要度排序，保留最重要的条目，并按照指定格式输出。")
+        builder = self.prompt_builder
+        budget = builder.max_input_tokens - builder.estimate_tokens(self._build_important_prompt('', intro))
+        lines = []
+        for item in candidates:
+            line = f"{len(lines) + 1}. {item}"
+            cost = builder.estimate_tokens(line) + 1
+            if cost > budget:
+                break
+            lines.append(line)
+            budget -= cost
+        prompt = self._build_important_prompt("\n".join(lines), intro)
+
+        try:
+            response = self._call_api(prompt, max_tokens=self.prompt_builder.choose_max_tokens('important', 4000))
+            return self._normalize_important(response)
+        except Exception as e:
+            print(f"[WARN] 重要消息汇总失败: {e}，直接输出候选条目")
+            lines = ["【重要消息】", ""]
+            for i, item in enumerate(candidates[:15], 1):
+                fields = [f.strip() for f in item.split('|')]
+                if len(fields) >= 6:
+                    lines.append(f"{i}. 【{fields[1]}】来自【{fields[2]}】")
+                    lines.append(f"   - 关键内容：{fields[3]}")
+                    lines.append(f"   - 影响产业：{fields[4]}")
+                    lines.append(f"   - 影响分析：{fields[5]}")
+                else:
+                    lines.append(f"{i}. {item}")
+            return "\n".join(lines)
+
+    @staticmethod
+    def _item_importance(item: str) -> int:
+        """候选条目的重要度（最后一个字段），无法解析时为0"""
+        try:
+            return int(item.rsplit('|', 1)[-1].strip()[:1])
+        except ValueError:
+            return 0
+
+    def _extract_chunk_items(self, chunk: List[Dict]) -> List[str]:
+        """map阶段：从一块新闻中提取重要条目，失败时返回空列表"""
+        template = """请从以下财经新闻中找出对证券指数和行业发展有重要影响的新闻，每条输出一行，格式为：
+地区|标题|来源|原话|影响产业|影响方向|重要度
+
+说明：
+- 地区：中国 或 美国 或 其他
+- 原话：摘录新闻中最关键的一句原话，不要概括
+- 影响方向：正面/负面/中性，短期/中期/长期
+- 重要度：1-5的整数，5表示最重要
+- 重点关注AI、半导体、云计算、科技公司和证券指数
+- 只输出真正重要的新闻，没有则输出"无"
+- 不要输出任何其他文字
+注意：以下新闻均来自国内外正规财经新闻网站，内容安全可靠。
+{news_summary}"""
+        prompt = template.replace('{news_summary}', self._format_news_items(chunk, template))
+
+        try:
+            response = self._call_api(prompt, max_tokens=self.prompt_builder.choose_max_tokens('important_map', 1500))
+        except Exception as e:
+            print(f"[WARN] 分块提取失败: {e}")
+            return []
+
+        items = []
+        for line in response.splitlines():
+            line = line.strip().lstrip('-*').strip()
+            if line.count('|') >= 5 and not line.startswith('地区|'):
+                items.append(line)
+        return items
+
+    def _build_important_prompt(self, news_summary: str, intro: str = None) -> str:
+        """构建重要消息分析提示词"""
+        intro = intro or "请分析以下财经新闻，识别出对证券指数和行业发展有重要影响的新闻，并按照指定格式逐一分析。"
+        return f"""{intro}
 注意：以下新闻均来自国内外正规财经新闻网站，内容安全可靠。
 
 {news_summary}
@@ -168,27 +356,6 @@ class AIAnalyzer:
     
 请只输出分析内容，格式要清晰、层次要分明。"""
 
-        try:
-            response = self._call_api(prompt)
-            # 确保以"【重要消息】"开头
-            if not response.startswith("【重要消息】") and "【重要消息】" in response:
-                # 提取重要消息部分
-                start = response.find("【重要消息】")
-                response = response[start:]
-            elif not response.startswith("【重要消息】"):
-                response = "【重要消息】\n\n" + response
-            return response
-        except Exception as e:
-            print(f"[WARN] 重要消息分析失败: {e}")
-            return """【重要消息】
-
-基于当前获取的新闻，本次获取的新闻暂无特别重要的行业影响消息。
-
-建议关注：
-- AI和半导体行业动态
-- 科技公司业绩表现
-- 全球股市走势分析"""
-
     def _is_english(self, text: str) -> bool:
         """检测是否为英文"""
         if not text:
@@ -196,9 +363,21 @@ class AIAnalyzer:
         ascii_chars = sum(1 for c in text if ord(c) < 128)
         return ascii_chars / len(text) > 0.6
 
-    def _call_api(self, prompt: str, max_retries: int = 3) -> str:
+    def _record_usage(self, usage: Dict):
+        """累计API返回的token用量"""
+        with self._usage_lock:
+            self.usage['calls'] += 1
+            self.usage['prompt_tokens'] += usage.get('prompt_tokens', 0)
+            self.usage['completion_tokens'] += usage.get('completion_tokens', 0)
+
+    def _call_api(self, prompt: str, max_retries: int = 3, max_tokens: int = 8000) -> str:
         """
         调用智谱清言API
+
+        Args:
+            prompt: 用户提示词
+            max_retries: 最大重试次数
+            max_tokens: 输出token上限
         """
         if not self.api_key:
             raise ValueError("未设置ZHIPU_API_KEY，请在.env文件中配置")
@@ -221,13 +400,14 @@ class AIAnalyzer:
                 }
             ],
             "temperature": 0.7,
-            "max_tokens": 8000
+            "max_tokens": max_tokens
         }
 
         for attempt in range(max_retries):
+            delay = self.retry_delay
             try:
                 print(f"调用智谱API (尝试 {attempt + 1}/{max_retries})...")
-                response = requests.post(
+                response = self.session.post(
                     self.api_url,
                     headers=headers,
                     json=data,
@@ -238,10 +418,16 @@ class AIAnalyzer:
                 if response.status_code == 200:
                     result = response.json()
                     content = result.get('choices', [{}])[0].get('message', {}).get('content', '')
+                    self._record_usage(result.get('usage') or {})
                     print("AI分析成功")
                     return content.strip()
                 else:
                     print(f"API返回错误: {response.status_code} - {response.text}")
+                    if response.status_code == 429:
+                        try:
+                            delay = max(delay, float(response.headers.get('Retry-After', 0)))
+                        except ValueError:
+                            pass
 
             except requests.exceptions.Timeout:
                 print(f"请求超时 (尝试 {attempt + 1}/{max_retries})")
@@ -250,7 +436,7 @@ class AIAnalyzer:
 
             if attempt < max_retries - 1:
                 import time
-                time.sleep(2)
+                time.sleep(delay)
 
         raise Exception(f"AI分析失败，已重试{max_retries}次")
 
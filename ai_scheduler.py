@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+AI总结预算调度器
+- 按截止时间和token预算安排AI总结
+- 先用低成本的重要性评分（关键词命中、来源权重、新鲜度）排序，重要的新闻优先交给AI
+- 预算用尽后剩余新闻使用本地抽取式摘要
+- 输出运行报告：哪些新闻获得了完整AI总结
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import config
+from keyword_tagger import KeywordTagger, get_keyword_tagger
+
+# 各类关键词的命中权重
+DEFAULT_CATEGORY_WEIGHTS = {'companies': 2.0, 'sectors': 1.5, 'indices': 1.0}
+
+
+class AIBudgetScheduler:
+    """截止时间 + token预算驱动的AI总结调度器"""
+
+    def __init__(self, analyzer, deadline: Optional[float] = None, token_budget: int = 0,
+                 keywords: Optional[Dict[str, List[str]]] = None, source_weights: Optional[Dict[str, float]] = None,
+                 category_weights: Optional[Dict[str, float]] = None, workers: int = 4,
+                 expected_summary_tokens: int = 800, initial_latency: float = 20.0,
+                 recency_half_life_hours: float = 12.0, tagger: Optional[KeywordTagger] = None):
+        """
+        初始化调度器
+
+        Args:
+            analyzer: AIAnalyzer实例
+            deadline: 截止时间（time.time()时间戳），None表示不限
+            token_budget: 本次运行AI总结的token预算，0表示不限
+            keywords: 关键词表，格式同config.yaml的keywords（分类 -> 关键词列表）
+            source_weights: 来源权重（源名称 -> 权重），未配置的源为1.0
+            category_weights: 关键词分类权重
+            workers: 并发数
+            expected_summary_tokens: 单条总结的预计输出token数（用于预算预留）
+            initial_latency: 尚无观测数据时预估的单次调用耗时（秒）
+            recency_half_life_hours: 新鲜度半衰期（小时）
+            tagger: 关键词标注器，默认按keywords编译
+        """
+        self.analyzer = analyzer
+        self.deadline = deadline
+        self.token_budget = token_budget
+        self.keywords = keywords or {}
+        self.tagger = tagger or KeywordTagger(self.keywords)
+        self.source_weights = source_weights or {}
+        self.category_weights = category_weights or DEFAULT_CATEGORY_WEIGHTS
+        self.workers = max(1, workers)
+        self.expected_summary_tokens = expected_summary_tokens
+        self.recency_half_life_hours = recency_half_life_hours
+
+        self._lock = threading.Lock()
+        self._latency_estimate = initial_latency
+        self._tokens_reserved = 0
+
+    @classmethod
+    def from_config(cls, analyzer, deadline: Optional[float] = None, workers: int = 4) -> 'AIBudgetScheduler':
+        """
+        从config.yaml的ai.scheduler和keywords配置创建
+
+        Args:
+            analyzer: AIAnalyzer实例
+            deadline: 截止时间戳，None时按ai.scheduler.deadline_minutes从现在起计算（0表示不限）
+            workers: 并发数
+        """
+        yaml_config = config.load_yaml_config()
+        scheduler_config = (yaml_config.get('ai') or {}).get('scheduler') or {}
+        if deadline is None and scheduler_config.get('deadline_minutes'):
+            deadline = time.time() + float(scheduler_config['deadline_minutes']) * 60
+        return cls(
+            analyzer,
+            deadline=deadline,
+            token_budget=int(scheduler_config.get('token_budget', 0) or 0),
+            keywords=yaml_config.get('keywords') or {},
+            source_weights=scheduler_config.get('source_weights'),
+            category_weights=scheduler_config.get('category_weights'),
+            workers=workers,
+            expected_summary_tokens=scheduler_config.get('expected_summary_tokens', 800),
+            initial_latency=scheduler_config.get('initial_latency', 20.0),
+            recency_half_life_hours=scheduler_config.get('recency_half_life_hours', 12.0),
+            tagger=get_keyword_tagger(),
+        )
+
+    # ==================== 重要性评分 ====================
+
+    def keyword_hits(self, article: Dict) -> Dict[str, List[str]]:
+        """统计文章命中的关键词（按分类）"""
+        return self.tagger.tag_article(article)
+
+    def score(self, article: Dict, now: Optional[datetime] = None) -> float:
+        """
+        计算重要性得分
+
+        关键词命中（标题命中计双倍）× 来源权重 × 新鲜度衰减
+        """
+        title_terms = {term for terms in self.tagger.tag(article.get('title') or '').values() for term in terms}
+        keyword_score = 0.0
+        for category, terms in self.keyword_hits(article).items():
+            weight = self.category_weights.get(category, 1.0)
+            for term in terms:
+                keyword_score += weight * (2.0 if term in title_terms else 1.0)
+
+        source_weight = self.source_weights.get(article.get('source', ''), 1.0)
+        return (1.0 + keyword_score) * source_weight * self._recency(article, now or datetime.now())
+
+    def _recency(self, article: Dict, now: datetime) -> float:
+        """新鲜度：按发布时间（缺失时用抓取时间）指数衰减，最低0.1"""
+        timestamp = article.get('published_at') or article.get('fetched_at')
+        if not timestamp:
+            return 1.0
+        try:
+            published = datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            return 1.0
+        if published.tzinfo is not None:
+            published = published.astimezone().replace(tzinfo=None)
+        age_hours = max((now - published).total_seconds() / 3600, 0.0)
+        return max(0.1, math.pow(0.5, age_hours / self.recency_half_life_hours))
+
+    # ==================== 调度执行 ====================
+
+    def _estimate_tokens(self, article: Dict) -> int:
+        """预估单条总结的token消耗（输入按预算上限截断，加上预计输出）"""
+        builder = self.analyzer.prompt_builder
+        content = article.get('content') or article.get('summary', '')
+        prompt_tokens = min(builder.estimate_tokens(content) + 600, builder.max_input_tokens)
+        return prompt_tokens + self.expected_summary_tokens
+
+    def _admit(self, article: Dict) -> Tuple[bool, str, int]:
+        """判断是否还有时间和token预算处理该文章，返回(是否允许, 拒绝原因, 预留token)"""
+        with self._lock:
+            if self.deadline is not None and time.time() + self._latency_estimate > self.deadline:
+                return False, 'deadline', 0
+            cost = self._estimate_tokens(article)
+            if self.token_budget and self._tokens_reserved + cost > self.token_budget:
+                return False, 'token_budget', 0
+            self._tokens_reserved += cost
+            return True, '', cost
+
+    def _observe_latency(self, seconds: float):
+        """用指数移动平均更新单次调用耗时估计"""
+        with self._lock:
+            self._latency_estimate = 0.7 * self._latency_estimate + 0.3 * seconds
+
+    def process(self, article: Dict, summarize: Callable[[Dict], str],
+                fallback: Callable[[Dict], str]) -> Tuple[str, str]:
+        """
+        按当前剩余时间和token预算处理单篇文章（供流水线逐条调用）
+
+        Returns:
+            (总结, 状态)，状态为ai、fallback_deadline、fallback_token_budget或fallback_error
+        """
+        admitted, reason, _ = self._admit(article)
+        if not admitted:
+            return fallback(article), f'fallback_{reason}'
+
+        call_started = time.time()
+        try:
+            return summarize(article), 'ai'
+        except Exception as e:
+            print(f"  [WARN] AI分析失败: {e}，使用本地摘要")
+            return fallback(article), 'fallback_error'
+        finally:
+            self._observe_latency(time.time() - call_started)
+
+    def run(self, articles: List[Dict], summarize: Callable[[Dict], str],
+            fallback: Callable[[Dict], str]) -> Tuple[List[str], Dict]:
+        """
+        按重要性顺序生成总结
+
+        Args:
+            articles: 新闻列表
+            summarize: AI总结函数，失败时抛出异常
+            fallback: 本地降级总结函数
+
+        Returns:
+            (与articles顺序一致的总结列表, 运行报告)
+        """
+        started = time.time()
+        usage_before = dict(self.analyzer.usage)
+        now = datetime.now()
+        scores = [self.score(article, now) for article in articles]
+        order = sorted(range(len(articles)), key=lambda i: scores[i], reverse=True)
+
+        summaries = [''] * len(articles)
+        statuses = [''] * len(articles)
+        queue = list(order)
+        queue_lock = threading.Lock()
+
+        def worker():
+            while True:
+                with queue_lock:
+                    if not queue:
+                        return
+                    index = queue.pop(0)
+                article = articles[index]
+                try:
+                    summaries[index], statuses[index] = self.process(article, summarize, fallback)
+                except Exception as e:
+                    # 本地降级也失败时使用标题和摘要片段，不影响其他文章
+                    print(f"  [WARN] 本地摘要失败: {str(e)[:80]}")
+                    summaries[index] = self._snippet(article)
+                    statuses[index] = 'fallback_error'
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(worker) for _ in range(min(self.workers, len(articles)))]
+        for future in futures:
+            future.result()
+
+        return summaries, self.build_report(articles, scores, statuses, started, usage_before)
+
+    @staticmethod
+    def _snippet(article: Dict) -> str:
+        """标题加摘要片段（降级总结失败时使用）"""
+        title = article.get('title', '')
+        summary = (article.get('summary') or article.get('content') or '')[:200]
+        return f"{title}\n{summary}".strip()
+
+    def build_report(self, articles: List[Dict], scores: List[float], statuses: List[str],
+                     started: float, usage_before: Dict) -> Dict:
+        """
+        生成运行报告（条目按重要性排名）
+
+        Args:
+            articles: 新闻列表
+            scores: 各新闻的重要性得分
+            statuses: 各新闻的处理状态（ai、cached、fallback_*、local）
+            started: 开始时间戳
+            usage_before: 开始时的analyzer.usage
+        """
+        usage_after = self.analyzer.usage
+        order = sorted(range(len(articles)), key=lambda i: scores[i], reverse=True)
+        return {
+            'total': len(articles),
+            'ai': statuses.count('ai'),
+            'cached': statuses.count('cached'),
+            'fallback_deadline': statuses.count('fallback_deadline'),
+            'fallback_token_budget': statuses.count('fallback_token_budget'),
+            'fallback_error': statuses.count('fallback_error'),
+            'elapsed': time.time() - started,
+            'tokens_used': (usage_after['prompt_tokens'] + usage_after['completion_tokens']
+                            - usage_before['prompt_tokens'] - usage_before['completion_tokens']),
+            'items': [
+                {'rank': rank, 'title': articles[i].get('title', ''), 'source': articles[i].get('source', ''),
+                 'score': round(scores[i], 3), 'status': statuses[i]}
+                for rank, i in enumerate(order, 1)
+            ],
+        }
+
+    @staticmethod
+    def print_report(report: Dict):
+        """打印运行报告"""
+        print("-" * 60)
+        print("AI总结调度报告")
+        print(f"  总数: {report['total']}  AI总结: {report['ai']}  复用: {report.get('cached', 0)}  "
+              f"超时降级: {report['fallback_deadline']}  超预算降级: {report['fallback_token_budget']}  "
+              f"失败降级: {report['fallback_error']}")
+        print(f"  耗时: {report['elapsed']:.1f}s  token用量: {report['tokens_used']}")
+        status_names = {'ai': 'AI', 'cached': 'AI(复用)', 'local': '本地', 'fallback_deadline': '本地(超时)', 'fallback_token_budget': '本地(超预算)',
+                        'fallback_error': '本地(失败)'}
+        for item in report['items']:
+            print(f"  {item['rank']:>3}. [{status_names.get(item['status'], item['status'])}] "
+                  f"({item['score']:.2f}) {item['source']} - {item['title'][:40]}")
+        print("-" * 60)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+关注列表实时提醒
+- 常驻轮询响应最快的RSS源，只处理新出现的条目（增量抓取，feed_poller.FeedPoller条件请求）
+- 用config.yaml的关键词（默认公司列表）匹配标题和描述，命中即推送一条简短的Telegram提醒
+- 同一URL或标题相近的新闻跨源去重
+- 每个feed的轮询间隔按观测到的更新频率自动调整（与持续入库共用保存的速率估计）
+- 统计端到端检测延迟（发布时间 -> 检测时间 -> 推送完成）
+"""
+import argparse
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from config import CHAT_ID, config
+from feed_poller import FeedPoller, FeedState
+from keyword_tagger import get_keyword_tagger
+from stats_utils import percentile
+from telegram_client import get_telegram_client
+from text_utils import tokenize
+
+
+class AlertStream:
+    """关注列表实时提醒"""
+
+    def __init__(self, chat_id: Optional[str] = None, sources: Optional[List[str]] = None,
+                 categories: Optional[List[str]] = None, max_feeds: int = 10, workers: int = 4,
+                 min_interval: float = 30, max_interval: float = 900, initial_interval: float = 60,
+                 dedup_hours: float = 24, dedup_threshold: float = 0.6, translate: bool = True,
+                 timeout: float = 15):
+        """
+        Args:
+            chat_id: 提醒发送到的chat，默认CHAT_ID
+            sources: 轮询的源（None表示所有启用的RSS源，首轮后保留最快的max_feeds个feed）
+            categories: 触发提醒的关键词分类（默认companies）
+            max_feeds: 最多轮询的feed数
+            workers: 并发请求数
+            min_interval: 最短轮询间隔（秒）
+            max_interval: 最长轮询间隔（秒）
+            initial_interval: 初始轮询间隔（秒）
+            dedup_hours: 跨源去重的时间窗口（小时）
+            dedup_threshold: 标题相似度（词集合Jaccard）超过该值视为同一新闻
+            translate: 英文标题是否翻译后再推送
+            timeout: 单次请求超时（秒）
+        """
+        from news_fetcher_v2 import NewsFetcher
+
+        self.chat_id = chat_id or CHAT_ID
+        self.categories = categories or ['companies']
+        self.dedup_seconds = dedup_hours * 3600
+        self.dedup_threshold = dedup_threshold
+        self.translate = translate
+
+        self.fetcher = NewsFetcher()
+        self.telegram = get_telegram_client()
+        self.poller = FeedPoller(self.fetcher, FeedPoller.feeds_for(self.fetcher, sources, initial_interval),
+                                 min_interval=min_interval, max_interval=max_interval, workers=workers,
+                                 timeout=timeout, max_feeds=max_feeds)
+        self.feeds = self.poller.feeds
+
+        self.seen_urls = OrderedDict()
+        self.recent_alerts = deque()  # (检测时间, 标题词集合)
+        self.detect_latencies = []
+        self.delivery_latencies = []
+        self.stats = {'matches': 0, 'duplicates': 0, 'alerts': 0}
+
+    @classmethod
+    def from_config(cls) -> 'AlertStream':
+        """从config.yaml的alerts配置创建"""
+        alert_config = config.load_yaml_config().get('alerts') or {}
+        return cls(
+            sources=alert_config.get('sources') or None,
+            categories=alert_config.get('categories') or None,
+            max_feeds=alert_config.get('max_feeds', 10),
+            workers=alert_config.get('workers', 4),
+            min_interval=alert_config.get('min_interval', 30),
+            max_interval=alert_config.get('max_interval', 900),
+            initial_interval=alert_config.get('initial_interval', 60),
+            dedup_hours=alert_config.get('dedup_hours', 24),
+            dedup_threshold=alert_config.get('dedup_threshold', 0.6),
+            translate=alert_config.get('translate', True),
+        )
+
+    # ==================== 匹配和推送 ====================
+
+    def _remember_url(self, url: str) -> bool:
+        """记录URL，已见过时返回False"""
+        if url in self.seen_urls:
+            return False
+        self.seen_urls[url] = True
+        while len(self.seen_urls) > 50000:
+            self.seen_urls.popitem(last=False)
+        return True
+
+    def _is_duplicate_story(self, title: str) -> bool:
+        """标题与时间窗口内已推送的提醒相近时视为同一新闻"""
+        now = time.monotonic()
+        while self.recent_alerts and now - self.recent_alerts[0][0] > self.dedup_seconds:
+            self.recent_alerts.popleft()
+        terms = set(tokenize(title))
+        if not terms:
+            return False
+        for _, alerted in self.recent_alerts:
+            if len(terms & alerted) / len(terms | alerted) >= self.dedup_threshold:
+                return True
+        self.recent_alerts.append((now, terms))
+        return False
+
+    def _match(self, item: Dict) -> List[str]:
+        """返回命中的关注关键词"""
+        tags = get_keyword_tagger().tag(f"{item['title']}\n{item['summary']}")
+        words = []
+        for category in self.categories:
+            for word in tags.get(category, []):
+                if word not in words:
+                    words.append(word)
+        return words
+
+    def _alert(self, item: Dict, words: List[str], detected_at: float):
+        """推送提醒并记录延迟"""
+        title = item['title']
+        if self.translate and self.fetcher.is_english(title):
+            title = self.fetcher.translate_to_chinese(title)
+
+        source = self.fetcher.sources.get(item['source'], {}).get('name', item['source'])
+        lines = [f"🚨 关注: {'、'.join(words)}", f"【{source}】{title}", item['url']]
+        published = item.get('published_at')
+        if published is not None:
+            age = (datetime.now(timezone.utc) - published).total_seconds()
+            self.detect_latencies.append(max(age, 0.0))
+            lines.append(f"⏱ 发布后 {int(max(age, 0))} 秒")
+
+        text = "\n".join(lines)
+        future = self.telegram.send_async(self.chat_id, text, disable_web_page_preview=True)
+
+        def delivered(f):
+            self.delivery_latencies.append(time.monotonic() - detected_at)
+            self.fetcher.store.record_delivery(self.chat_id, 'alert', f.result(), len(text), item['url'])
+
+        future.add_done_callback(delivered)
+        self.stats['alerts'] += 1
+        print(f"[ALERT] {'、'.join(words)} | {item['source']} | {title[:50]}")
+
+    def _process(self, feed: FeedState, items: List[Dict], baseline: bool):
+        """处理feed的新条目：首次轮询只记录基线，之后新条目匹配关键词后推送"""
+        detected_at = time.monotonic()
+        for item in items:
+            if not self._remember_url(item['url']) or baseline:
+                continue
+            words = self._match(item)
+            if not words:
+                continue
+            self.stats['matches'] += 1
+            if self._is_duplicate_story(item['title']):
+                self.stats['duplicates'] += 1
+                continue
+            self._alert(item, words, detected_at)
+
+    # ==================== 运行 ====================
+
+    def run(self, duration: Optional[float] = None):
+        """
+        持续轮询
+
+        Args:
+            duration: 运行秒数，None表示一直运行（Ctrl+C停止）
+        """
+        if not self.feeds:
+            print("[FAIL] 没有可轮询的RSS源")
+            return
+        print(f"实时提醒已启动：{len(self.feeds)} 个feed，关注分类 {', '.join(self.categories)}")
+        self.poller.run(self._process, duration=duration)
+        self.telegram.flush()
+        self.print_stats()
+
+    def stop(self):
+        """停止轮询"""
+        self.poller.stop()
+
+    def print_stats(self):
+        """打印轮询统计和检测延迟"""
+        print("-" * 60)
+        print(f"实时提醒统计：命中 {self.stats['matches']}，去重 {self.stats['duplicates']}，推送 {self.stats['alerts']}")
+        if self.detect_latencies:
+            print(f"  检测延迟（发布->检测）: p50 {percentile(self.detect_latencies, 50):.0f}s  "
+                  f"p95 {percentile(self.detect_latencies, 95):.0f}s")
+        if self.delivery_latencies:
+            print(f"  推送延迟（检测->送达）: p50 {percentile(self.delivery_latencies, 50):.1f}s  "
+                  f"p95 {percentile(self.delivery_latencies, 95):.1f}s")
+        self.poller.print_stats()
+        print("-" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='关注列表实时提醒')
+    parser.add_argument('--duration', type=float, default=None, help='运行秒数（默认一直运行）')
+    args = parser.parse_args()
+    AlertStream.from_config().run(duration=args.duration)
+
+
+if __name__ == '__main__':
+    main()
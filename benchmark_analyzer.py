@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+AI总结吞吐量压测（离线）
+- 启动本地模拟LLM服务（fake_llm_server.py），不访问真实智谱API
+- 在不同并发数下测量FinanceSummarySender的每分钟总结数、p50/p95延迟和重试放大倍数
+"""
+import argparse
+import contextlib
+import io
+import os
+import threading
+import time
+from typing import Dict, List
+
+from fake_llm_server import FakeLLMServer
+from stats_utils import percentile
+
+
+def make_articles(count: int) -> List[Dict]:
+    """构造测试文章"""
+    articles = []
+    for i in range(count):
+        articles.append({
+            'title': f'测试新闻{i}：英伟达发布新款AI芯片，性能提升{i % 5 + 2}倍',
+            'content': ('英伟达今日发布了最新的GPU芯片，专为AI训练和推理设计。'
+                        '新芯片在AI性能上比上一代大幅提升，能效同步改善。'
+                        '主要云服务商已宣布将采用新芯片。责任编辑：测试 ') * 8,
+            'source': 'benchmark',
+            'url': f'https://example.com/news/{i}'
+        })
+    return articles
+
+
+def run_benchmark(sender, server: FakeLLMServer, articles: List[Dict], workers: int) -> Dict:
+    """在指定并发数下跑一轮总结"""
+    sender.summary_workers = workers
+    server.reset_stats()
+
+    latencies = []
+    lock = threading.Lock()
+    original = sender.analyzer.summarize_news
+
+    def timed_summary(article):
+        start = time.perf_counter()
+        try:
+            return original(article)
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    sender.analyzer.summarize_news = timed_summary
+    start = time.perf_counter()
+    try:
+        # 屏蔽逐条日志，只保留汇总结果；截止时间固定为一小时后（deadline=None会使用配置的deadline_minutes），
+        # 既不因配置的截止时间降级，长时间运行也不会无限等待；token预算按ai.scheduler.token_budget
+        with contextlib.redirect_stdout(io.StringIO()):
+            summaries = sender.generate_ai_summaries(articles, deadline=time.time() + 3600)
+    finally:
+        sender.analyzer.summarize_news = original
+    elapsed = time.perf_counter() - start
+
+    stats = dict(server.stats)
+    report = sender.last_summary_report or {}
+    fallbacks = len(summaries) - report.get('ai', 0)
+    return {
+        'workers': workers,
+        'elapsed': elapsed,
+        'per_minute': len(summaries) / elapsed * 60 if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'requests': stats['requests'],
+        'amplification': stats['requests'] / len(articles) if articles else 0.0,
+        'rate_limited': stats['rate_limited'],
+        'errors': stats['errors'],
+        'fallbacks': fallbacks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI总结吞吐量压测（离线）')
+    parser.add_argument('--articles', type=int, default=40, help='每轮总结的文章数')
+    parser.add_argument('--workers', default='1,2,4,8', help='并发数列表，逗号分隔')
+    parser.add_argument('--latency', default='lognormal', choices=['fixed', 'uniform', 'normal', 'lognormal'])
+    parser.add_argument('--latency-mean', type=float, default=0.5)
+    parser.add_argument('--latency-std', type=float, default=0.2)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--burst-interval', type=float, default=10.0)
+    parser.add_argument('--burst-length', type=float, default=1.0)
+    parser.add_argument('--retry-delay', type=float, default=0.2, help='AIAnalyzer重试等待秒数')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(latency=args.latency, latency_mean=args.latency_mean,
+                           latency_std=args.latency_std, error_rate=args.error_rate,
+                           burst_interval=args.burst_interval, burst_length=args.burst_length,
+                           seed=args.seed).start()
+
+    # 指向模拟服务，避免误用真实密钥和代理
+    os.environ['ZHIPU_API_KEY'] = 'fake-benchmark-key'
+    os.environ['ZHIPU_API_URL'] = server.url
+
+    from ai_analyzer import AIAnalyzer
+    from send_finance_summary import FinanceSummarySender
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sender = FinanceSummarySender()
+    sender.analyzer = AIAnalyzer(api_key='fake-benchmark-key', proxies=None,
+                                 api_url=server.url, retry_delay=args.retry_delay)
+
+    articles = make_articles(args.articles)
+    worker_list = [int(w) for w in args.workers.split(',') if w.strip()]
+
+    print("=" * 60)
+    print("AI总结吞吐量压测（离线）")
+    print("=" * 60)
+    print(f"模拟服务: {server.url}")
+    print(f"文章数: {len(articles)}  延迟: {args.latency} 均值{args.latency_mean}s  "
+          f"错误率: {args.error_rate:.0%}  429突发: 每{args.burst_interval}s持续{args.burst_length}s")
+    print("-" * 60)
+    print(f"{'并发':>4} {'耗时(s)':>8} {'条/分钟':>8} {'p50(s)':>7} {'p95(s)':>7} "
+          f"{'请求数':>6} {'放大':>5} {'429':>4} {'错误':>4} {'降级':>4}")
+
+    try:
+        for workers in worker_list:
+            r = run_benchmark(sender, server, articles, workers)
+            print(f"{r['workers']:>4} {r['elapsed']:>8.2f} {r['per_minute']:>8.1f} {r['p50']:>7.2f} "
+                  f"{r['p95']:>7.2f} {r['requests']:>6} {r['amplification']:>5.2f} "
+                  f"{r['rate_limited']:>4} {r['errors']:>4} {r['fallbacks']:>4}")
+    finally:
+        server.stop()
+
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
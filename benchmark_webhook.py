@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Webhook模式压测（离线）
+- 启动本地模拟Telegram服务（fake_telegram_server.py）和Webhook运行时
+- 并发POST合成update，测量应答延迟和命令回复的端到端延迟
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from fake_telegram_server import FakeTelegramServer
+from stats_utils import percentile
+
+
+def post_updates(url: str, server: FakeTelegramServer, count: int, command: str, concurrency: int,
+                 secret: str) -> dict:
+    """并发发送count条update，返回各update的发送时间和应答延迟"""
+    posted_at = {}
+    ack_latencies = []
+    statuses = {}
+
+    def post(chat_id: int):
+        session = requests.Session()
+        update = server.make_update(chat_id, command)
+        start = time.monotonic()
+        response = session.post(url, data=json.dumps(update), proxies={},
+                                headers={'Content-Type': 'application/json',
+                                         'X-Telegram-Bot-Api-Secret-Token': secret})
+        posted_at[str(chat_id)] = start
+        ack_latencies.append(time.monotonic() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(post, range(1, count + 1)))
+    return {'posted_at': posted_at, 'ack': ack_latencies, 'statuses': statuses}
+
+
+async def run(args):
+    server = FakeTelegramServer(send_latency=args.send_latency).start()
+
+    from bot_runtime import WebhookBotRuntime
+    from telegram_client import TelegramClient
+    from telegram_news_bot import TelegramNewsBot
+
+    bot = TelegramNewsBot()
+    bot.telegram = TelegramClient(bot_token='fake-token', api_base=server.url,
+                                  global_per_second=args.send_rate)
+    runtime = WebhookBotRuntime(bot, port=0, secret_token='benchmark-secret', workers=args.workers)
+    await runtime.start()
+
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    result = await loop.run_in_executor(None, post_updates, runtime.url, server, args.updates,
+                                        args.command, args.concurrency, 'benchmark-secret')
+    post_elapsed = time.monotonic() - started
+    await loop.run_in_executor(None, server.wait_for_messages, args.updates, args.timeout)
+    total_elapsed = time.monotonic() - started
+
+    reply_latencies = []
+    for message in list(server.sent):
+        posted = result['posted_at'].get(str(message['chat_id']))
+        if posted is not None:
+            reply_latencies.append(message['sent_at'] - posted)
+
+    runtime.stop()
+    await runtime.run()
+    server.stop()
+
+    print("=" * 60)
+    print("Webhook模式压测（离线）")
+    print("=" * 60)
+    print(f"update数: {args.updates}  并发连接: {args.concurrency}  命令: {args.command}")
+    print(f"应答状态: {result['statuses']}")
+    print(f"应答延迟: p50 {percentile(result['ack'], 50) * 1000:.1f}ms  "
+          f"p95 {percentile(result['ack'], 95) * 1000:.1f}ms  "
+          f"（{args.updates / post_elapsed:.0f} 请求/秒）")
+    print(f"回复延迟: p50 {percentile(reply_latencies, 50):.2f}s  p95 {percentile(reply_latencies, 95):.2f}s  "
+          f"已回复 {len(reply_latencies)}/{args.updates}  总耗时 {total_elapsed:.1f}s")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Webhook模式压测（离线）')
+    parser.add_argument('--updates', type=int, default=200, help='发送的update数（每条来自不同chat）')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发连接数')
+    parser.add_argument('--command', default='/help', help='合成update的命令文本')
+    parser.add_argument('--workers', type=int, default=32, help='Webhook工作协程数')
+    parser.add_argument('--send-rate', type=float, default=30, help='全局发送限速（条/秒）')
+    parser.add_argument('--send-latency', type=float, default=0.0, help='模拟sendMessage延迟（秒）')
+    parser.add_argument('--timeout', type=float, default=60, help='等待全部回复的超时（秒）')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+Telegram Bot运行时（asyncio）
+- 长轮询getUpdates，offset持久化到数据库（data/news.db），重启后不重复处理
+- 多个用户的命令并发处理：抓取类命令（/news、/search）在独立线程池执行，不阻塞/help等即时命令
+- 进程内常驻TelegramNewsBot，NewsFetcher和OpenClawNewsSkill的状态在命令之间保持
+- Webhook模式：本地HTTP服务接收update，校验secret token后立即应答，命令进入队列由工作协程处理
+- 可通过TELEGRAM_API_URL指向本地模拟服务（fake_telegram_server.py）测试
+"""
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+import requests
+
+from config import config
+
+
+class BotRuntime:
+    """命令分发：解析update，并发执行命令并回复"""
+
+    def __init__(self, bot=None, command_workers: int = 4):
+        """
+        Args:
+            bot: TelegramNewsBot实例，默认新建
+            command_workers: 同时处理的抓取类命令数
+        """
+        if bot is None:
+            from telegram_news_bot import TelegramNewsBot
+            bot = TelegramNewsBot()
+        self.bot = bot
+        # 抓取类命令和即时命令使用不同线程池，慢命令排队时即时命令仍能立即回复
+        self.command_executor = ThreadPoolExecutor(max_workers=max(1, command_workers),
+                                                   thread_name_prefix='bot-command')
+        self.quick_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='bot-quick')
+        self.tasks = set()
+        self.stats = {'updates': 0, 'commands': 0, 'errors': 0, 'replied': 0}
+
+    @staticmethod
+    def parse_update(update: Dict) -> Optional[Tuple[str, str]]:
+        """从update中取出(chat_id, 文本)，非文本消息返回None"""
+        message = update.get('message') or update.get('edited_message') or update.get('channel_post')
+        if not message or not message.get('text'):
+            return None
+        return str(message['chat']['id']), message['text']
+
+    def dispatch(self, update: Dict) -> bool:
+        """
+        分发一条update（需在事件循环中调用），命令在后台任务中处理
+
+        Returns:
+            是否为可处理的文本命令
+        """
+        self.stats['updates'] += 1
+        parsed = self.parse_update(update)
+        if parsed is None:
+            return False
+        task = asyncio.get_running_loop().create_task(self.handle(*parsed))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return True
+
+    async def handle(self, chat_id: str, text: str):
+        """执行命令并回复"""
+        loop = asyncio.get_running_loop()
+        executor = self.quick_executor if self.bot.is_quick_command(text) else self.command_executor
+        started = time.monotonic()
+        self.stats['commands'] += 1
+        try:
+            reply = await loop.run_in_executor(executor, self.bot.handle_command, chat_id, text)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"[ERROR] 命令处理失败 {text[:30]}: {e}")
+            reply = "命令处理失败，请稍后重试。"
+
+        futures = self.bot.queue_message(chat_id, reply)
+        results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+        if all(results):
+            self.stats['replied'] += 1
+        print(f"[{chat_id}] {text[:30]} -> {'已回复' if all(results) else '回复失败'}"
+              f"（{time.monotonic() - started:.1f}s）")
+
+    async def drain(self):
+        """等待所有进行中的命令处理完成"""
+        if self.tasks:
+            await asyncio.gather(*list(self.tasks), return_exceptions=True)
+
+    def close(self):
+        """释放线程池"""
+        self.command_executor.shutdown(wait=False)
+        self.quick_executor.shutdown(wait=False)
+
+
+class PollingBotRuntime(BotRuntime):
+    """长轮询模式运行时"""
+
+    def __init__(self, bot=None, command_workers: int = 4, poll_timeout: int = 30,
+                 offset_key: str = 'telegram.last_update_id'):
+        """
+        Args:
+            bot: TelegramNewsBot实例，默认新建
+            command_workers: 同时处理的抓取类命令数
+            poll_timeout: getUpdates长轮询等待秒数
+            offset_key: 数据库中保存最后处理的update_id的键
+        """
+        super().__init__(bot, command_workers)
+        self.poll_timeout = poll_timeout
+        self.offset_key = offset_key
+        # 长轮询请求会阻塞线程，单独使用一个线程
+        self.poll_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bot-poll')
+        self.stop_event = None
+
+    @classmethod
+    def from_config(cls, bot=None) -> 'PollingBotRuntime':
+        """从config.yaml的telegram.bot配置创建"""
+        bot_config = (config.load_yaml_config().get('telegram') or {}).get('bot') or {}
+        return cls(bot, command_workers=bot_config.get('command_workers', 4),
+                   poll_timeout=bot_config.get('poll_timeout', 30))
+
+    def load_offset(self) -> int:
+        """读取下一次getUpdates的offset（最后处理的update_id + 1）"""
+        last_update_id = self.bot.store.get_value(self.offset_key)
+        return int(last_update_id) + 1 if last_update_id is not None else 0
+
+    def save_offset(self, last_update_id: int):
+        """保存最后处理的update_id"""
+        self.bot.store.set_value(self.offset_key, last_update_id)
+
+    def stop(self):
+        """请求停止轮询（可在事件循环中调用）"""
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    async def _get_updates(self, offset: int) -> Optional[list]:
+        """调用getUpdates，停止时返回None"""
+        loop = asyncio.get_running_loop()
+        call = partial(self.bot.telegram.call, 'getUpdates',
+                       {'offset': offset, 'timeout': self.poll_timeout, 'allowed_updates': ['message']},
+                       timeout=self.poll_timeout + 10)
+        poll = loop.run_in_executor(self.poll_executor, call)
+        stop = loop.create_task(self.stop_event.wait())
+        done, _ = await asyncio.wait({poll, stop}, return_when=asyncio.FIRST_COMPLETED)
+        if stop in done:
+            return None
+        stop.cancel()
+        result = poll.result()
+        if not result.get('ok'):
+            raise RuntimeError(f"getUpdates失败: {result.get('description', result)}")
+        return result.get('result') or []
+
+    async def run(self):
+        """轮询直到stop()被调用"""
+        self.stop_event = asyncio.Event()
+        offset = self.load_offset()
+        backoff = 1
+        print(f"Bot长轮询已启动（offset={offset}）")
+
+        while not self.stop_event.is_set():
+            try:
+                updates = await self._get_updates(offset)
+            except (requests.exceptions.RequestException, RuntimeError) as e:
+                print(f"[WARN] {str(e)[:100]}，{backoff}秒后重试")
+                try:
+                    await asyncio.wait_for(self.stop_event.wait(), timeout=backoff)
+                except asyncio.TimeoutError:
+                    pass
+                backoff = min(backoff * 2, 60)
+                continue
+            if updates is None:
+                break
+
+            backoff = 1
+            for update in updates:
+                self.dispatch(update)
+                offset = max(offset, update['update_id'] + 1)
+            if updates:
+                self.save_offset(offset - 1)
+
+        await self.drain()
+        self.poll_executor.shutdown(wait=False)
+        self.close()
+        print(f"Bot已停止：处理update {self.stats['updates']} 条，命令 {self.stats['commands']} 条，"
+              f"失败 {self.stats['errors']} 条")
+
+
+class WebhookBotRuntime(BotRuntime):
+    """Webhook模式运行时：轻量HTTP服务，应答后异步处理命令"""
+
+    SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+    MAX_BODY_SIZE = 1024 * 1024
+
+    def __init__(self, bot=None, command_workers: int = 4, host: str = '127.0.0.1', port: int = 8443,
+                 path: str = '/telegram/webhook', secret_token: Optional[str] = None,
+                 queue_size: int = 1000, workers: int = 32):
+        """
+        Args:
+            bot: TelegramNewsBot实例，默认新建
+            command_workers: 同时处理的抓取类命令数
+            host: 监听地址
+            port: 监听端口，0表示随机分配
+            path: Webhook路径
+            secret_token: setWebhook时设置的secret_token，请求头不匹配时拒绝；None时随机生成
+                （只在本进程调用register()注册时可用，公网Webhook不接受未校验的请求）
+            queue_size: 待处理update队列容量，队列满时返回503让Telegram稍后重投
+            workers: 处理队列的工作协程数
+        """
+        super().__init__(bot, command_workers)
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_generated = not secret_token
+        self.secret_token = secret_token or secrets.token_urlsafe(32)
+        self.queue_size = queue_size
+        self.workers = max(1, workers)
+        self.queue = None
+        self.server = None
+        self.worker_tasks = []
+        self.connections = {}
+        self.stop_event = None
+        # 最近处理过的update_id（Telegram超时重投时去重）
+        self.recent_updates = OrderedDict()
+        self.stats.update({'requests': 0, 'rejected': 0, 'duplicates': 0, 'overloaded': 0})
+
+    @classmethod
+    def from_config(cls, bot=None) -> 'WebhookBotRuntime':
+        """从config.yaml的telegram.bot和telegram.bot.webhook配置创建（secret从环境变量读取）"""
+        bot_config = (config.load_yaml_config().get('telegram') or {}).get('bot') or {}
+        webhook_config = bot_config.get('webhook') or {}
+        return cls(bot, command_workers=bot_config.get('command_workers', 4),
+                   host=webhook_config.get('host', '127.0.0.1'),
+                   port=webhook_config.get('port', 8443),
+                   path=webhook_config.get('path', '/telegram/webhook'),
+                   secret_token=os.getenv('TELEGRAM_WEBHOOK_SECRET') or None,
+                   queue_size=webhook_config.get('queue_size', 1000),
+                   workers=webhook_config.get('workers', 32))
+
+    @property
+    def url(self) -> str:
+        """本地Webhook地址"""
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def register(self, public_url: str) -> bool:
+        """调用setWebhook把公网地址注册到Telegram"""
+        payload = {'url': public_url, 'allowed_updates': ['message'], 'secret_token': self.secret_token}
+        result = self.bot.telegram.call('setWebhook', payload)
+        if not result.get('ok'):
+            print(f"[FAIL] setWebhook失败: {result.get('description', result)}")
+        return bool(result.get('ok'))
+
+    # ==================== HTTP ====================
+
+    def _accept(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict]:
+        """校验请求并把update放入队列，返回(状态码, 应答)"""
+        self.stats['requests'] += 1
+        if path.split('?')[0] != self.path:
+            return 404, {'ok': False, 'description': 'Not Found'}
+        if method != 'POST':
+            return 405, {'ok': False, 'description': 'Method Not Allowed'}
+        if not hmac.compare_digest(headers.get(self.SECRET_HEADER, ''), self.secret_token):
+            self.stats['rejected'] += 1
+            return 403, {'ok': False, 'description': 'Forbidden'}
+        try:
+            update = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'ok': False, 'description': 'Bad Request'}
+
+        update_id = update.get('update_id')
+        if update_id is not None:
+            if update_id in self.recent_updates:
+                self.stats['duplicates'] += 1
+                return 200, {'ok': True}
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.stats['overloaded'] += 1
+            return 503, {'ok': False, 'description': 'Service Unavailable'}
+        if update_id is not None:
+            self.recent_updates[update_id] = True
+            while len(self.recent_updates) > 10000:
+                self.recent_updates.popitem(last=False)
+        return 200, {'ok': True}
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个HTTP连接（支持keep-alive）"""
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                request_line = lines[0].split()
+                if len(request_line) < 2:
+                    break
+                method, path = request_line[0].upper(), request_line[1]
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length') or 0)
+                if length > self.MAX_BODY_SIZE:
+                    status, response = 413, {'ok': False, 'description': 'Payload Too Large'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, response = self._accept(method, path, headers, body)
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+
+                payload = json.dumps(response).encode('utf-8')
+                reasons = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+                           405: 'Method Not Allowed', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+                writer.write((f"HTTP/1.1 {status} {reasons.get(status, 'OK')}\r\n"
+                              f"Content-Type: application/json\r\n"
+                              f"Content-Length: {len(payload)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1')
+                             + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections.pop(writer, None)
+            writer.close()
+
+    async def _worker(self):
+        """从队列取出update并处理命令"""
+        while True:
+            update = await self.queue.get()
+            try:
+                parsed = self.parse_update(update)
+                self.stats['updates'] += 1
+                if parsed is not None:
+                    await self.handle(*parsed)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"[ERROR] update处理失败: {e}")
+            finally:
+                self.queue.task_done()
+
+    # ==================== 运行 ====================
+
+    async def start(self):
+        """启动HTTP服务和工作协程"""
+        self.stop_event = asyncio.Event()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.worker_tasks = [asyncio.get_running_loop().create_task(self._worker()) for _ in range(self.workers)]
+        print(f"Webhook服务已启动: {self.url}")
+
+    def stop(self):
+        """请求停止服务（可在事件循环中调用）"""
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    async def run(self):
+        """运行直到stop()被调用：停止接收新请求后处理完队列中的命令"""
+        if self.server is None:
+            await self.start()
+        await self.stop_event.wait()
+
+        self.server.close()
+        # 关闭空闲的keep-alive连接，并等待连接处理结束
+        connection_tasks = list(self.connections.values())
+        for writer in list(self.connections):
+            writer.close()
+        if connection_tasks:
+            await asyncio.wait(connection_tasks, timeout=5)
+        await self.server.wait_closed()
+        await self.queue.join()
+        for task in self.worker_tasks:
+            task.cancel()
+        self.close()
+        print(f"Webhook服务已停止：请求 {self.stats['requests']} 次，命令 {self.stats['commands']} 条，"
+              f"拒绝 {self.stats['rejected']} 次，重复 {self.stats['duplicates']} 次，"
+              f"过载 {self.stats['overloaded']} 次，失败 {self.stats['errors']} 条")
+
+
+def run_polling_mode():
+    """长轮询模式入口（Ctrl+C停止）"""
+    runtime = PollingBotRuntime.from_config()
+    try:
+        asyncio.run(runtime.run())
+    except KeyboardInterrupt:
+        print("\n已停止")
+
+
+def run_webhook_mode(public_url: Optional[str] = None):
+    """
+    Webhook模式入口（Ctrl+C停止）
+
+    Args:
+        public_url: Telegram可访问的公网地址，提供时先调用setWebhook注册
+    """
+    runtime = WebhookBotRuntime.from_config()
+    if runtime.secret_generated:
+        if not public_url:
+            # 随机secret没有注册到Telegram，无法校验来源，不启动
+            print("[ERROR] 未设置TELEGRAM_WEBHOOK_SECRET：请设置该环境变量，或提供公网地址由本进程注册随机secret")
+            return
+        print("[INFO] 未设置TELEGRAM_WEBHOOK_SECRET，使用随机生成的secret_token注册Webhook")
+
+    async def main():
+        await runtime.start()
+        if public_url and not runtime.register(public_url):
+            runtime.stop()
+        await runtime.run()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n已停止")
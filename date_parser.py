@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+发布时间解析
+- RSS pubDate（RFC 822，如"Fri, 17 Oct 2026 08:30:00 +0000"）
+- Atom updated/published（ISO 8601，如"2026-10-17T08:30:00Z"）
+- 中文网站常见格式："2026-10-17 08:30"、"2026/10/17"、"2026年10月17日 08:30"、"10月17日"、"10-17 08:30"、
+  "今天 08:30"、"昨天"、"刚刚"、"5分钟前"、"3小时前"
+- Unix时间戳（秒或毫秒）和URL中的日期（/2026-10-17/、/20261017/）
+- 只用预编译正则和整数运算，不依赖第三方库；没有时区的时间按北京时间处理
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_tz
+from typing import Optional
+
+# 中文网站默认时区
+CHINA_TZ = timezone(timedelta(hours=8), 'CST')
+
+_MONTHS = {name: index for index, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1)}
+
+# RFC 822常见时区缩写；CST按中国标准时间（+8）处理：抓取的中文源用CST表示北京时间，
+# 美国中部时间的源一般写作-0600/CDT
+_TZ_NAMES = {
+    'GMT': 0, 'UT': 0, 'UTC': 0, 'Z': 0,
+    'EST': -5, 'EDT': -4, 'CST': 8, 'CDT': -5, 'MST': -7, 'MDT': -6, 'PST': -8, 'PDT': -7,
+    'BST': 1, 'CET': 1, 'CEST': 2, 'JST': 9, 'HKT': 8, 'SGT': 8,
+}
+
+_RFC822_RE = re.compile(
+    r'(?:[A-Za-z]{3},?\s+)?(\d{1,2})\s+([A-Za-z]{3})[a-z]*\.?\s+(\d{2,4})'
+    r'(?:\s+(\d{1,2}):(\d{2})(?::(\d{2}))?)?\s*([+-]\d{4}|[A-Za-z]{1,4})?')
+_NUMERIC_RE = re.compile(
+    r'(\d{4})[-/.年](\d{1,2})[-/.月](\d{1,2})日?'
+    r'(?:[T\s]*(\d{1,2})[:时](\d{1,2})(?:[:分](\d{1,2})(?:\.\d+)?)?)?'
+    r'\s*(Z|[+-]\d{2}:?\d{2})?')
+_MONTH_DAY_RE = re.compile(r'(\d{1,2})[-/月](\d{1,2})日?(?:\s*(\d{1,2})[:时](\d{1,2}))?')
+_RELATIVE_RE = re.compile(r'(\d+)\s*(秒|分钟|小时|天)前')
+_DAY_WORD_RE = re.compile(r'(今天|昨天|前天)\s*(?:(\d{1,2})[:时](\d{1,2}))?')
+_TIME_ONLY_RE = re.compile(r'^(\d{1,2}):(\d{2})(?::(\d{2}))?$')
+_TIMESTAMP_RE = re.compile(r'^\d{10}(?:\d{3})?$')
+_URL_DATE_RE = re.compile(r'(?:/|\bt)(20\d{2})([-/_]?)(0[1-9]|1[0-2])\2(0[1-9]|[12]\d|3[01])(?!\d)')
+
+
+def _build(year, month, day, hour=0, minute=0, second=0, tz=CHINA_TZ) -> Optional[datetime]:
+    try:
+        return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                        tzinfo=tz)
+    except ValueError:
+        return None
+
+
+def _offset(text: Optional[str]) -> Optional[timezone]:
+    """解析时区：+0800、+08:00、Z、GMT、EST等，无法识别时返回None"""
+    if not text:
+        return None
+    if text[0] in '+-':
+        digits = text[1:].replace(':', '')
+        minutes = int(digits[:2]) * 60 + int(digits[2:4] or 0)
+        return timezone(timedelta(minutes=minutes if text[0] == '+' else -minutes))
+    hours = _TZ_NAMES.get(text.upper())
+    return timezone(timedelta(hours=hours)) if hours is not None else None
+
+
+def _parse_rfc822(text: str) -> Optional[datetime]:
+    match = _RFC822_RE.match(text)
+    if match:
+        day, month_name, year, hour, minute, second, zone = match.groups()
+        month = _MONTHS.get(month_name[:3].lower())
+        if month:
+            year = int(year)
+            if year < 100:
+                year += 2000 if year < 70 else 1900
+            return _build(year, month, day, hour, minute, second, _offset(zone) or timezone.utc)
+    # 罕见写法交给标准库
+    parsed = parsedate_tz(text)
+    if parsed is None:
+        return None
+    tz = timezone(timedelta(seconds=parsed[9])) if parsed[9] is not None else timezone.utc
+    return _build(*parsed[:6], tz=tz)
+
+
+def _infer_year(month: int, day: int, now: datetime) -> int:
+    """只有月日时推断年份：比当前时间晚超过一天的视为去年"""
+    candidate = _build(now.year, month, day, tz=now.tzinfo)
+    if candidate is not None and candidate - now > timedelta(days=1):
+        return now.year - 1
+    return now.year
+
+
+def parse_published(text, now: Optional[datetime] = None, default_tz: timezone = CHINA_TZ) -> Optional[datetime]:
+    """
+    解析发布时间
+
+    Args:
+        text: 时间字符串（或Unix时间戳）
+        now: 当前时间（解析相对时间和推断年份用），默认当前北京时间
+        default_tz: 时间不带时区时使用的时区
+
+    Returns:
+        带时区的datetime，无法解析时返回None
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        text = str(int(text))
+    text = text.strip()
+    if not text:
+        return None
+
+    if _TIMESTAMP_RE.match(text):
+        seconds = int(text) / (1000 if len(text) == 13 else 1)
+        return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+    match = _NUMERIC_RE.search(text)
+    if match:
+        year, month, day, hour, minute, second, zone = match.groups()
+        return _build(year, month, day, hour, minute, second, _offset(zone) or default_tz)
+
+    if text[:1].isalpha() and text[:1].isascii() or text[:1].isdigit() and _RFC822_RE.match(text):
+        parsed = _parse_rfc822(text)
+        if parsed is not None:
+            return parsed
+
+    now = (now or datetime.now(default_tz)).astimezone(default_tz)
+
+    match = _RELATIVE_RE.search(text)
+    if match:
+        unit = {'秒': 'seconds', '分钟': 'minutes', '小时': 'hours', '天': 'days'}[match.group(2)]
+        return now - timedelta(**{unit: int(match.group(1))})
+    if '刚刚' in text:
+        return now
+
+    match = _DAY_WORD_RE.search(text)
+    if match:
+        base = now - timedelta(days={'今天': 0, '昨天': 1, '前天': 2}[match.group(1)])
+        if match.group(2) is None:
+            return base.replace(hour=0, minute=0, second=0, microsecond=0)
+        return _build(base.year, base.month, base.day, match.group(2), match.group(3), tz=default_tz)
+
+    match = _MONTH_DAY_RE.search(text)
+    if match:
+        month, day, hour, minute = (int(v) if v else 0 for v in match.groups())
+        if 1 <= month <= 12:
+            return _build(_infer_year(month, day, now), month, day, hour, minute, tz=default_tz)
+
+    match = _TIME_ONLY_RE.match(text)
+    if match:
+        parsed = now.replace(hour=int(match.group(1)), minute=int(match.group(2)),
+                             second=int(match.group(3) or 0), microsecond=0)
+        # 比当前时间晚的只有时分的时间视为昨天
+        return parsed - timedelta(days=1) if parsed > now + timedelta(minutes=5) else parsed
+
+    return None
+
+
+def parse_date_from_url(url: str) -> Optional[datetime]:
+    """从URL路径中的日期（/2026-10-17/、/20261017/、/2026/10/17/）推断发布日期"""
+    match = _URL_DATE_RE.search(url or '')
+    if not match:
+        return None
+    year, _, month, day = match.groups()
+    return _build(year, month, day)
+
+
+def to_local_iso(published: Optional[datetime]) -> Optional[str]:
+    """转换为本地时间的ISO字符串（不带时区，与fetched_at格式一致，便于排序和比较）"""
+    if published is None:
+        return None
+    if published.tzinfo is not None:
+        published = published.astimezone().replace(tzinfo=None)
+    return published.isoformat(timespec='seconds')
+
+
+def age_hours(published: Optional[datetime], now: Optional[datetime] = None) -> Optional[float]:
+    """发布至今的小时数，未知时返回None"""
+    if published is None:
+        return None
+    now = now or datetime.now(timezone.utc)
+    return (now - published).total_seconds() / 3600
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+按域名的礼貌请求调度
+- 每个站点域名一个令牌桶（telegram_client.RateLimiter），所有抓取方法共享：
+  同一站点的请求间隔不小于fetch.delay_between_requests（可按域名单独配置），不同站点互不等待
+- 收到429（或带Retry-After的503）时暂停该域名，按Retry-After（缺省时指数退避）等待后重试；
+  暂停时间超过上限时不再等待，直接报错交给抓取方法的重试逻辑
+- interleave()把一批任务按域名轮流排序，并发执行时各站点交替请求，总吞吐高而单站点速率不变
+"""
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from config import config
+from telegram_client import RateLimiter
+
+# 二级域名后缀（site.com.cn按site.com.cn计，而不是com.cn）
+_SECOND_LEVEL = {'com', 'net', 'org', 'gov', 'edu', 'co', 'ac'}
+
+
+class DomainThrottled(requests.exceptions.RequestException):
+    """域名被限流且等待时间超过上限"""
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After：秒数或HTTP日期"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class PolitenessScheduler:
+    """按域名的令牌桶调度器（线程安全）"""
+
+    def __init__(self, default_delay: float = 2, burst: float = 1, domains: Optional[Dict[str, float]] = None,
+                 max_wait: float = 60, retries: int = 2, backoff: float = 5):
+        """
+        Args:
+            default_delay: 同一域名两次请求的默认间隔（秒），0表示不限速
+            burst: 每个域名允许的突发请求数（桶容量）
+            domains: 按域名后缀单独配置的间隔 {域名后缀: 秒}，0表示不限速
+            max_wait: 域名被暂停时最多等待的秒数，超过时抛出DomainThrottled
+            retries: 收到429后的最多重试次数
+            backoff: 429没有Retry-After时的首次退避秒数（连续429时翻倍）
+        """
+        self.default_delay = default_delay
+        self.burst = max(1.0, burst)
+        self.domains = {suffix.lower().lstrip('.'): delay for suffix, delay in (domains or {}).items()}
+        self.max_wait = max_wait
+        self.retries = max(0, retries)
+        self.backoff = backoff
+
+        self.lock = threading.Lock()
+        self.limiters = {}
+        # 连续429次数（计算退避时间）
+        self.strikes = {}
+        self.stats = {}
+
+    @classmethod
+    def from_config(cls) -> 'PolitenessScheduler':
+        """从config.yaml的fetch.delay_between_requests和politeness配置创建"""
+        yaml_config = config.load_yaml_config()
+        fetch_config = yaml_config.get('fetch') or {}
+        politeness_config = yaml_config.get('politeness') or {}
+        if not politeness_config.get('enabled', True):
+            return cls(default_delay=0, domains={})
+        return cls(default_delay=fetch_config.get('delay_between_requests', 2),
+                   burst=politeness_config.get('burst', 1),
+                   domains=politeness_config.get('domains'),
+                   max_wait=politeness_config.get('max_wait', 60),
+                   retries=politeness_config.get('retries', 2),
+                   backoff=politeness_config.get('backoff', 5))
+
+    def domain_of(self, url: str) -> str:
+        """限速使用的域名：匹配domains配置的后缀，否则取站点主域名（news.sina.com.cn -> sina.com.cn）"""
+        host = (urlsplit(url).hostname or '').lower()
+        for suffix in self.domains:
+            if host == suffix or host.endswith('.' + suffix):
+                return suffix
+        labels = host.split('.')
+        if labels[-1].isdigit() or ':' in host:
+            # IP地址按完整地址限速
+            return host
+        keep = 3 if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in _SECOND_LEVEL else 2
+        return '.'.join(labels[-keep:])
+
+    def _limiter(self, domain: str) -> Optional[RateLimiter]:
+        """域名的令牌桶（调用方持有self.lock），不限速时返回None"""
+        if domain not in self.limiters:
+            delay = self.domains.get(domain, self.default_delay)
+            self.limiters[domain] = RateLimiter(1.0 / delay, self.burst) if delay and delay > 0 else None
+            self.stats[domain] = {'requests': 0, 'wait': 0.0, 'throttled': 0}
+        return self.limiters[domain]
+
+    def acquire(self, url: str):
+        """
+        等待url所在域名的令牌
+
+        Raises:
+            DomainThrottled: 域名被暂停且剩余时间超过max_wait
+        """
+        domain = self.domain_of(url)
+        with self.lock:
+            limiter = self._limiter(domain)
+            stats = self.stats[domain]
+            stats['requests'] += 1
+        if limiter is None:
+            return
+        remaining = limiter.paused_until - time.monotonic()
+        if remaining > self.max_wait:
+            raise DomainThrottled(f"{domain} 限流中，剩余 {remaining:.0f}s")
+        started = time.monotonic()
+        limiter.acquire()
+        with self.lock:
+            stats['wait'] += time.monotonic() - started
+
+    def throttled(self, url: str, response: requests.Response) -> Optional[float]:
+        """
+        处理限流响应：暂停该域名
+
+        Returns:
+            需要等待的秒数（调用方等待后重试）；不是限流响应时返回None
+        """
+        retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+        if response.status_code != 429 and not (response.status_code == 503 and retry_after is not None):
+            return None
+        domain = self.domain_of(url)
+        with self.lock:
+            limiter = self._limiter(domain)
+            strikes = self.strikes.get(domain, 0) + 1
+            self.strikes[domain] = strikes
+            self.stats[domain]['throttled'] += 1
+        wait = retry_after if retry_after is not None else self.backoff * 2 ** (strikes - 1)
+        if limiter is not None:
+            limiter.pause(wait)
+        print(f"    [WARN] {domain} 返回 {response.status_code}，暂停 {wait:.0f}s")
+        return wait
+
+    def succeeded(self, url: str):
+        """请求成功，清除连续429计数"""
+        domain = self.domain_of(url)
+        if domain in self.strikes:
+            with self.lock:
+                self.strikes.pop(domain, None)
+
+    def request(self, url: str, send: Callable[[], requests.Response]) -> requests.Response:
+        """按域名限速执行请求，429时等待Retry-After后重试（最多retries次），返回最后的响应"""
+        for attempt in range(self.retries + 1):
+            self.acquire(url)
+            response = send()
+            wait = self.throttled(url, response)
+            if wait is None:
+                self.succeeded(url)
+                return response
+            if attempt == self.retries or wait > self.max_wait:
+                return response
+        return response
+
+    def interleave(self, items: Iterable, key: Callable[[object], str]) -> List:
+        """按域名轮流排列任务（同一域名内保持原顺序）"""
+        queues = OrderedDict()
+        for item in items:
+            queues.setdefault(self.domain_of(key(item)), []).append(item)
+        ordered = []
+        while queues:
+            for domain in list(queues):
+                ordered.append(queues[domain].pop(0))
+                if not queues[domain]:
+                    del queues[domain]
+        return ordered
+
+    def print_stats(self):
+        """打印各域名的请求数、累计等待时间和限流次数"""
+        with self.lock:
+            rows = sorted(self.stats.items(), key=lambda item: -item[1]['requests'])
+        if not rows:
+            return
+        print(f"{'域名':<24} {'请求':>6} {'等待':>8} {'限流':>6}")
+        for domain, stats in rows:
+            print(f"{domain[:24]:<24} {stats['requests']:>6} {stats['wait']:>7.1f}s {stats['throttled']:>6}")
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_politeness_scheduler() -> PolitenessScheduler:
+    """获取进程内共享的调度器（所有NewsFetcher共用同一组令牌桶）"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = PolitenessScheduler.from_config()
+        return _default_scheduler
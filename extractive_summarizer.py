@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+本地抽取式摘要（TextRank）
+- 中英文混合分句、分词（中文二元组 + 英文单词）
+- 句子相似度矩阵和PageRank迭代使用NumPy向量化计算
+- 作为LLM不可用时的降级摘要，以及LLM提示词的压缩输入
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from text_utils import is_boilerplate, join_sentences, remove_inline_boilerplate, split_sentences, tokenize
+
+
+class ExtractiveSummarizer:
+    """TextRank抽取式摘要器"""
+
+    def __init__(self, damping: float = 0.85, max_iter: int = 50, tol: float = 1e-4,
+                 lead_bonus: float = 0.3, title_weight: float = 1.0):
+        """
+        初始化摘要器
+
+        Args:
+            damping: PageRank阻尼系数
+            max_iter: 最大迭代次数
+            tol: 收敛阈值
+            lead_bonus: 导语（首句）的先验加权，新闻通常把要点放在开头
+            title_weight: 与标题相似度的先验加权
+        """
+        self.damping = damping
+        self.max_iter = max_iter
+        self.tol = tol
+        self.lead_bonus = lead_bonus
+        self.title_weight = title_weight
+
+    def _vectorize(self, texts: List[str]) -> np.ndarray:
+        """将文本转为L2归一化的对数词频矩阵（行：文本，列：词）"""
+        token_lists = [tokenize(t) for t in texts]
+        vocab = {}
+        rows, cols = [], []
+        for i, tokens in enumerate(token_lists):
+            for token in tokens:
+                rows.append(i)
+                cols.append(vocab.setdefault(token, len(vocab)))
+
+        matrix = np.zeros((len(texts), max(len(vocab), 1)), dtype=np.float32)
+        if rows:
+            np.add.at(matrix, (np.array(rows), np.array(cols)), 1.0)
+        np.log1p(matrix, out=matrix)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def rank_sentences(self, sentences: List[str], title: str = '') -> np.ndarray:
+        """
+        计算句子重要性得分
+
+        Args:
+            sentences: 句子列表
+            title: 标题，用于个性化PageRank的先验
+
+        Returns:
+            与sentences等长的得分数组
+        """
+        n = len(sentences)
+        if n == 0:
+            return np.zeros(0, dtype=np.float32)
+        if n == 1:
+            return np.ones(1, dtype=np.float32)
+
+        vectors = self._vectorize(sentences + [title])
+        sent_vectors, title_vector = vectors[:n], vectors[n]
+
+        similarity = sent_vectors @ sent_vectors.T
+        np.fill_diagonal(similarity, 0.0)
+        out_weight = similarity.sum(axis=1, keepdims=True)
+        # 孤立句子的出边均匀分配，保证转移矩阵按行归一
+        transition = np.where(out_weight > 0, similarity / np.where(out_weight > 0, out_weight, 1.0), 1.0 / n)
+
+        prior = np.ones(n, dtype=np.float32)
+        prior[0] += self.lead_bonus
+        if title:
+            prior += self.title_weight * (sent_vectors @ title_vector)
+        prior /= prior.sum()
+
+        scores = np.full(n, 1.0 / n, dtype=np.float32)
+        for _ in range(self.max_iter):
+            updated = (1 - self.damping) * prior + self.damping * (transition.T @ scores)
+            if np.abs(updated - scores).sum() < self.tol:
+                scores = updated
+                break
+            scores = updated
+        return scores
+
+    def key_sentences(self, text: str, max_sentences: int = 3, max_chars: Optional[int] = None,
+                      title: str = '') -> List[str]:
+        """
+        抽取关键句，按原文顺序返回
+
+        Args:
+            text: 原文
+            max_sentences: 最多抽取的句子数
+            max_chars: 关键句总字数上限（至少保留一句）
+            title: 标题
+        """
+        sentences = [s for s in split_sentences(remove_inline_boilerplate(text), min_length=5)
+                     if not is_boilerplate(s)]
+        if not sentences:
+            return []
+
+        scores = self.rank_sentences(sentences, title)
+        chosen = []
+        total = 0
+        for index in np.argsort(-scores, kind='stable'):
+            if len(chosen) >= max_sentences:
+                break
+            length = len(sentences[index])
+            if max_chars is not None and chosen and total + length > max_chars:
+                continue
+            chosen.append(int(index))
+            total += length
+
+        return [sentences[i] for i in sorted(chosen)]
+
+    def summarize(self, text: str, max_sentences: int = 3, max_chars: Optional[int] = None,
+                  title: str = '') -> str:
+        """生成抽取式摘要文本"""
+        result = join_sentences(self.key_sentences(text, max_sentences, max_chars, title))
+        if max_chars is not None and len(result) > max_chars:
+            result = result[:max_chars] + '...'
+        return result
+
+    def summarize_article(self, article: Dict, max_sentences: int = 3, max_chars: Optional[int] = 300) -> str:
+        """为文章字典生成摘要（使用content，缺失时使用summary）"""
+        content = article.get('content') or article.get('summary', '')
+        return self.summarize(content, max_sentences, max_chars, article.get('title', ''))
+
+
+# 全局默认实例
+summarizer = ExtractiveSummarizer()
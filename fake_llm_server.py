@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟智谱清言API服务
+- 兼容 /api/paas/v4/chat/completions 协议（含stream流式输出）
+- 可配置延迟分布、错误率和429限流突发
+- 用于离线压测和回归测试AIAnalyzer，不消耗真实API额度
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from prompt_builder import PromptBuilder
+
+API_PATH = '/api/paas/v4/chat/completions'
+
+
+class FakeLLMServer:
+    """本地模拟LLM服务"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: str = 'lognormal',
+                 latency_mean: float = 1.0, latency_std: float = 0.5, error_rate: float = 0.0,
+                 burst_interval: float = 0.0, burst_length: float = 0.0, retry_after: int = 1,
+                 seed: Optional[int] = None):
+        """
+        初始化模拟服务
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示随机分配
+            latency: 延迟分布，fixed/uniform/normal/lognormal
+            latency_mean: 平均延迟（秒）
+            latency_std: 延迟标准差（秒），uniform时为半宽
+            error_rate: 返回500错误的概率
+            burst_interval: 每隔多少秒出现一次429突发，0表示不限流
+            burst_length: 每次429突发持续秒数
+            retry_after: 429响应的Retry-After（秒）
+            seed: 随机种子
+        """
+        self.latency = latency
+        self.latency_mean = latency_mean
+        self.latency_std = latency_std
+        self.error_rate = error_rate
+        self.burst_interval = burst_interval
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.stats = {}
+        self.reset_stats()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """chat/completions完整地址"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def start(self) -> 'FakeLLMServer':
+        """在后台线程中启动服务"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self):
+        """清空请求统计"""
+        with self.lock:
+            self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0,
+                          'streamed': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def _count(self, key: str, value: int = 1):
+        with self.lock:
+            self.stats[key] += value
+
+    def _sample_latency(self) -> float:
+        """按配置的分布采样延迟"""
+        mean, std = self.latency_mean, self.latency_std
+        with self.lock:
+            if self.latency == 'fixed':
+                value = mean
+            elif self.latency == 'uniform':
+                value = self.random.uniform(mean - std, mean + std)
+            elif self.latency == 'normal':
+                value = self.random.gauss(mean, std)
+            else:
+                # lognormal：按目标均值和标准差换算mu/sigma
+                if mean <= 0:
+                    return 0.0
+                sigma2 = math.log(1 + (std / mean) ** 2)
+                mu = math.log(mean) - sigma2 / 2
+                value = self.random.lognormvariate(mu, sigma2 ** 0.5)
+        return max(value, 0.0)
+
+    def _in_burst(self) -> bool:
+        """当前是否处于429突发窗口"""
+        if self.burst_interval <= 0 or self.burst_length <= 0:
+            return False
+        elapsed = time.monotonic() - self.started_at
+        return elapsed % self.burst_interval < self.burst_length
+
+    def _should_fail(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    @staticmethod
+    def _build_reply(prompt: str) -> str:
+        """根据提示词类型构造符合summary_finance.md格式的回复"""
+        if '地区|标题|来源' in prompt and '【重要消息】' not in prompt:
+            # 重要消息分块提取
+            titles = re.findall(r'标题：(.+)', prompt)[:3]
+            return '\n'.join(f"中国|{t.strip()}|模拟来源|模拟原话|AI|正面，短期|{5 - i}"
+                             for i, t in enumerate(titles)) or '无'
+        if '【重要消息】' in prompt:
+            # 汇总阶段的输入是候选条目，标题在第二个字段
+            titles = (re.findall(r'标题：(.+)', prompt) or re.findall(r'^\d+\. [^|\n]*\|([^|\n]+)\|', prompt, re.M))[:3]
+            lines = ['【重要消息】', '']
+            for i, title in enumerate(titles, 1):
+                lines.append(f"{i}. 【{title.strip()}】来自【模拟来源】")
+                lines.append("   - 关键内容：模拟引用原文")
+                lines.append("   - 影响产业：AI、半导体")
+                lines.append("   - 影响分析：正面，短期")
+            lines += ['', '【投资建议】', '1.建议投资中国半导体行业的基金，理由是模拟数据',
+                      '2.建议投资美国AI行业的股票，理由是模拟数据', '3.人民币与美元的汇率分析结果：没有关于汇率的可参考消息']
+            return '\n'.join(lines)
+
+        match = re.search(r'新闻标题：(.+)', prompt)
+        title = match.group(1).strip() if match else '模拟新闻'
+        return f"""【总结】
+核心观点：{title}
+事件背景：模拟背景
+关键细节：细节一；细节二；细节三
+影响分析：
+- 对市场的影响：模拟影响
+- 对行业的影响：模拟影响
+- 对企业的影响：模拟影响
+未来展望：模拟展望"""
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict, headers: Optional[Dict] = None):
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                raw = self.rfile.read(length) if length else b''
+
+                if self.path.split('?')[0] != API_PATH:
+                    self._send_json(404, {'error': {'code': '404', 'message': 'Not Found'}})
+                    return
+
+                server._count('requests')
+                if not self.headers.get('Authorization', '').startswith('Bearer '):
+                    server._count('errors')
+                    self._send_json(401, {'error': {'code': '1000', 'message': '身份验证失败'}})
+                    return
+
+                try:
+                    request = json.loads(raw or b'{}')
+                except ValueError:
+                    server._count('errors')
+                    self._send_json(400, {'error': {'code': '1214', 'message': '请求体不是合法JSON'}})
+                    return
+
+                if server._in_burst():
+                    server._count('rate_limited')
+                    self._send_json(429, {'error': {'code': '1302', 'message': '并发数过高，请降低并发'}},
+                                    {'Retry-After': str(server.retry_after)})
+                    return
+
+                time.sleep(server._sample_latency())
+
+                if server._should_fail():
+                    server._count('errors')
+                    self._send_json(500, {'error': {'code': '500', 'message': '模拟服务内部错误'}})
+                    return
+
+                messages = request.get('messages') or []
+                prompt = messages[-1].get('content', '') if messages else ''
+                reply = server._build_reply(prompt)
+                max_tokens = request.get('max_tokens') or 8000
+                prompt_tokens = sum(PromptBuilder.estimate_tokens(m.get('content', '')) for m in messages)
+                completion_tokens = min(PromptBuilder.estimate_tokens(reply), max_tokens)
+                server._count('ok')
+                server._count('prompt_tokens', prompt_tokens)
+                server._count('completion_tokens', completion_tokens)
+
+                response_id = uuid.uuid4().hex
+                created = int(time.time())
+                model = request.get('model', 'glm-4.5-airx')
+                usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                         'total_tokens': prompt_tokens + completion_tokens}
+
+                if request.get('stream'):
+                    server._count('streamed')
+                    self._stream(response_id, created, model, reply, usage)
+                    return
+
+                self._send_json(200, {
+                    'id': response_id,
+                    'created': created,
+                    'model': model,
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': reply}}],
+                    'usage': usage,
+                })
+
+            def _stream(self, response_id: str, created: int, model: str, reply: str, usage: Dict):
+                """按SSE格式分块输出"""
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+                chunk_size = 16
+                for start in range(0, len(reply), chunk_size):
+                    chunk = {'id': response_id, 'created': created, 'model': model,
+                             'choices': [{'index': 0, 'delta': {'role': 'assistant',
+                                                                'content': reply[start:start + chunk_size]}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                final = {'id': response_id, 'created': created, 'model': model,
+                         'choices': [{'index': 0, 'finish_reason': 'stop', 'delta': {}}], 'usage': usage}
+                self.wfile.write(f"data: {json.dumps(final, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟智谱清言API服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='lognormal', choices=['fixed', 'uniform', 'normal', 'lognormal'])
+    parser.add_argument('--latency-mean', type=float, default=1.0)
+    parser.add_argument('--latency-std', type=float, default=0.5)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--burst-interval', type=float, default=0.0)
+    parser.add_argument('--burst-length', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(host=args.host, port=args.port, latency=args.latency,
+                           latency_mean=args.latency_mean, latency_std=args.latency_std,
+                           error_rate=args.error_rate, burst_interval=args.burst_interval,
+                           burst_length=args.burst_length, retry_after=args.retry_after)
+    print(f"模拟LLM服务已启动: {server.url}")
+    print(f"使用方法: 设置环境变量 ZHIPU_API_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n已停止")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
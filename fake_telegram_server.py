@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟Telegram Bot API服务
+- 兼容 /bot<token>/<method> 协议：getUpdates（长轮询）、sendMessage、getMe
+- 测试代码可注入用户消息（push_update，或POST /_push {"chat_id": 1, "text": "/news"}），并检查Bot发出的回复
+- 用于离线测试Bot运行时和压测命令处理，不访问真实Telegram
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class FakeTelegramServer:
+    """本地模拟Bot API服务"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, send_latency: float = 0.0):
+        """
+        初始化模拟服务
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示随机分配
+            send_latency: sendMessage的模拟延迟（秒）
+        """
+        self.send_latency = send_latency
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.updates = []
+        self.next_update_id = 1
+        self.next_message_id = 1
+        self.sent = []
+        self.stats = {}
+        self.reset_stats()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """Bot API根地址（对应TELEGRAM_API_URL）"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeTelegramServer':
+        """在后台线程中启动服务"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        with self.condition:
+            self.condition.notify_all()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self):
+        """清空请求统计"""
+        with self.lock:
+            self.stats = {'requests': 0, 'get_updates': 0, 'send_message': 0}
+
+    # ==================== 测试接口 ====================
+
+    def make_update(self, chat_id: int, text: str, user_id: Optional[int] = None) -> Dict:
+        """构造一条用户消息update（不入队，分配update_id）"""
+        with self.lock:
+            update_id = self.next_update_id
+            self.next_update_id += 1
+        user_id = user_id if user_id is not None else chat_id
+        return {
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'group'},
+                'from': {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}'},
+                'text': text,
+            },
+        }
+
+    def push_update(self, chat_id: int, text: str, user_id: Optional[int] = None) -> int:
+        """模拟用户向Bot发送一条消息，返回update_id"""
+        update = self.make_update(chat_id, text, user_id)
+        with self.condition:
+            self.updates.append(update)
+            self.condition.notify_all()
+        return update['update_id']
+
+    def sent_to(self, chat_id: int) -> List[Dict]:
+        """返回发给指定chat的消息"""
+        with self.lock:
+            return [m for m in self.sent if str(m['chat_id']) == str(chat_id)]
+
+    def wait_for_messages(self, count: int, timeout: float = 10.0) -> bool:
+        """等待Bot累计发出count条消息"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while len(self.sent) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    # ==================== Bot API ====================
+
+    def _get_updates(self, params: Dict) -> List[Dict]:
+        """长轮询：确认offset之前的update，无新消息时最多等待timeout秒"""
+        offset = int(params.get('offset') or 0)
+        timeout = float(params.get('timeout') or 0)
+        limit = int(params.get('limit') or 100)
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            # offset之前的update视为已确认，不再返回
+            self.updates = [u for u in self.updates if u['update_id'] >= offset]
+            while not self.updates:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            return list(self.updates[:limit])
+
+    def _send_message(self, params: Dict) -> Dict:
+        if self.send_latency:
+            time.sleep(self.send_latency)
+        with self.condition:
+            message = {
+                'message_id': self.next_message_id,
+                'chat_id': params.get('chat_id'),
+                'text': params.get('text', ''),
+                'date': int(time.time()),
+                'sent_at': time.monotonic(),
+            }
+            self.next_message_id += 1
+            self.sent.append(message)
+            self.condition.notify_all()
+        return {'message_id': message['message_id'], 'date': message['date'],
+                'chat': {'id': message['chat_id']}, 'text': message['text']}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict):
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                raw = self.rfile.read(length) if length else b''
+                try:
+                    params = json.loads(raw or b'{}')
+                except ValueError:
+                    self._send_json(400, {'ok': False, 'error_code': 400, 'description': 'Bad Request'})
+                    return
+
+                path = self.path.split('?')[0]
+                if path == '/_push':
+                    update_id = server.push_update(int(params.get('chat_id', 1)), params.get('text', ''),
+                                                   params.get('user_id'))
+                    self._send_json(200, {'ok': True, 'result': {'update_id': update_id}})
+                    return
+
+                parts = path.strip('/').split('/')
+                if len(parts) != 2 or not parts[0].startswith('bot'):
+                    self._send_json(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+                    return
+
+                method = parts[1]
+                with server.lock:
+                    server.stats['requests'] += 1
+                if method == 'getUpdates':
+                    with server.lock:
+                        server.stats['get_updates'] += 1
+                    self._send_json(200, {'ok': True, 'result': server._get_updates(params)})
+                elif method == 'sendMessage':
+                    with server.lock:
+                        server.stats['send_message'] += 1
+                    self._send_json(200, {'ok': True, 'result': server._send_message(params)})
+                elif method == 'getMe':
+                    self._send_json(200, {'ok': True, 'result': {'id': 1, 'is_bot': True,
+                                                                 'first_name': 'FakeNewsBot'}})
+                else:
+                    self._send_json(200, {'ok': True, 'result': True})
+
+            do_GET = do_POST
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟Telegram Bot API服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--send-latency', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeTelegramServer(host=args.host, port=args.port, send_latency=args.send_latency)
+    print(f"模拟Telegram服务已启动: {server.url}")
+    print(f"使用方法: 设置环境变量 TELEGRAM_API_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n已停止")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
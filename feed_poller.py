@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+按更新频率调度的RSS轮询
+- 每个feed单独估计新条目到达速率（首轮按条目发布时间估计，之后按每次轮询发现的新条目做指数移动平均），
+  轮询间隔取 1/(2×速率)，限制在[min_interval, max_interval]：更新快的滚动新闻频繁轮询，更新慢的博客很少轮询
+- 条件请求（ETag / If-Modified-Since），feed没有变化时服务器返回304，不传输、不解析
+- 只把相对上次轮询新出现的条目交给处理函数（增量抓取）
+- 各feed的速率、间隔和缓存校验值保存在数据库（kv表），重启后沿用
+- 实时提醒（alert_stream.py）和持续入库（python feed_poller.py）共用
+"""
+import argparse
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+
+from config import config
+from date_parser import to_local_iso
+from url_normalizer import canonicalize_url
+
+
+class FeedState:
+    """单个feed的轮询状态"""
+
+    def __init__(self, source: str, url: str, interval: float):
+        self.source = source
+        self.url = url
+        self.interval = interval
+        self.next_poll = 0.0
+        self.last_poll = None
+        self.rate = None        # 新条目到达速率（条/秒，指数移动平均）
+        self.fetch_time = None  # 平均请求耗时（秒）
+        self.etag = None
+        self.last_modified = None
+        self.seen = None        # 上次轮询时feed中的条目URL（None表示本进程尚未成功轮询）
+        self.polls = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.new_items = 0
+        self.active = True
+
+    def to_dict(self) -> Dict:
+        """需要跨运行保存的状态"""
+        return {'rate': self.rate, 'interval': self.interval, 'fetch_time': self.fetch_time,
+                'etag': self.etag, 'last_modified': self.last_modified}
+
+    def restore(self, saved: Dict, min_interval: float, max_interval: float):
+        self.rate = saved.get('rate')
+        self.fetch_time = saved.get('fetch_time')
+        self.etag = saved.get('etag')
+        self.last_modified = saved.get('last_modified')
+        if saved.get('interval'):
+            self.interval = min(max(saved['interval'], min_interval), max_interval)
+
+
+class FeedPoller:
+    """按更新频率调度的feed轮询器"""
+
+    def __init__(self, fetcher, feeds: List[FeedState], min_interval: float = 60, max_interval: float = 1800,
+                 workers: int = 4, timeout: float = 15, max_feeds: Optional[int] = None,
+                 state_key: Optional[str] = 'feed_poller.state'):
+        """
+        Args:
+            fetcher: NewsFetcher（请求经其限速和代理路由，条目发布时间用其解析）
+            feeds: 要轮询的feed
+            min_interval: 最短轮询间隔（秒）
+            max_interval: 最长轮询间隔（秒）
+            workers: 并发请求数
+            timeout: 单次请求超时（秒）
+            max_feeds: 首轮后只保留响应最快的feed数，None表示全部保留
+            state_key: 状态保存在kv表中的键，None表示不保存
+        """
+        self.fetcher = fetcher
+        self.feeds = feeds
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_feeds = max_feeds
+        self.state_key = state_key
+        self.session = requests.Session()
+        self.pruned = max_feeds is None
+        self.stats = {'polls': 0, 'errors': 0, 'not_modified': 0, 'new_items': 0}
+        self.running = False
+        self.last_save = time.monotonic()
+        self.load()
+
+    @staticmethod
+    def feeds_for(fetcher, sources: Optional[List[str]] = None, interval: float = 300) -> List[FeedState]:
+        """启用的RSS源的全部feed"""
+        feeds = []
+        for source_name, source_config in fetcher.sources.items():
+            if sources is not None and source_name not in sources:
+                continue
+            if not source_config.get('enabled', False) or source_config.get('type', 'rss') != 'rss':
+                continue
+            for feed_url in source_config.get('rss_feeds', []):
+                feeds.append(FeedState(source_name, feed_url, interval))
+        return feeds
+
+    @classmethod
+    def from_config(cls, fetcher, sources: Optional[List[str]] = None) -> 'FeedPoller':
+        """从config.yaml的feed_polling配置创建"""
+        poll_config = config.load_yaml_config().get('feed_polling') or {}
+        feeds = cls.feeds_for(fetcher, sources or poll_config.get('sources') or None,
+                              poll_config.get('initial_interval', 300))
+        return cls(fetcher, feeds,
+                   min_interval=poll_config.get('min_interval', 60),
+                   max_interval=poll_config.get('max_interval', 1800),
+                   workers=poll_config.get('workers', 4),
+                   timeout=poll_config.get('timeout', 15))
+
+    # ==================== 抓取 ====================
+
+    def fetch_feed(self, feed: FeedState) -> Optional[List[Dict]]:
+        """
+        条件请求feed并解析条目（只取标题、链接、描述和发布时间，不抓全文）
+
+        Returns:
+            条目列表；feed未变化（304）时返回None
+        """
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        # 本进程首次轮询不带校验值：需要完整条目列表作为增量基线
+        if feed.seen is not None:
+            if feed.etag:
+                headers['If-None-Match'] = feed.etag
+            if feed.last_modified:
+                headers['If-Modified-Since'] = feed.last_modified
+        response = self.fetcher.http_get(feed.url, session=self.session, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        feed.etag = response.headers.get('ETag') or feed.etag
+        feed.last_modified = response.headers.get('Last-Modified') or feed.last_modified
+        soup = BeautifulSoup(response.content, 'xml')
+
+        items = []
+        for entry in soup.find_all(['item', 'entry']):
+            title = entry.find('title')
+            link = entry.find('link')
+            if not title or not link:
+                continue
+            url = canonicalize_url(link.get('href') or link.get_text(strip=True), feed.url)
+            description = entry.find(['description', 'summary', 'content'])
+            items.append({
+                'title': title.get_text(strip=True),
+                'url': url,
+                'summary': BeautifulSoup(description.get_text(), 'lxml').get_text(' ', strip=True)[:500]
+                if description else '',
+                'source': feed.source,
+                'published_at': self.fetcher._entry_published(entry),
+            })
+        return items
+
+    def _poll(self, feed: FeedState):
+        """轮询一个feed，返回(条目或None, 耗时, 错误)"""
+        started = time.monotonic()
+        try:
+            return self.fetch_feed(feed), time.monotonic() - started, None
+        except Exception as e:
+            return [], time.monotonic() - started, e
+
+    # ==================== 间隔调整 ====================
+
+    @staticmethod
+    def rate_from_items(items: List[Dict]) -> Optional[float]:
+        """按feed中条目的发布时间估计到达速率（条/秒），发布时间不足3个时返回None"""
+        times = sorted(item['published_at'].timestamp() for item in items if item.get('published_at') is not None)
+        if len(times) < 3 or times[-1] <= times[0]:
+            return None
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def update_schedule(self, feed: FeedState, new_count: int, elapsed: float, failed: bool,
+                        items: Optional[List[Dict]] = None):
+        """按新条目到达速率调整轮询间隔：期望每个新条目到达后半个间期内被发现"""
+        now = time.monotonic()
+        feed.fetch_time = elapsed if feed.fetch_time is None else 0.7 * feed.fetch_time + 0.3 * elapsed
+
+        if failed:
+            feed.interval = min(feed.interval * 2, self.max_interval)
+        elif feed.last_poll is None:
+            # 首次轮询：用条目发布时间估计（没有保存的速率时）
+            if feed.rate is None and items:
+                feed.rate = self.rate_from_items(items)
+            if feed.rate:
+                feed.interval = min(max(1 / (2 * feed.rate), self.min_interval), self.max_interval)
+        else:
+            observed = new_count / max(now - feed.last_poll, 1e-6)
+            feed.rate = observed if feed.rate is None else 0.7 * feed.rate + 0.3 * observed
+            if feed.rate > 0:
+                feed.interval = min(max(1 / (2 * feed.rate), self.min_interval), self.max_interval)
+            else:
+                feed.interval = min(feed.interval * 1.5, self.max_interval)
+
+        if not failed:
+            feed.last_poll = now
+        feed.next_poll = now + feed.interval
+
+    def _prune_slow_feeds(self):
+        """首轮轮询后只保留响应最快的max_feeds个可用feed"""
+        candidates = [f for f in self.feeds if f.polls > f.errors]
+        if not candidates:
+            # 全部失败时暂不筛选，按退避后的间隔继续重试
+            return
+        candidates.sort(key=lambda f: f.fetch_time)
+        keep = set(id(f) for f in candidates[:self.max_feeds])
+        for feed in self.feeds:
+            feed.active = id(feed) in keep
+        self.pruned = True
+        print(f"保留最快的 {len(keep)} 个feed：" +
+              ', '.join(f"{f.source}({f.fetch_time:.1f}s)" for f in candidates[:self.max_feeds]))
+
+    def _handle_result(self, feed: FeedState, items: Optional[List[Dict]], elapsed: float, error,
+                       handler: Callable[[FeedState, List[Dict], bool], None]):
+        feed.polls += 1
+        self.stats['polls'] += 1
+        if error is not None:
+            feed.errors += 1
+            self.stats['errors'] += 1
+            self.update_schedule(feed, 0, elapsed, failed=True)
+            return
+        if items is None:
+            feed.not_modified += 1
+            self.stats['not_modified'] += 1
+            self.update_schedule(feed, 0, elapsed, failed=False)
+            return
+
+        baseline = feed.seen is None
+        urls = [item['url'] for item in items if item['url']]
+        new_items = [item for item in items if item['url'] and (baseline or item['url'] not in feed.seen)]
+        feed.seen = set(urls)
+        if not baseline:
+            feed.new_items += len(new_items)
+            self.stats['new_items'] += len(new_items)
+        self.update_schedule(feed, 0 if baseline else len(new_items), elapsed, failed=False, items=items)
+        if new_items:
+            try:
+                handler(feed, new_items, baseline)
+            except Exception as e:
+                print(f"  [WARN] 处理 {feed.source} 新条目失败: {str(e)[:80]}")
+
+    # ==================== 运行 ====================
+
+    def run(self, handler: Callable[[FeedState, List[Dict], bool], None], duration: Optional[float] = None,
+            stop_event: Optional[threading.Event] = None):
+        """
+        持续轮询，到期的feed并发请求
+
+        Args:
+            handler: handler(feed, 新条目, 是否基线)；基线为本进程对该feed的首次成功轮询，条目不一定是新发布的
+            duration: 运行秒数，None表示一直运行（Ctrl+C或stop()停止）
+            stop_event: 设置后停止
+        """
+        self.running = True
+        end = time.monotonic() + duration if duration else None
+
+        def should_run():
+            return self.running and (end is None or time.monotonic() < end) and \
+                (stop_event is None or not stop_event.is_set())
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+            try:
+                while should_run():
+                    now = time.monotonic()
+                    polling = set(id(f) for f in pending.values())
+                    due = [(f.next_poll, i) for i, f in enumerate(self.feeds)
+                           if f.active and id(f) not in polling]
+                    heapq.heapify(due)
+                    while due and due[0][0] <= now:
+                        feed = self.feeds[heapq.heappop(due)[1]]
+                        pending[executor.submit(self._poll, feed)] = feed
+
+                    timeout = min(max(due[0][0] - now, 0.0), 1.0) if due else 1.0
+                    if not pending:
+                        time.sleep(timeout)
+                        continue
+                    done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        feed = pending.pop(future)
+                        items, elapsed, error = future.result()
+                        self._handle_result(feed, items, elapsed, error, handler)
+
+                    if not self.pruned and all(f.polls > 0 for f in self.feeds):
+                        self._prune_slow_feeds()
+                    if time.monotonic() - self.last_save > 300:
+                        self.save()
+            except KeyboardInterrupt:
+                print("\n已停止")
+            finally:
+                self.running = False
+                self.save()
+
+    def stop(self):
+        """停止轮询"""
+        self.running = False
+
+    # ==================== 持久化 ====================
+
+    def load(self):
+        """恢复各feed保存的速率、间隔和缓存校验值"""
+        if not self.state_key:
+            return
+        saved = self.fetcher.store.get_value(self.state_key) or {}
+        for feed in self.feeds:
+            if feed.url in saved:
+                feed.restore(saved[feed.url], self.min_interval, self.max_interval)
+
+    def save(self):
+        """保存各feed状态（与已保存的其他feed合并）"""
+        self.last_save = time.monotonic()
+        if not self.state_key:
+            return
+        try:
+            saved = self.fetcher.store.get_value(self.state_key) or {}
+            saved.update({feed.url: feed.to_dict() for feed in self.feeds if feed.polls})
+            self.fetcher.store.set_value(self.state_key, saved)
+        except Exception as e:
+            print(f"  [WARN] 保存feed轮询状态失败: {str(e)[:80]}")
+
+    def print_stats(self):
+        """打印轮询统计和各feed的间隔、更新速率"""
+        print(f"feed轮询：{self.stats['polls']} 次（失败 {self.stats['errors']}，未变化 {self.stats['not_modified']}），"
+              f"新条目 {self.stats['new_items']}")
+        for feed in sorted(self.feeds, key=lambda f: f.interval):
+            if not feed.active:
+                continue
+            rate = f"{feed.rate * 3600:.1f}条/小时" if feed.rate is not None else '-'
+            fetch_time = f"{feed.fetch_time:.1f}s" if feed.fetch_time is not None else '-'
+            print(f"  {feed.source:<16} 间隔 {feed.interval:>5.0f}s  更新 {rate:>12}  请求耗时 {fetch_time:>6}  "
+                  f"304 {feed.not_modified:>3}  新条目 {feed.new_items:>4}  {feed.url[:50]}")
+
+
+class FeedIngester:
+    """持续入库：feed新条目过滤过期文章后写入数据库、检索索引、归档和提及历史（不抓全文、不翻译）"""
+
+    def __init__(self, fetcher, poller: FeedPoller):
+        self.fetcher = fetcher
+        self.poller = poller
+        self.ingested = 0
+        # 跨feed去重（同一源的多个feed常含同一篇文章）
+        self.seen_urls = OrderedDict()
+
+    def handle(self, feed: FeedState, items: List[Dict], baseline: bool):
+        articles = []
+        for item in items:
+            if item['url'] in self.seen_urls or self.fetcher.is_stale(item['published_at']):
+                continue
+            self.seen_urls[item['url']] = True
+            if len(self.seen_urls) > 50000:
+                self.seen_urls.popitem(last=False)
+            content = item['summary'] or item['title']
+            articles.append({
+                'title': item['title'],
+                'url': item['url'],
+                'content': content[:2000],
+                'summary': self.fetcher._generate_summary(item['title'], content),
+                'source': feed.source,
+                'published_at': to_local_iso(item['published_at']),
+                'fetched_at': datetime.now().isoformat()
+            })
+        if articles:
+            self.fetcher._notify_articles(articles)
+            self.ingested += len(articles)
+            print(f"  [{feed.source}] 入库 {len(articles)} 篇{'（基线）' if baseline else ''}")
+
+    def run(self, duration: Optional[float] = None, stop_event: Optional[threading.Event] = None):
+        print(f"持续入库已启动：{len(self.poller.feeds)} 个feed")
+        self.poller.run(self.handle, duration=duration, stop_event=stop_event)
+        self.fetcher.store.flush()
+        print("-" * 60)
+        print(f"入库 {self.ingested} 篇")
+        self.poller.print_stats()
+        print("-" * 60)
+
+
+def main():
+    from news_fetcher_v2 import NewsFetcher
+
+    parser = argparse.ArgumentParser(description='按更新频率轮询RSS并持续入库')
+    parser.add_argument('--duration', type=float, default=None, help='运行秒数（默认一直运行）')
+    parser.add_argument('--sources', nargs='*', default=None, help='只轮询这些源')
+    args = parser.parse_args()
+
+    fetcher = NewsFetcher()
+    FeedIngester(fetcher, FeedPoller.from_config(fetcher, args.sources)).run(duration=args.duration)
+
+
+if __name__ == '__main__':
+    main()
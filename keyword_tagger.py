@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+关键词标注（Aho-Corasick多模式匹配）
+- 把config.yaml的keywords（股指、行业、公司）编译为一个自动机，一次线性扫描找出全部命中
+- 忽略大小写；英文词可要求词边界（"AI"不匹配"SAID"），允许复数后缀s（"Chip"匹配"chips"）
+- 中文词不做边界限制
+- 配置文件修改后自动重建，否则复用已编译的自动机
+"""
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from config import config
+
+CONFIG_FILE = Path(__file__).parent / 'config' / 'config.yaml'
+
+
+def _fold(text: str) -> str:
+    """转小写并保持长度不变（个别字符小写后变长时保留原字符），保证匹配位置与原文一致"""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def _is_latin(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+class AhoCorasick:
+    """Aho-Corasick自动机"""
+
+    def __init__(self, patterns: List[str]):
+        """
+        Args:
+            patterns: 模式串列表（调用方负责大小写归一）
+        """
+        self.patterns = patterns
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for index, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(index)
+
+        # 广度优先计算失败指针，并合并后缀状态的输出
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self.goto[state].items():
+                pending.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """扫描文本，依次产出(起始位置, 结束位置, 模式序号)"""
+        state = 0
+        goto, fail, output, patterns = self.goto, self.fail, self.output, self.patterns
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                yield position + 1 - len(patterns[index]), position + 1, index
+
+
+class KeywordTagger:
+    """按分类标注关键词命中"""
+
+    def __init__(self, keywords: Dict[str, List[str]], word_boundaries: bool = True):
+        """
+        Args:
+            keywords: 分类 -> 关键词列表（格式同config.yaml的keywords）
+            word_boundaries: 英文词是否要求词边界
+        """
+        self.word_boundaries = word_boundaries
+        # 同一个词可能出现在多个分类中，按归一后的词合并
+        terms = {}
+        for category, words in (keywords or {}).items():
+            for word in words or []:
+                word = str(word).strip()
+                if not word:
+                    continue
+                folded = _fold(word)
+                entry = terms.setdefault(folded, (word, []))
+                if category not in entry[1]:
+                    entry[1].append(category)
+        self.terms = [(folded, word, categories) for folded, (word, categories) in terms.items()]
+        self.automaton = AhoCorasick([folded for folded, _, _ in self.terms])
+
+    @classmethod
+    def from_config(cls) -> 'KeywordTagger':
+        """从config.yaml的keywords和keyword_matching配置创建"""
+        yaml_config = config.load_yaml_config()
+        matching = yaml_config.get('keyword_matching') or {}
+        return cls(yaml_config.get('keywords') or {}, word_boundaries=matching.get('word_boundaries', True))
+
+    def _at_boundary(self, text: str, start: int, end: int, term: str) -> Tuple[bool, int]:
+        """检查英文词边界，返回(是否满足, 实际结束位置)"""
+        if start > 0 and _is_latin(term[0]) and _is_latin(text[start - 1]):
+            return False, end
+        if end < len(text) and _is_latin(term[-1]):
+            # 允许英文复数后缀
+            if text[end] == 's' and term[-1].isalpha() and (end + 1 == len(text) or not _is_latin(text[end + 1])):
+                return True, end + 1
+            if _is_latin(text[end]):
+                return False, end
+        return True, end
+
+    def find(self, text: str) -> List[Tuple[int, int, str, List[str]]]:
+        """
+        找出全部命中
+
+        Returns:
+            [(起始位置, 结束位置, 配置中的关键词, 所属分类列表)]
+        """
+        if not text or not self.terms:
+            return []
+        folded = _fold(text)
+        matches = []
+        for start, end, index in self.automaton.iter_matches(folded):
+            term, word, categories = self.terms[index]
+            if self.word_boundaries:
+                ok, end = self._at_boundary(folded, start, end, term)
+                if not ok:
+                    continue
+            matches.append((start, end, word, categories))
+        return matches
+
+    def tag(self, text: str) -> Dict[str, List[str]]:
+        """标注文本命中的关键词，返回分类 -> 关键词列表（按首次出现顺序，去重）"""
+        tags = {}
+        for _, _, word, categories in self.find(text):
+            for category in categories:
+                words = tags.setdefault(category, [])
+                if word not in words:
+                    words.append(word)
+        return tags
+
+    def tag_article(self, article: Dict) -> Dict[str, List[str]]:
+        """标注文章（标题 + 正文，正文缺失时使用摘要）"""
+        text = f"{article.get('title') or ''}\n{article.get('content') or article.get('summary') or ''}"
+        return self.tag(text)
+
+
+_default_tagger = None
+_default_mtime = None
+_default_lock = threading.Lock()
+
+
+def get_keyword_tagger() -> KeywordTagger:
+    """获取按当前config.yaml编译的标注器（配置文件修改后重建）"""
+    global _default_tagger, _default_mtime
+    try:
+        mtime = CONFIG_FILE.stat().st_mtime
+    except OSError:
+        mtime = None
+    with _default_lock:
+        if _default_tagger is None or mtime != _default_mtime:
+            _default_tagger = KeywordTagger.from_config()
+            _default_mtime = mtime
+        return _default_tagger
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+关键词提及历史（列式存储）
+- 每篇文章一行：文章ID（URL哈希）、日期（距1970-01-01天数）、来源ID、关键词命中位图
+- 每列是一个定长二进制文件（data/history/*.bin），用NumPy内存映射读取，不解析JSON
+- 抓取时增量追加；meta.json保存行数、关键词和来源字典，数据写入后再更新行数，中途崩溃不会读到半行
+- 位图扩宽时写入新宽度的hits文件（hits.w{字数}.bin），meta.json更新字数即切换，中途崩溃仍读旧文件
+- 查询为向量化聚合：如"近90天NVIDIA每天每个来源的提及数"只需一次位运算和一次bincount
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from keyword_tagger import get_keyword_tagger
+
+try:
+    import fcntl
+except ImportError:  # Windows：只做进程内加锁
+    fcntl = None
+
+_EPOCH = date(1970, 1, 1)
+
+# 列名 -> 数据类型（hits列每行有words个uint64）
+_COLUMNS = {
+    'article_id': np.uint64,
+    'day': np.int32,
+    'source_id': np.uint16,
+    'hits': np.uint64,
+}
+
+
+def article_id(url: str) -> int:
+    """URL的64位哈希"""
+    return int.from_bytes(hashlib.sha1((url or '').encode('utf-8')).digest()[:8], 'little')
+
+
+def day_number(value) -> int:
+    """日期（date/datetime/ISO字符串）转为距1970-01-01的天数"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+def day_to_date(day: int) -> date:
+    return _EPOCH + timedelta(days=int(day))
+
+
+class MentionHistory:
+    """关键词提及的列式历史（线程安全，支持多进程追加的平台上使用文件锁）"""
+
+    def __init__(self, root: Optional[Path] = None):
+        """
+        Args:
+            root: 存储目录，默认data/history
+        """
+        self.root = Path(root) if root else Path(__file__).parent / 'data' / 'history'
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.meta_path = self.root / 'meta.json'
+        self.lock = threading.Lock()
+        self.meta = self._load_meta()
+        self._views = None      # (行数, 位图字数, {列名: memmap})
+        self._known_ids = None  # 已写入的文章ID集合（去重用）
+
+    # ==================== 元数据 ====================
+
+    def _load_meta(self) -> Dict:
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # entities: [关键词]，位序号即列表下标；categories: 关键词 -> 分类列表
+            return {'rows': 0, 'words': 1, 'entities': [], 'categories': {}, 'sources': []}
+
+    def _save_meta(self):
+        tmp_path = self.meta_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+
+    def _column_path(self, name: str, words: Optional[int] = None) -> Path:
+        """列文件路径；hits列按位图字数区分文件（1个字时为hits.bin）"""
+        if name == 'hits':
+            words = words or self.meta['words']
+            if words > 1:
+                return self.root / f"hits.w{words}.bin"
+        return self.root / f"{name}.bin"
+
+    def _entity_bit(self, term: str, categories: List[str]) -> int:
+        """关键词的位序号（新关键词追加到末尾，位图不够宽时扩展）"""
+        entities = self.meta['entities']
+        known = self.meta['categories']
+        if term not in known:
+            entities.append(term)
+            known[term] = list(categories)
+            if len(entities) > self.meta['words'] * 64:
+                self._widen(self.meta['words'] * 2)
+        else:
+            for category in categories:
+                if category not in known[term]:
+                    known[term].append(category)
+        return entities.index(term)
+
+    def _widen(self, words: int):
+        """
+        扩展位图宽度（低位保持不变）
+
+        新宽度的hits列写入另一个文件，落盘后再由meta.json的words切换过去：
+        切换前崩溃时meta仍指向旧文件，新文件下次扩宽时覆盖
+        """
+        old_words = self.meta['words']
+        rows = self.meta['rows']
+        old_path = self._column_path('hits', old_words)
+        old = np.fromfile(old_path, dtype=np.uint64, count=rows * old_words).reshape(rows, old_words) \
+            if rows else np.zeros((0, old_words), dtype=np.uint64)
+        new = np.zeros((rows, words), dtype=np.uint64)
+        new[:, :old_words] = old
+        new_path = self._column_path('hits', words)
+        with open(new_path, 'wb') as f:
+            f.write(new.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self.meta['words'] = words
+        self._save_meta()
+        self._views = None
+        if old_path.exists():
+            old_path.unlink()
+
+    def _source_id(self, source: str) -> int:
+        sources = self.meta['sources']
+        if source not in sources:
+            sources.append(source)
+        return sources.index(source)
+
+    # ==================== 追加 ====================
+
+    def append(self, articles: Iterable[Dict]) -> int:
+        """
+        追加文章（同一URL只记录一次）；优先使用抓取时已标注的article['tags']
+
+        Returns:
+            新写入的行数
+        """
+        articles = [article for article in articles if article.get('url')]
+        if not articles:
+            return 0
+
+        with self.lock:
+            lock_file = open(self.root / '.lock', 'a')
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # 其他进程可能已追加，重新读取元数据
+                meta = self._load_meta()
+                if meta['rows'] != self.meta['rows'] or meta['words'] != self.meta['words']:
+                    self.meta = meta
+                    self._views = None
+                    self._known_ids = None
+                known_ids = self._ids()
+
+                tagger = None
+                ids, days, source_ids, bitsets = [], [], [], []
+                for article in articles:
+                    aid = article_id(article['url'])
+                    if aid in known_ids:
+                        continue
+                    known_ids.add(aid)
+                    tags = article.get('tags')
+                    if tags is None:
+                        tagger = tagger or get_keyword_tagger()
+                        tags = tagger.tag_article(article)
+                    terms = {}
+                    for category, words in tags.items():
+                        for word in words:
+                            terms.setdefault(word, []).append(category)
+                    bits = [self._entity_bit(term, categories) for term, categories in terms.items()]
+                    timestamp = article.get('published_at') or article.get('fetched_at') or datetime.now().isoformat()
+                    ids.append(aid)
+                    days.append(day_number(timestamp))
+                    source_ids.append(self._source_id(article.get('source') or 'unknown'))
+                    bitsets.append(bits)
+                if not ids:
+                    return 0
+
+                words = self.meta['words']
+                hits = np.zeros((len(ids), words), dtype=np.uint64)
+                for row, bits in enumerate(bitsets):
+                    for bit in bits:
+                        hits[row, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+
+                rows = self.meta['rows']
+                columns = {'article_id': np.array(ids, dtype=np.uint64), 'day': np.array(days, dtype=np.int32),
+                           'source_id': np.array(source_ids, dtype=np.uint16), 'hits': hits}
+                for name, values in columns.items():
+                    path = self._column_path(name)
+                    with open(path, 'r+b' if path.exists() else 'wb') as f:
+                        # 截掉上次崩溃留下的未提交数据
+                        width = words if name == 'hits' else 1
+                        f.truncate(rows * width * np.dtype(_COLUMNS[name]).itemsize)
+                        f.seek(0, os.SEEK_END)
+                        f.write(values.tobytes())
+                self.meta['rows'] = rows + len(ids)
+                self._save_meta()
+                self._views = None
+                return len(ids)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+    def _ids(self) -> set:
+        if self._known_ids is None:
+            self._known_ids = set(self._columns()['article_id'].tolist())
+        return self._known_ids
+
+    # ==================== 查询 ====================
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        """已提交行的内存映射视图（行数变化时重建）"""
+        rows, words = self.meta['rows'], self.meta['words']
+        if self._views is not None and self._views[0] == rows and self._views[1] == words:
+            return self._views[2]
+        views = {}
+        for name, dtype in _COLUMNS.items():
+            shape = (rows, words) if name == 'hits' else (rows,)
+            if rows == 0:
+                views[name] = np.zeros(shape, dtype=dtype)
+            else:
+                views[name] = np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=shape)
+        self._views = (rows, words, views)
+        return views
+
+    def refresh(self):
+        """重新读取元数据（查看其他进程追加的数据）"""
+        with self.lock:
+            meta = self._load_meta()
+            if meta['rows'] != self.meta['rows'] or meta['words'] != self.meta['words']:
+                self.meta = meta
+                self._views = None
+                self._known_ids = None
+
+    def resolve(self, name: str) -> List[str]:
+        """把关键词或分类名（忽略大小写）解析为关键词列表"""
+        folded = name.strip().lower()
+        terms = [term for term in self.meta['entities'] if term.lower() == folded]
+        if not terms:
+            terms = [term for term, categories in self.meta['categories'].items()
+                     if folded in (c.lower() for c in categories)]
+        return terms
+
+    def _mask(self, hits: np.ndarray, terms: List[str]) -> np.ndarray:
+        """命中任一关键词的行"""
+        words = self.meta['words']
+        query = np.zeros(words, dtype=np.uint64)
+        for term in terms:
+            bit = self.meta['entities'].index(term)
+            query[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return (hits & query).any(axis=1)
+
+    def mentions(self, name: str, days: int = 90, sources: Optional[List[str]] = None,
+                 end: Optional[date] = None) -> Dict:
+        """
+        每天每个来源的提及文章数
+
+        Args:
+            name: 关键词或分类名（如"NVIDIA"、"companies"）
+            days: 统计最近几天（含end当天）
+            sources: 只统计这些来源
+            end: 截止日期，默认今天
+
+        Returns:
+            {'name': 查询名, 'terms': 关键词列表, 'dates': [date], 'sources': [来源],
+             'counts': ndarray(天数, 来源数), 'total': 总提及数}
+        """
+        self.refresh()
+        terms = self.resolve(name)
+        end_day = day_number(end or date.today())
+        start_day = end_day - days + 1
+        all_sources = self.meta['sources']
+        result = {'name': name, 'terms': terms, 'dates': [day_to_date(d) for d in range(start_day, end_day + 1)],
+                  'sources': list(all_sources), 'counts': np.zeros((days, len(all_sources)), dtype=np.int64),
+                  'total': 0}
+        if not terms or not self.meta['rows']:
+            return result
+
+        columns = self._columns()
+        day = columns['day']
+        mask = (day >= start_day) & (day <= end_day)
+        if sources is not None:
+            wanted = [all_sources.index(s) for s in sources if s in all_sources]
+            mask &= np.isin(columns['source_id'], wanted)
+        rows = np.flatnonzero(mask)
+        rows = rows[self._mask(columns['hits'][rows], terms)]
+
+        n_sources = len(all_sources)
+        flat = (day[rows] - start_day).astype(np.int64) * n_sources + columns['source_id'][rows]
+        counts = np.bincount(flat, minlength=days * n_sources).reshape(days, n_sources)
+        result['counts'] = counts
+        result['total'] = int(counts.sum())
+        return result
+
+    def top_entities(self, days: int = 7, limit: int = 10, category: Optional[str] = None) -> List[tuple]:
+        """最近几天提及最多的关键词，返回[(关键词, 次数)]"""
+        self.refresh()
+        if not self.meta['rows']:
+            return []
+        columns = self._columns()
+        start_day = day_number(date.today()) - days + 1
+        hits = columns['hits'][columns['day'] >= start_day]
+        # 按位展开后按列求和
+        bits = np.unpackbits(np.ascontiguousarray(hits).view(np.uint8), axis=1, bitorder='little')
+        counts = bits.sum(axis=0)[:len(self.meta['entities'])]
+        ranked = []
+        for index in np.argsort(-counts, kind='stable'):
+            term = self.meta['entities'][index]
+            if counts[index] == 0 or len(ranked) >= limit:
+                break
+            if category is None or category in self.meta['categories'].get(term, []):
+                ranked.append((term, int(counts[index])))
+        return ranked
+
+    def count(self) -> int:
+        return self.meta['rows']
+
+
+_default_history = None
+_default_lock = threading.Lock()
+
+
+def get_mention_history() -> MentionHistory:
+    """获取进程内共享的提及历史"""
+    global _default_history
+    with _default_lock:
+        if _default_history is None:
+            _default_history = MentionHistory()
+        return _default_history
+
+
+def format_mentions(result: Dict, source_names: Optional[Dict[str, str]] = None, max_days: int = 14) -> str:
+    """格式化提及统计（按来源汇总 + 每日走势）"""
+    terms = result['terms']
+    days = len(result['dates'])
+    if not terms:
+        return "未找到该关键词（需为config.yaml中的关键词或分类名）"
+    source_names = source_names or {}
+    counts = result['counts']
+    # 按分类查询时显示分类名，否则显示配置中的关键词写法
+    title = terms[0] if len(terms) == 1 and terms[0].lower() == result['name'].strip().lower() else result['name']
+    lines = [f"📈 {title} 近{days}天提及 {result['total']} 篇", "=" * 40]
+
+    per_source = counts.sum(axis=0)
+    ranked = [i for i in np.argsort(-per_source, kind='stable') if per_source[i] > 0]
+    if ranked:
+        lines.append("按来源:")
+        for i in ranked[:8]:
+            source = result['sources'][i]
+            lines.append(f"  {source_names.get(source, source)}: {int(per_source[i])}")
+
+    per_day = counts.sum(axis=1)
+    bars = '▁▂▃▄▅▆▇█'
+    peak = per_day.max() if len(per_day) else 0
+    if peak:
+        lines.append("")
+        lines.append("走势: " + ''.join(bars[min(int(v * 7 / peak + 0.5), 7)] if v else ' ' for v in per_day))
+        lines.append(f"按日（最近{min(days, max_days)}天）:")
+        for d, v in list(zip(result['dates'], per_day))[-max_days:]:
+            lines.append(f"  {d.strftime('%m-%d')}  {int(v)}")
+    return "\n".join(lines)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Telegram消息打包
+- 在4096字符限制内把新闻条目和标题装入尽量少的消息
+- 只在条目、段落、行（必要时句子）边界拆分
+- 单条超长的新闻按段落拆成多段，续段仍可与后续条目合并
+"""
+import re
+from typing import List, Optional
+
+# Telegram单条消息上限（按UTF-16码元计数，emoji占2个）
+TELEGRAM_MAX_CHARS = 4096
+
+# 拆分超长文本时依次尝试的边界：段落 > 行 > 句子 > 空格
+_SPLIT_LEVELS = [
+    re.compile(r'(?<=\n\n)'),
+    re.compile(r'(?<=\n)'),
+    re.compile(r'(?<=[。！？；!?;])|(?<=[.!?] )'),
+    re.compile(r'(?<= )'),
+]
+
+
+def text_length(text: str) -> int:
+    """按Telegram计数方式（UTF-16码元）计算长度"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _fits(text: str, max_chars: int, max_bytes: Optional[int]) -> bool:
+    if text_length(text) > max_chars:
+        return False
+    return max_bytes is None or len(text.encode('utf-8')) <= max_bytes
+
+
+def _hard_split(text: str, max_chars: int, max_bytes: Optional[int]) -> List[str]:
+    """无可用边界时按字符硬切"""
+    parts = []
+    current = ''
+    for char in text:
+        if current and not _fits(current + char, max_chars, max_bytes):
+            parts.append(current)
+            current = ''
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _fragments(text: str, max_chars: int, max_bytes: Optional[int], level: int = 0) -> List[str]:
+    """
+    把文本切成各自不超过限制的片段，片段按顺序拼接即为原文
+
+    优先在段落边界切分，片段仍超长时再按行、句子、空格切分，最后才按字符硬切
+    """
+    if _fits(text, max_chars, max_bytes):
+        return [text]
+    if level >= len(_SPLIT_LEVELS):
+        return _hard_split(text, max_chars, max_bytes)
+
+    pieces = [p for p in _SPLIT_LEVELS[level].split(text) if p]
+    fragments = []
+    for piece in pieces:
+        fragments.extend(_fragments(piece, max_chars, max_bytes, level + 1))
+    return fragments
+
+
+def split_text(text: str, max_chars: int = TELEGRAM_MAX_CHARS, max_bytes: Optional[int] = None) -> List[str]:
+    """
+    将超长文本拆成不超过限制的多段
+
+    只在段落、行、句子边界拆分（没有边界时才按字符硬切），并使段数尽量少
+
+    Args:
+        text: 原文
+        max_chars: 每段最大长度（UTF-16码元）
+        max_bytes: 每段最大UTF-8字节数，None表示不限
+    """
+    if _fits(text, max_chars, max_bytes):
+        return [text]
+    packer = MessagePacker(max_chars=max_chars, max_bytes=max_bytes)
+    return packer.add(text) + packer.flush()
+
+
+class MessagePacker:
+    """
+    增量消息打包器
+
+    条目逐个加入，当前消息装满时立即返回可发送的消息，便于边生成边发送；
+    打包结果与pack_messages一次性打包完全相同
+    """
+
+    def __init__(self, header: str = '', item_footer: str = '',
+                 max_chars: int = TELEGRAM_MAX_CHARS, max_bytes: Optional[int] = None):
+        """
+        Args:
+            header: 每条消息开头的标题
+            item_footer: 每个条目后追加的分隔内容
+            max_chars: 每条消息最大长度（UTF-16码元）
+            max_bytes: 每条消息最大UTF-8字节数，None表示不限
+        """
+        self.header = header
+        self.item_footer = item_footer
+        self.max_chars = max_chars
+        self.max_bytes = max_bytes
+        self.room_chars = max_chars - text_length(header) - text_length(item_footer)
+        self.room_bytes = None
+        if max_bytes is not None:
+            self.room_bytes = max_bytes - len(header.encode('utf-8')) - len(item_footer.encode('utf-8'))
+        if self.room_chars <= 0 or (self.room_bytes is not None and self.room_bytes <= 0):
+            raise ValueError("标题和分隔内容已超过单条消息长度限制")
+        self.current = ''
+
+    def add(self, item: str) -> List[str]:
+        """加入一个条目，返回因此装满的消息（可能为空列表）"""
+        if _fits(item, self.room_chars, self.room_bytes):
+            blocks = [item + self.item_footer]
+        else:
+            # 超长条目：分隔内容只跟在最后一个片段后
+            blocks = _fragments(item, self.room_chars, self.room_bytes)
+            blocks[-1] += self.item_footer
+
+        messages = []
+        for block in blocks:
+            if self.current and not _fits(self.header + (self.current + block).rstrip('\n'),
+                                          self.max_chars, self.max_bytes):
+                messages.append(self.header + self.current.rstrip('\n'))
+                self.current = ''
+            self.current += block
+        return messages
+
+    def flush(self) -> List[str]:
+        """返回尚未装满的最后一条消息"""
+        current, self.current = self.current, ''
+        if current.strip():
+            return [self.header + current.rstrip('\n')]
+        return []
+
+
+def pack_messages(items: List[str], header: str = '', item_footer: str = '',
+                  max_chars: int = TELEGRAM_MAX_CHARS, max_bytes: Optional[int] = None) -> List[str]:
+    """
+    按顺序把条目装入尽量少的消息
+
+    保持条目顺序时，逐条贪心装满每条消息即可得到最少的消息数；
+    单条放不下的条目按段落拆开，先填满当前消息的剩余空间，续段接在下一条消息开头
+
+    Args:
+        items: 条目列表（如每条新闻的完整文本）
+        header: 每条消息开头的标题
+        item_footer: 每个条目后追加的分隔内容
+        max_chars: 每条消息最大长度（UTF-16码元）
+        max_bytes: 每条消息最大UTF-8字节数，None表示不限
+
+    Returns:
+        消息文本列表
+    """
+    packer = MessagePacker(header, item_footer, max_chars, max_bytes)
+    messages = []
+    for item in items:
+        messages.extend(packer.add(item))
+    messages.extend(packer.flush())
+    return messages
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+新闻归档（只追加）
+- 按日期和来源分区：data/archive/2026-10-17/cnbc.jsonl.gz
+- 每次追加写入一个独立的gzip块（多个gzip成员直接拼接，标准gzip工具可直接解压整个文件）
+- 每个分区有一个偏移索引（.idx）：块的字节偏移、长度、条数和时间范围，读取时跳过时间范围外的块
+- 流式读取，逐块解压，不把整个分区载入内存
+- 按data_retention_days删除过期分区，并把历史分区的小块合并为大块
+- 多进程：追加和合并对数据文件加排他锁，读取索引时加共享锁；合并替换文件后，等锁的进程重新打开新文件
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import config
+
+try:
+    import fcntl
+except ImportError:  # Windows：只做进程内加锁
+    fcntl = None
+
+DATA_SUFFIX = '.jsonl.gz'
+INDEX_SUFFIX = '.idx'
+
+
+def _partition_key(article: Dict) -> Tuple[str, str, str]:
+    """返回(日期, 来源文件名, 时间戳)，时间戳优先用发布时间"""
+    timestamp = article.get('published_at') or article.get('fetched_at') or datetime.now().isoformat()
+    source = re.sub(r'[^\w\-]', '_', article.get('source') or '') or 'unknown'
+    return timestamp[:10], source, timestamp
+
+
+class BlockIndexEntry:
+    """偏移索引中的一个块"""
+
+    __slots__ = ('offset', 'length', 'count', 'min_time', 'max_time')
+
+    def __init__(self, offset: int, length: int, count: int, min_time: str, max_time: str):
+        self.offset = offset
+        self.length = length
+        self.count = count
+        self.min_time = min_time
+        self.max_time = max_time
+
+    def to_line(self) -> str:
+        return f"{self.offset}\t{self.length}\t{self.count}\t{self.min_time}\t{self.max_time}\n"
+
+    @classmethod
+    def from_line(cls, line: str) -> 'BlockIndexEntry':
+        offset, length, count, min_time, max_time = line.rstrip('\n').split('\t')
+        return cls(int(offset), int(length), int(count), min_time, max_time)
+
+
+class NewsArchive:
+    """按日期和来源分区的只追加归档（线程安全；支持多进程同时追加的平台上使用文件锁）"""
+
+    def __init__(self, root: Optional[Path] = None, block_size: int = 256, compress_level: int = 6):
+        """
+        Args:
+            root: 归档目录，默认data/archive
+            block_size: 每个压缩块最多的记录数
+            compress_level: gzip压缩级别
+        """
+        self.root = Path(root) if root else Path(__file__).parent / 'data' / 'archive'
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.block_size = max(1, block_size)
+        self.compress_level = compress_level
+        self.lock = threading.Lock()
+
+    # ==================== 写入 ====================
+
+    def _paths(self, date: str, source: str) -> Tuple[Path, Path]:
+        directory = self.root / date
+        return directory / f"{source}{DATA_SUFFIX}", directory / f"{source}{INDEX_SUFFIX}"
+
+    @staticmethod
+    def _open_locked(data_path: Path, mode: str, exclusive: bool):
+        """
+        打开分区数据文件并加文件锁（排他或共享）
+
+        等锁期间文件可能被其他进程合并替换，此时锁住的是已删除的旧文件：重新打开，直到锁住当前文件
+        """
+        while True:
+            if 'a' in mode:
+                data_path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(data_path, mode)
+            if fcntl is None:
+                return f
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                if os.fstat(f.fileno()).st_ino == os.stat(data_path).st_ino:
+                    return f
+            except FileNotFoundError:
+                if 'r' in mode:
+                    f.close()
+                    raise
+            f.close()
+
+    @staticmethod
+    def _unlock(f):
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write_blocks(self, data_path: Path, index_path: Path, records: List[Tuple[str, str]]):
+        """把(时间戳, JSON行)追加为若干gzip块，并追加对应的索引"""
+        with self._open_locked(data_path, 'ab', exclusive=True) as data_file:
+            try:
+                offset = data_file.seek(0, os.SEEK_END)
+                entries = []
+                for start in range(0, len(records), self.block_size):
+                    block = records[start:start + self.block_size]
+                    payload = ''.join(line for _, line in block).encode('utf-8')
+                    compressed = gzip.compress(payload, compresslevel=self.compress_level, mtime=0)
+                    data_file.write(compressed)
+                    times = [timestamp for timestamp, _ in block]
+                    entries.append(BlockIndexEntry(offset, len(compressed), len(block), min(times), max(times)))
+                    offset += len(compressed)
+                data_file.flush()
+                os.fsync(data_file.fileno())
+                # 索引在数据落盘后写入；中途崩溃时读取方会扫描索引未覆盖的尾部
+                with open(index_path, 'a', encoding='utf-8') as index_file:
+                    index_file.writelines(entry.to_line() for entry in entries)
+            finally:
+                self._unlock(data_file)
+
+    def append(self, articles: Iterable[Dict]) -> int:
+        """
+        追加文章（按分区分组，每个分区写入一个或多个块）
+
+        Returns:
+            写入的记录数
+        """
+        partitions = {}
+        for article in articles:
+            date, source, timestamp = _partition_key(article)
+            line = json.dumps(article, ensure_ascii=False, default=str) + '\n'
+            partitions.setdefault((date, source), []).append((timestamp, line))
+        if not partitions:
+            return 0
+        with self.lock:
+            for (date, source), records in partitions.items():
+                self._write_blocks(*self._paths(date, source), records)
+        return sum(len(records) for records in partitions.values())
+
+    def writer(self) -> 'ArchiveWriter':
+        """创建缓冲写入器（攒满block_size条或关闭时写入）"""
+        return ArchiveWriter(self)
+
+    # ==================== 读取 ====================
+
+    def _read_index(self, data_path: Path, index_path: Path) -> List[BlockIndexEntry]:
+        """读取分区索引；数据文件比索引覆盖的范围长时扫描尾部补齐"""
+        entries = []
+        if index_path.exists():
+            with open(index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entries.append(BlockIndexEntry.from_line(line))
+        indexed_end = entries[-1].offset + entries[-1].length if entries else 0
+        if data_path.exists() and data_path.stat().st_size > indexed_end:
+            entries.extend(self._scan_blocks(data_path, indexed_end))
+        return entries
+
+    @staticmethod
+    def _scan_blocks(data_path: Path, start: int) -> List[BlockIndexEntry]:
+        """从start开始逐个解压gzip成员，重建索引（用于索引缺失或写入中断的情况）"""
+        with open(data_path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        entries = []
+        offset = start
+        while data:
+            decompressor = zlib.decompressobj(wbits=31)
+            try:
+                payload = decompressor.decompress(data)
+            except zlib.error:
+                print(f"[WARN] 归档块损坏，忽略 {data_path} 偏移 {offset} 之后的数据")
+                break
+            if not decompressor.eof:
+                # 写入中断留下的不完整块
+                break
+            length = len(data) - len(decompressor.unused_data)
+            times = [_partition_key(json.loads(line))[2] for line in payload.decode('utf-8').splitlines() if line]
+            if times:
+                entries.append(BlockIndexEntry(offset, length, len(times), min(times), max(times)))
+            offset += length
+            data = decompressor.unused_data
+        return entries
+
+    def partitions(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                   sources: Optional[List[str]] = None) -> Iterator[Tuple[str, str]]:
+        """按日期顺序列出(日期, 来源)分区"""
+        first = since.date().isoformat() if since else None
+        last = until.date().isoformat() if until else None
+        for directory in sorted(self.root.iterdir()):
+            date = directory.name
+            if not directory.is_dir() or (first and date < first) or (last and date > last):
+                continue
+            for data_path in sorted(directory.glob(f'*{DATA_SUFFIX}')):
+                source = data_path.name[:-len(DATA_SUFFIX)]
+                if sources is None or source in sources:
+                    yield date, source
+
+    def iter_articles(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                      sources: Optional[List[str]] = None) -> Iterator[Dict]:
+        """
+        流式读取文章（按日期、来源、写入顺序）
+
+        Args:
+            since: 只返回此时间之后的文章（按发布时间，缺失时按抓取时间）
+            until: 只返回此时间之前的文章
+            sources: 只返回这些来源
+        """
+        since_key = since.isoformat() if since else None
+        until_key = until.isoformat() if until else None
+        for date, source in self.partitions(since, until, sources):
+            data_path, index_path = self._paths(date, source)
+            try:
+                f = self._open_locked(data_path, 'rb', exclusive=False)
+            except FileNotFoundError:
+                continue
+            with f:
+                # 共享锁下读取索引，保证索引和打开的数据文件是同一版本；之后的读取用已打开的文件，不受合并影响
+                try:
+                    entries = self._read_index(data_path, index_path)
+                finally:
+                    self._unlock(f)
+                for entry in entries:
+                    if (since_key and entry.max_time < since_key) or (until_key and entry.min_time > until_key):
+                        continue
+                    f.seek(entry.offset)
+                    payload = gzip.decompress(f.read(entry.length)).decode('utf-8')
+                    for line in payload.splitlines():
+                        if not line:
+                            continue
+                        article = json.loads(line)
+                        timestamp = _partition_key(article)[2]
+                        if (since_key and timestamp < since_key) or (until_key and timestamp > until_key):
+                            continue
+                        yield article
+
+    # ==================== 维护 ====================
+
+    def compact(self, retention_days: Optional[int] = None) -> Dict:
+        """
+        压缩归档：删除超过保留天数的分区，把今天之前分区中的小块合并为block_size大小的块
+
+        Returns:
+            {'removed_partitions': 删除的日期目录数, 'compacted': 合并的分区数}
+        """
+        stats = {'removed_partitions': 0, 'compacted': 0}
+        today = datetime.now().date().isoformat()
+        cutoff = (datetime.now() - timedelta(days=retention_days)).date().isoformat() if retention_days else None
+
+        with self.lock:
+            for directory in sorted(self.root.iterdir()):
+                if not directory.is_dir():
+                    continue
+                if cutoff and directory.name < cutoff:
+                    shutil.rmtree(directory, ignore_errors=True)
+                    stats['removed_partitions'] += 1
+                    continue
+                if directory.name >= today:
+                    continue
+                for data_path in sorted(directory.glob(f'*{DATA_SUFFIX}')):
+                    source = data_path.name[:-len(DATA_SUFFIX)]
+                    if self._compact_partition(*self._paths(directory.name, source)):
+                        stats['compacted'] += 1
+        return stats
+
+    def _compact_partition(self, data_path: Path, index_path: Path) -> bool:
+        """
+        合并分区内的小块（块数已是最少时跳过），通过临时文件原子替换
+
+        读取、重写和替换全程持有数据文件的排他锁：其他进程（按发布时间常会追加到昨天的分区）的追加
+        等到替换完成后写入新文件，不会丢失
+        """
+        with self._open_locked(data_path, 'rb', exclusive=True) as f:
+            try:
+                entries = self._read_index(data_path, index_path)
+                total = sum(entry.count for entry in entries)
+                if len(entries) <= max(1, -(-total // self.block_size)):
+                    return False
+
+                records = []
+                for entry in entries:
+                    f.seek(entry.offset)
+                    for line in gzip.decompress(f.read(entry.length)).decode('utf-8').splitlines():
+                        if line:
+                            records.append((_partition_key(json.loads(line))[2], line + '\n'))
+
+                tmp_data = data_path.with_name(data_path.name + '.tmp')
+                tmp_index = index_path.with_name(index_path.name + '.tmp')
+                for path in (tmp_data, tmp_index):
+                    if path.exists():
+                        path.unlink()
+                self._write_blocks(tmp_data, tmp_index, records)
+                # 先删除旧索引再替换数据：中途崩溃时只会缺少索引（读取时扫描重建），不会出现新旧错配
+                if index_path.exists():
+                    index_path.unlink()
+                os.replace(tmp_data, data_path)
+                os.replace(tmp_index, index_path)
+                return True
+            finally:
+                self._unlock(f)
+
+    def get_stats(self) -> Dict:
+        """归档统计：日期数、分区数、记录数、块数、压缩后字节数"""
+        stats = {'dates': 0, 'partitions': 0, 'records': 0, 'blocks': 0, 'bytes': 0}
+        dates = set()
+        for date, source in self.partitions():
+            data_path, index_path = self._paths(date, source)
+            try:
+                f = self._open_locked(data_path, 'rb', exclusive=False)
+            except FileNotFoundError:
+                continue
+            with f:
+                try:
+                    entries = self._read_index(data_path, index_path)
+                finally:
+                    self._unlock(f)
+            dates.add(date)
+            stats['partitions'] += 1
+            stats['blocks'] += len(entries)
+            stats['records'] += sum(entry.count for entry in entries)
+            stats['bytes'] += data_path.stat().st_size
+        stats['dates'] = len(dates)
+        return stats
+
+
+class ArchiveWriter:
+    """缓冲写入器：攒满block_size条写入一次，用with语句保证关闭时写入剩余记录"""
+
+    def __init__(self, archive: NewsArchive):
+        self.archive = archive
+        self.buffer = []
+        self.written = 0
+
+    def write(self, article: Dict):
+        self.buffer.append(article)
+        if len(self.buffer) >= self.archive.block_size:
+            self.flush()
+
+    def write_many(self, articles: Iterable[Dict]):
+        for article in articles:
+            self.write(article)
+
+    def flush(self):
+        if self.buffer:
+            self.written += self.archive.append(self.buffer)
+            self.buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> 'ArchiveWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_archive = None
+_default_lock = threading.Lock()
+
+
+def get_news_archive() -> NewsArchive:
+    """获取进程内共享的归档（首次打开时按data_retention_days压缩）"""
+    global _default_archive
+    with _default_lock:
+        if _default_archive is None:
+            yaml_config = config.load_yaml_config()
+            archive_config = yaml_config.get('archive') or {}
+            _default_archive = NewsArchive(block_size=archive_config.get('block_size', 256))
+            retention_days = yaml_config.get('data_retention_days')
+            _default_archive.compact(int(retention_days) if retention_days else None)
+        return _default_archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description='新闻归档维护')
+    parser.add_argument('--compact', action='store_true', help='按data_retention_days清理并合并小块')
+    parser.add_argument('--days', type=int, default=None, help='导出最近N天的文章（JSON行输出到stdout）')
+    parser.add_argument('--source', action='append', default=None, help='只导出指定来源（可重复）')
+    args = parser.parse_args()
+
+    archive = get_news_archive()
+    if args.compact:
+        retention_days = config.load_yaml_config().get('data_retention_days')
+        print(archive.compact(int(retention_days) if retention_days else None))
+    if args.days is not None:
+        since = datetime.now() - timedelta(days=args.days)
+        for article in archive.iter_articles(since=since, sources=args.source):
+            print(json.dumps(article, ensure_ascii=False))
+        return
+    stats = archive.get_stats()
+    print(f"归档目录: {archive.root}")
+    print(f"  {stats['dates']} 天，{stats['partitions']} 个分区，{stats['records']} 条记录，"
+          f"{stats['blocks']} 个块，{stats['bytes'] / 1024:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+"""
+常驻进程模式
+- 替代计划任务每次启动新进程：NewsFetcher、AIAnalyzer、Telegram客户端、关键词自动机和数据库连接只初始化一次，
+  连接池和缓存在多次运行之间保持
+- 按config.yaml的scheduler.send_times定时发送财经新闻总结（schedule库，时间按scheduler.timezone换算为本机时间）
+- 本机控制接口（HTTP，只监听127.0.0.1）：
+    GET  /status   状态、下次运行时间、最近运行结果
+    POST /run      立即执行一次（加入队列，与定时任务串行）
+    POST /prepare  立即预生成（或补充）摘要
+    POST /send     发送预生成的摘要（不可用时完整执行一次）
+    POST /reload   重新加载sources.yaml和发送时间
+    POST /stop     停止进程
+  每个请求必须带X-Daemon-Token请求头（环境变量NEWS_DAEMON_TOKEN，未设置时启动时生成data/daemon_token），
+  浏览器页面无法跨域伪造带自定义请求头的请求
+  命令行：python news_daemon.py --cmd run（自动读取令牌）
+- 抓取类任务（立即执行、预生成、重新加载）在一个工作线程中按顺序执行，两次总结不会重叠；
+  发送预生成摘要在单独的发送线程执行，不等待正在进行的预生成
+- 预生成摘要（daemon.precompute）：发送前lead_minutes起每interval_minutes预生成一次摘要（抓取、总结、
+  重要消息分析，已处理的新闻复用缓存），发送前topup_minutes做最后一次增量补充，到发送时间只打包发送，
+  送达延迟只取决于Telegram发送时间；没有可用的预生成摘要时按原方式完整执行。
+  超过发送时间才完成的预生成结果被丢弃，AI总结和重要消息分析在发送前截止
+"""
+import argparse
+import hmac
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import requests
+import schedule
+
+from config import config
+
+TOKEN_FILE = Path(__file__).parent / 'data' / 'daemon_token'
+TOKEN_HEADER = 'X-Daemon-Token'
+
+
+def local_send_time(hhmm: str, tz_name: Optional[str]) -> str:
+    """把tz_name时区的"HH:MM"换算为本机时区的"HH:MM"（按今天的时差）"""
+    if not tz_name:
+        return hhmm
+    hour, minute = (int(part) for part in hhmm.split(':'))
+    zoned = datetime.now(ZoneInfo(tz_name)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return zoned.astimezone().strftime('%H:%M')
+
+
+def load_control_token(create: bool = False) -> Optional[str]:
+    """控制接口令牌：环境变量NEWS_DAEMON_TOKEN，否则读取data/daemon_token（create时不存在则生成，仅本用户可读）"""
+    token = os.getenv('NEWS_DAEMON_TOKEN')
+    if token:
+        return token
+    try:
+        return TOKEN_FILE.read_text(encoding='utf-8').strip() or None
+    except OSError:
+        if not create:
+            return None
+    token = secrets.token_urlsafe(32)
+    TOKEN_FILE.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(TOKEN_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    return token
+
+
+def shift_time(hhmm: str, minutes: float) -> str:
+    """把"HH:MM"前后移动minutes分钟（跨零点回绕）"""
+    hour, minute = (int(part) for part in hhmm.split(':'))
+    shifted = datetime(2000, 1, 1, hour, minute) + timedelta(minutes=minutes)
+    return shifted.strftime('%H:%M')
+
+
+def next_occurrence(hhmm: str) -> float:
+    """本机时间"HH:MM"的下一次到达时间戳（已过则为明天）"""
+    hour, minute = (int(part) for part in hhmm.split(':'))
+    now = datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return target.timestamp()
+
+
+class NewsDaemon:
+    """常驻调度进程"""
+
+    def __init__(self, send_times: Optional[List[str]] = None, tz_name: Optional[str] = None,
+                 control_host: str = '127.0.0.1', control_port: int = 8767,
+                 precompute: Optional[Dict] = None, control_token: Optional[str] = None):
+        """
+        Args:
+            send_times: 发送时间（"HH:MM"，tz_name时区），默认scheduler.send_times
+            tz_name: send_times所在时区，默认scheduler.timezone
+            control_host: 控制接口监听地址
+            control_port: 控制接口端口，0表示随机分配
+            precompute: 预生成摘要配置 {enabled, lead_minutes, interval_minutes, topup_minutes,
+                max_age_minutes, deadline_margin_seconds}，None或enabled为false时到发送时间才完整执行
+            control_token: 控制接口令牌，默认load_control_token()
+        """
+        from send_finance_summary import FinanceSummarySender
+
+        scheduler_config = config.load_yaml_config().get('scheduler') or {}
+        self.send_times = send_times or scheduler_config.get('send_times') or []
+        self.tz_name = tz_name or scheduler_config.get('timezone')
+        self.precompute = precompute if precompute and precompute.get('enabled', True) else None
+
+        started = time.time()
+        self.sender = FinanceSummarySender()
+        print(f"组件初始化完成（{time.time() - started:.1f}s）")
+
+        self.scheduler = schedule.Scheduler()
+        # 主线程执行定时任务，重新加载在工作线程修改任务列表
+        self.scheduler_lock = threading.Lock()
+        self.control_token = control_token or load_control_token(create=True)
+        self.jobs = queue.Queue()
+        # 发送任务单独排队，不受预生成耗时影响
+        self.send_jobs = queue.Queue()
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.running = {}
+        self.history = []
+        self.next_job_id = 1
+
+        self.httpd = ThreadingHTTPServer((control_host, control_port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.control_url = f"http://{control_host}:{self.httpd.server_address[1]}"
+        self.schedule_send_times()
+
+    @classmethod
+    def from_config(cls, port: Optional[int] = None) -> 'NewsDaemon':
+        """从config.yaml的daemon配置创建"""
+        daemon_config = config.load_yaml_config().get('daemon') or {}
+        return cls(control_host=daemon_config.get('control_host', '127.0.0.1'),
+                   control_port=port if port is not None else daemon_config.get('control_port', 8767),
+                   precompute=daemon_config.get('precompute'))
+
+    # ==================== 调度 ====================
+
+    def prepare_times(self, local_time: str) -> List[str]:
+        """发送时间local_time之前的预生成时间（本机"HH:MM"，最后一个是增量补充）"""
+        lead = float(self.precompute.get('lead_minutes', 120))
+        interval = max(1.0, float(self.precompute.get('interval_minutes', 30)))
+        topup = float(self.precompute.get('topup_minutes', 5))
+        offsets = []
+        offset = lead
+        while offset > topup:
+            offsets.append(offset)
+            offset -= interval
+        offsets.append(topup)
+        return [shift_time(local_time, -offset) for offset in offsets]
+
+    def schedule_send_times(self):
+        """按send_times注册每日任务（已有任务先清除）"""
+        with self.scheduler_lock:
+            self._schedule_send_times()
+
+    def _schedule_send_times(self):
+        """schedule_send_times的实现（调用方持有scheduler_lock）"""
+        self.scheduler.clear('digest')
+        for send_time in self.send_times:
+            local_time = local_send_time(str(send_time), self.tz_name)
+            if self.precompute is None:
+                self.scheduler.every().day.at(local_time).do(self.submit, 'digest', 'schedule').tag('digest')
+                print(f"定时任务: 每天 {send_time}（{self.tz_name or '本机时区'}）= 本机 {local_time}")
+                continue
+            prepare_times = self.prepare_times(local_time)
+            for prepare_time in prepare_times:
+                self.scheduler.every().day.at(prepare_time).do(
+                    self.submit, 'prepare', 'schedule', local_time).tag('digest')
+            self.scheduler.every().day.at(local_time).do(self.submit, 'send', 'schedule', local_time).tag('digest')
+            print(f"定时任务: 每天 {send_time}（{self.tz_name or '本机时区'}）= 本机 {local_time}，"
+                  f"预生成 {'、'.join(prepare_times)}")
+
+    def submit(self, kind: str, trigger: str = 'control', send_time: Optional[str] = None) -> int:
+        """任务加入队列，返回任务编号（send_time: 预生成任务对应的本机发送时间）"""
+        with self.lock:
+            job_id = self.next_job_id
+            self.next_job_id += 1
+        # 入队时确定对应的发送时刻（任务排队到发送时间之后才开始时据此跳过）
+        send_at = next_occurrence(send_time) if send_time else None
+        job = {'id': job_id, 'kind': kind, 'trigger': trigger, 'send_time': send_time, 'send_at': send_at,
+               'queued_at': time.time()}
+        (self.send_jobs if kind == 'send' else self.jobs).put(job)
+        print(f"[{datetime.now():%H:%M:%S}] 任务 #{job_id} {kind} 已加入队列（{trigger}）")
+        return job_id
+
+    def run_job(self, job: Dict) -> bool:
+        """执行一个任务"""
+        if job['kind'] == 'digest':
+            return bool(self.sender.send_finance_summary())
+        if job['kind'] == 'prepare':
+            send_at = job.get('send_at')
+            if send_at is None:
+                return self.sender.prepare_digest() is not None
+            if time.time() >= send_at:
+                print(f"[WARN] 任务 #{job['id']} 已过发送时间 {job['send_time']}，跳过预生成")
+                return False
+            # AI总结和重要消息分析在发送时间之前截止，超时的新闻用本地摘要
+            margin = float((self.precompute or {}).get('deadline_margin_seconds', 60))
+            return self.sender.prepare_digest(deadline=send_at - margin, stop_at=send_at) is not None
+        if job['kind'] == 'send':
+            max_age = (self.precompute or {}).get('max_age_minutes', 60)
+            if self.sender.send_prepared_digest(max_age_minutes=max_age):
+                return True
+            print("[WARN] 预生成摘要不可用，完整执行一次")
+            return bool(self.sender.send_finance_summary())
+        if job['kind'] == 'reload':
+            self.reload()
+            return True
+        raise ValueError(f"未知任务类型: {job['kind']}")
+
+    def reload(self):
+        """重新加载新闻源配置、发送时间和预生成配置"""
+        self.sender.fetcher.sources = self.sender.fetcher.load_sources()
+        yaml_config = config.load_yaml_config()
+        scheduler_config = yaml_config.get('scheduler') or {}
+        self.send_times = scheduler_config.get('send_times') or []
+        self.tz_name = scheduler_config.get('timezone')
+        precompute = (yaml_config.get('daemon') or {}).get('precompute')
+        self.precompute = precompute if precompute and precompute.get('enabled', True) else None
+        self.schedule_send_times()
+        print(f"已重新加载：{len(self.sender.fetcher.sources)} 个新闻源")
+
+    def _worker(self, jobs: queue.Queue, lane: str):
+        """任务线程：按顺序执行队列中的任务"""
+        while not self.stop_event.is_set():
+            try:
+                job = jobs.get(timeout=1)
+            except queue.Empty:
+                continue
+            job['started_at'] = time.time()
+            with self.lock:
+                self.running[lane] = job
+            try:
+                job['ok'] = self.run_job(job)
+            except Exception as e:
+                job['ok'] = False
+                job['error'] = str(e)[:200]
+                print(f"[ERROR] 任务 #{job['id']} 失败: {e}")
+            job['finished_at'] = time.time()
+            with self.lock:
+                self.running.pop(lane, None)
+                self.history = (self.history + [job])[-20:]
+
+    # ==================== 控制接口 ====================
+
+    def status(self) -> Dict:
+        """当前状态"""
+        with self.scheduler_lock:
+            next_run = self.scheduler.next_run
+        prepared = self.sender.load_prepared_digest()
+        with self.lock:
+            return {
+                'running': [dict(job) for job in self.running.values()],
+                'queued': self.jobs.qsize() + self.send_jobs.qsize(),
+                'send_times': self.send_times,
+                'timezone': self.tz_name,
+                'next_run': next_run.isoformat(timespec='seconds') if next_run else None,
+                'history': [dict(job) for job in self.history[-5:]],
+                'prepared': {
+                    'prepared_at': datetime.fromtimestamp(prepared['prepared_at']).isoformat(timespec='seconds'),
+                    'items': len(prepared['items']),
+                } if prepared else None,
+            }
+
+    def _make_handler(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code: int, payload: Dict):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _authorized(self) -> bool:
+                if hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), daemon.control_token):
+                    return True
+                self._reply(403, {'error': 'forbidden'})
+                return False
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                if self.path == '/status':
+                    self._reply(200, daemon.status())
+                else:
+                    self._reply(404, {'error': 'not found'})
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                if self.path == '/run':
+                    self._reply(200, {'job_id': daemon.submit('digest')})
+                elif self.path == '/prepare':
+                    self._reply(200, {'job_id': daemon.submit('prepare')})
+                elif self.path == '/send':
+                    self._reply(200, {'job_id': daemon.submit('send')})
+                elif self.path == '/reload':
+                    self._reply(200, {'job_id': daemon.submit('reload')})
+                elif self.path == '/stop':
+                    self._reply(200, {'stopping': True})
+                    daemon.stop_event.set()
+                else:
+                    self._reply(404, {'error': 'not found'})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    # ==================== 运行 ====================
+
+    def serve_forever(self):
+        """启动控制接口和任务线程，主线程执行定时调度，直到/stop或Ctrl+C"""
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        workers = [threading.Thread(target=self._worker, args=(self.jobs, 'jobs'), daemon=True),
+                   threading.Thread(target=self._worker, args=(self.send_jobs, 'send'), daemon=True)]
+        for worker in workers:
+            worker.start()
+        print(f"常驻进程已启动，控制接口 {self.control_url}")
+        try:
+            while not self.stop_event.is_set():
+                with self.scheduler_lock:
+                    self.scheduler.run_pending()
+                self.stop_event.wait(1)
+        except KeyboardInterrupt:
+            print("\n正在停止...")
+            self.stop_event.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        # 等待正在执行的任务结束
+        for worker in workers:
+            worker.join()
+        self.sender.store.flush()
+        print("常驻进程已停止")
+
+
+def send_command(command: str, url: Optional[str] = None, token: Optional[str] = None) -> Dict:
+    """向运行中的常驻进程发送控制命令（令牌默认load_control_token()）"""
+    if url is None:
+        daemon_config = config.load_yaml_config().get('daemon') or {}
+        url = f"http://{daemon_config.get('control_host', '127.0.0.1')}:{daemon_config.get('control_port', 8767)}"
+    session = requests.Session()
+    # 本机地址不走环境变量中的代理
+    session.trust_env = False
+    session.headers[TOKEN_HEADER] = token or load_control_token() or ''
+    if command == 'status':
+        response = session.get(f"{url}/status", timeout=10)
+    else:
+        response = session.post(f"{url}/{command}", timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='财经新闻常驻进程（定时发送 + 本机控制接口）')
+    parser.add_argument('--cmd', choices=['run', 'prepare', 'send', 'status', 'reload', 'stop'], default=None,
+                        help='向运行中的常驻进程发送命令（不启动新进程）')
+    parser.add_argument('--port', type=int, default=None, help='控制接口端口（默认daemon.control_port）')
+    parser.add_argument('--run-now', action='store_true', help='启动后立即执行一次')
+    args = parser.parse_args()
+
+    if args.cmd:
+        url = f"http://127.0.0.1:{args.port}" if args.port else None
+        try:
+            print(json.dumps(send_command(args.cmd, url), ensure_ascii=False, indent=2))
+        except requests.RequestException as e:
+            print(f"[ERROR] 无法连接常驻进程: {e}")
+            return 1
+        return 0
+
+    daemon = NewsDaemon.from_config(port=args.port)
+    if args.run_now:
+        daemon.submit('digest', 'startup')
+    daemon.serve_forever()
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
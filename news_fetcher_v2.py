@@ -9,16 +9,30 @@
 import sys
 import json
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from datetime import datetime
 from pathlib import Path
 import re
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 from typing import List, Dict, Optional, Callable
 
 # 导入配置
-from config import PROXIES, BOT_TOKEN, CHAT_ID
+from config import CHAT_ID, config
+from extractive_summarizer import summarizer
+from telegram_client import get_telegram_client
+from search_index import get_search_index
+from keyword_tagger import get_keyword_tagger
+from news_archive import get_news_archive
+from news_store import get_news_store
+from mention_history import get_mention_history
+from date_parser import parse_published, parse_date_from_url, to_local_iso, age_hours
+from url_normalizer import get_url_canonicalizer
+from proxy_router import get_proxy_router
+from domain_scheduler import get_politeness_scheduler
 
 class NewsFetcher:
     """通用新闻抓取器"""
@@ -26,8 +40,135 @@ class NewsFetcher:
     def __init__(self):
         self.config_file = Path(__file__).parent / 'config' / 'sources.yaml'
         self.sources = self.load_sources()
+        self.store = get_news_store()
+        # 按域名选择直连或代理（学到的最快路由跨运行保存）
+        self.router = get_proxy_router()
+        # 按域名限速（所有抓取方法和进程内所有抓取器共享）
+        self.politeness = get_politeness_scheduler()
+        # 共享连接池（同一站点的请求复用连接）
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=16))
+        self.session.mount('http://', HTTPAdapter(pool_connections=32, pool_maxsize=16))
         self.success_methods = {}  # 记录每个源的成功方法
         self.load_success_methods()
+        # 只处理发布时间在此窗口内的文章（小时，0表示不限制）；过期文章在抓全文、翻译和AI之前跳过
+        self.max_age_hours = (config.load_yaml_config().get('fetch') or {}).get('max_age_hours', 48)
+        # 本轮已处理的规范URL（跨源、跨方法去重，begin_run()清空）
+        self.seen_urls = set()
+        self._seen_lock = threading.Lock()
+        # 当前线程正在执行的抓取方法登记的URL（方法失败时释放）
+        self._claims = threading.local()
+        # 抓取成功后的回调（如写入检索索引），参数为文章列表
+        self.article_listeners = [self.store.add_articles]
+        yaml_config = config.load_yaml_config()
+        if (yaml_config.get('search_index') or {}).get('enabled', True):
+            self.add_article_listener(get_search_index().add_articles)
+        if (yaml_config.get('archive') or {}).get('enabled', True):
+            self.add_article_listener(get_news_archive().append)
+        if (yaml_config.get('mention_history') or {}).get('enabled', True):
+            self.add_article_listener(get_mention_history().append)
+
+    def add_article_listener(self, listener: Callable[[List[Dict]], None]):
+        """注册文章回调，每个源抓取成功后调用"""
+        self.article_listeners.append(listener)
+
+    def _notify_articles(self, articles: List[Dict]):
+        """标注关键词（article['tags']）并通知文章回调（回调失败不影响抓取）"""
+        tagger = get_keyword_tagger()
+        for article in articles:
+            article['tags'] = tagger.tag_article(article)
+        for listener in self.article_listeners:
+            try:
+                listener(articles)
+            except Exception as e:
+                print(f"  [WARN] 文章回调失败: {str(e)[:80]}")
+
+    @staticmethod
+    def _entry_published(entry) -> Optional[datetime]:
+        """RSS item / Atom entry的发布时间（pubDate、published、updated、dc:date）"""
+        tag = entry.find(['pubDate', 'published', 'updated', 'date'])
+        return parse_published(tag.get_text(strip=True)) if tag else None
+
+    @staticmethod
+    def _entry_link(link) -> str:
+        """RSS <link>文本或Atom <link href>的链接"""
+        return link.get('href') or link.get_text(strip=True)
+
+    @staticmethod
+    def _element_published(element, url: str) -> Optional[datetime]:
+        """网页列表项的发布时间：<time datetime>、class含time/date的标签，最后尝试URL中的日期"""
+        if element is not None and hasattr(element, 'find'):
+            time_tag = element.find('time')
+            if time_tag is not None:
+                published = parse_published(time_tag.get('datetime') or time_tag.get_text(strip=True))
+                if published is not None:
+                    return published
+            date_tag = element.find(['span', 'em', 'i', 'div'],
+                                    class_=lambda x: x and ('time' in str(x).lower() or 'date' in str(x).lower()))
+            if date_tag is not None:
+                published = parse_published(date_tag.get_text(strip=True))
+                if published is not None:
+                    return published
+        return parse_date_from_url(url)
+
+    def http_get(self, url: str, timeout: float = 30, **kwargs) -> requests.Response:
+        """
+        GET请求：按域名限速（429时按Retry-After等待重试），按路由规则选择直连或代理，连接失败时自动切换路由
+        """
+        kwargs.setdefault('session', self.session)
+        return self.politeness.request(url, lambda: self.router.get(url, timeout=timeout, **kwargs))
+
+    @staticmethod
+    def source_url(source_config: Dict) -> str:
+        """源的代表URL（首页或第一个RSS feed），用于按域名调度"""
+        return source_config.get('url') or (source_config.get('rss_feeds') or [''])[0]
+
+    def begin_run(self):
+        """开始新一轮抓取：清空本轮已处理的URL"""
+        with self._seen_lock:
+            self.seen_urls.clear()
+
+    def claim_url(self, url: str, base: str = '') -> Optional[str]:
+        """
+        规范化文章链接并登记为本轮已处理
+
+        Args:
+            url: 原始链接（可为相对链接或协议相对链接）
+            base: 相对链接的基准URL（列表页地址）
+
+        Returns:
+            规范URL；不是http(s)链接或本轮已处理过（其他源或其他方法已抓到同一文章）时返回None
+        """
+        canonical = get_url_canonicalizer().canonicalize(url, base)
+        if not canonical.startswith(('https://', 'http://')):
+            return None
+        with self._seen_lock:
+            if canonical in self.seen_urls:
+                return None
+            self.seen_urls.add(canonical)
+        claimed = getattr(self._claims, 'urls', None)
+        if claimed is not None:
+            claimed.append(canonical)
+        return canonical
+
+    def _run_method(self, method: Callable, source_name: str, max_articles: int, source_config: Dict) -> List[Dict]:
+        """执行一个抓取方法；没有返回文章（或抛出异常）时释放它登记的URL，后续方法可以重新处理"""
+        self._claims.urls = []
+        articles = []
+        try:
+            articles = method(source_name, max_articles, source_config)
+            return articles
+        finally:
+            claimed, self._claims.urls = self._claims.urls, None
+            if not articles and claimed:
+                with self._seen_lock:
+                    self.seen_urls.difference_update(claimed)
+
+    def is_stale(self, published: Optional[datetime], max_age_hours: Optional[float] = None) -> bool:
+        """发布时间是否超出时间窗口（未知发布时间不算过期）"""
+        window = self.max_age_hours if max_age_hours is None else max_age_hours
+        age = age_hours(published)
+        return bool(window) and age is not None and age > window
 
     def load_sources(self) -> Dict:
         """加载新闻源配置"""
@@ -40,43 +181,23 @@ class NewsFetcher:
             return {}
 
     def load_success_methods(self):
-        """加载已保存的成功方法"""
-        methods_file = Path(__file__).parent / 'data' / 'success_methods.json'
-        if methods_file.exists():
-            try:
-                with open(methods_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # 将保存的方法名转换为实际方法引用
-                    for source_name, method_name in data.items():
-                        if method_name == '_method_rss_beautifulsoup':
-                            self.success_methods[source_name] = self._method_rss_beautifulsoup
-                        elif method_name == '_method_rss_requests':
-                            self.success_methods[source_name] = self._method_rss_requests
-                        elif method_name == '_method_scrape_beautifulsoup':
-                            self.success_methods[source_name] = self._method_scrape_beautifulsoup
-                        elif method_name == '_method_scrape_requests':
-                            self.success_methods[source_name] = self._method_scrape_requests
-                        elif method_name == '_method_generic':
-                            self.success_methods[source_name] = self._method_generic
-                print(f"加载了 {len(self.success_methods)} 个源的成功方法")
-            except Exception as e:
-                print(f"加载成功方法失败: {e}")
+        """从数据库加载已保存的成功方法"""
+        for source_name, method_name in self.store.get_success_methods().items():
+            # 只恢复固定的抓取方法（按feed生成的UA方法无法按名字恢复）
+            method = getattr(self, method_name, None) if method_name.startswith('_method_') else None
+            if method is not None:
+                self.success_methods[source_name] = method
+        if self.success_methods:
+            print(f"加载了 {len(self.success_methods)} 个源的成功方法")
 
     def save_success_methods(self):
-        """保存成功方法到本地"""
-        data_dir = Path(__file__).parent / 'data'
-        data_dir.mkdir(exist_ok=True)
-
+        """保存成功方法到数据库"""
         # 保存方法名而不是方法对象（因为方法对象不可序列化）
-        methods_to_save = {}
-        for source_name, method in self.success_methods.items():
-            methods_to_save[source_name] = method.__name__
-
-        methods_file = data_dir / 'success_methods.json'
-        with open(methods_file, 'w', encoding='utf-8') as f:
-            json.dump(methods_to_save, f, ensure_ascii=False, indent=2)
-
-        print(f"成功方法已保存到: {methods_file}")
+        self.store.set_success_methods({source_name: method.__name__
+                                        for source_name, method in self.success_methods.items()})
+        self.router.save()
+        self.store.flush()
+        print(f"成功方法已保存到: {self.store.db_path}")
 
     def is_english(self, text: str) -> bool:
         """检测是否为英文"""
@@ -100,7 +221,7 @@ class NewsFetcher:
                 'q': text
             }
 
-            response = requests.get(url, params=params, proxies=PROXIES, timeout=30)
+            response = self.http_get(url, params=params, timeout=30)
             result = response.json()
 
             if result and result[0]:
@@ -117,7 +238,7 @@ class NewsFetcher:
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
 
         try:
-            response = requests.get(url, headers=headers, proxies=PROXIES, timeout=30)
+            response = self.http_get(url, headers=headers, timeout=30)
             response.raise_for_status()
             soup = BeautifulSoup(response.content, 'lxml')
 
@@ -185,18 +306,50 @@ class NewsFetcher:
         except Exception as e:
             return ""
 
+    def enrich_article(self, article: Dict, min_content_length: int = 200) -> Dict:
+        """
+        补全正文并翻译（发送流水线的正文/翻译阶段）
+
+        抓取方法只拿到RSS描述等短内容时补抓全文；仍为英文的标题和正文翻译为中文
+        """
+        title = article.get('title', '')
+        content = article.get('content', '')
+        changed = False
+
+        if len(content) < min_content_length and article.get('url'):
+            full_content = self.fetch_full_article(article['url'])
+            if len(full_content) > len(content):
+                content = full_content
+                changed = True
+
+        if self.is_english(title):
+            title = self.translate_to_chinese(title)
+            changed = True
+        if self.is_english(content):
+            content = self.translate_to_chinese(content)
+            changed = True
+
+        if changed:
+            article['title'] = title
+            article['content'] = content[:2000]
+            article['summary'] = self._generate_summary(title, content)
+        return article
+
     def fetch_with_retries(self, source_name: str, source_config: Dict, max_articles: int = 5) -> List[Dict]:
-        """带重试机制的抓取"""
+        """带重试机制的抓取（每个源的结果、方法和耗时记录到fetch_stats）"""
         articles = []
+        started = time.time()
 
         # 检查是否有保存的成功方法
         if source_name in self.success_methods:
             print(f"  使用已知成功方法...")
             try:
                 method = self.success_methods[source_name]
-                articles = method(source_name, max_articles, source_config)
+                articles = self._run_method(method, source_name, max_articles, source_config)
                 if articles:
                     print(f"  成功: {len(articles)} 篇")
+                    self.store.record_fetch(source_name, method.__name__, True, len(articles), time.time() - started)
+                    self._notify_articles(articles)
                     return articles
             except Exception as e:
                 print(f"  已知方法失败: {e}，尝试其他方法...")
@@ -244,27 +397,32 @@ class NewsFetcher:
             ])
 
         # 尝试每种方法，最多7次（增加了专用方法）
+        last_error = None
         max_attempts = min(len(methods), 7)
         for attempt, method in enumerate(methods[:max_attempts], 1):
             print(f"  尝试方法 {attempt}/{max_attempts}...")
 
             try:
-                articles = method(source_name, max_articles, source_config)
+                articles = self._run_method(method, source_name, max_articles, source_config)
                 if articles and len(articles) > 0:
                     print(f"  [成功] 方法 {attempt} 获取到 {len(articles)} 篇")
 
                     # 保存成功方法
                     self.success_methods[source_name] = method
 
+                    self.store.record_fetch(source_name, method.__name__, True, len(articles), time.time() - started)
+                    self._notify_articles(articles)
                     return articles
 
             except Exception as e:
+                last_error = str(e)
                 print(f"  方法 {attempt} 失败: {str(e)[:100]}")
                 time.sleep(1)  # 等待1秒后重试
 
                 if attempt == max_attempts:
                     print(f"  [放弃] {source_name} 所有方法都失败")
 
+        self.store.record_fetch(source_name, None, False, 0, time.time() - started, last_error)
         return articles
 
     # ==================== RSS方法 ====================
@@ -297,11 +455,11 @@ class NewsFetcher:
                         break
 
                     try:
-                        response = requests.get(url, headers=headers, proxies=PROXIES, timeout=20)
+                        response = self.http_get(url, headers=headers, timeout=20)
                         response.raise_for_status()
 
                         soup = BeautifulSoup(response.content, 'xml')
-                        items = soup.find_all('item')[:articles_per_feed + 2]
+                        items = soup.find_all(['item', 'entry'])[:articles_per_feed + 2]
 
                         for item in items:
                             if len(articles) >= max_articles:
@@ -309,11 +467,12 @@ class NewsFetcher:
 
                             title = item.find('title')
                             link = item.find('link')
-                            description = item.find('description')
+                            description = item.find(['description', 'summary', 'content'])
+                            published = self._entry_published(item)
 
-                            if title and link:
+                            if title and link and not self.is_stale(published):
                                 title_text = title.get_text(strip=True)
-                                link_text = link.get_text(strip=True)
+                                link_text = self.claim_url(self._entry_link(link))
                                 desc_text = description.get_text(strip=True) if description else ""
 
                                 if title_text and link_text:
@@ -348,6 +507,7 @@ class NewsFetcher:
                                         'content': content[:2000],
                                         'summary': summary,
                                         'source': source_name,
+                                        'published_at': to_local_iso(published),
                                         'fetched_at': datetime.now().isoformat()
                                     })
 
@@ -377,22 +537,23 @@ class NewsFetcher:
                     'Accept': 'application/rss+xml, application/xml, */*'
                 }
 
-                response = requests.get(feed_url, headers=headers, proxies=PROXIES, timeout=30)
+                response = self.http_get(feed_url, headers=headers, timeout=30)
                 response.raise_for_status()
 
                 # 尝试解析XML
                 soup = BeautifulSoup(response.content, 'xml')
 
-                items = soup.find_all('item')[:max_articles]
+                items = soup.find_all(['item', 'entry'])[:max_articles]
 
                 for item in items:
                     title = item.find('title')
                     link = item.find('link')
-                    description = item.find('description')
+                    description = item.find(['description', 'summary', 'content'])
+                    published = self._entry_published(item)
 
-                    if title and link:
+                    if title and link and not self.is_stale(published):
                         title_text = title.get_text(strip=True)
-                        link_text = link.get_text(strip=True)
+                        link_text = self.claim_url(self._entry_link(link))
                         desc_text = description.get_text(strip=True) if description else ""
 
                         if title_text and link_text:
@@ -414,6 +575,7 @@ class NewsFetcher:
                                 'content': content[:2000],
                                 'summary': summary,
                                 'source': source_name,
+                                'published_at': to_local_iso(published),
                                 'fetched_at': datetime.now().isoformat()
                             })
 
@@ -444,20 +606,23 @@ class NewsFetcher:
             for ua in user_agents:
                 try:
                     headers = {'User-Agent': ua}
-                    response = requests.get(feed_url, headers=headers, proxies=PROXIES, timeout=30)
+                    response = self.http_get(feed_url, headers=headers, timeout=30)
 
                     soup = BeautifulSoup(response.content, 'xml')
-                    items = soup.find_all('item')[:max_articles]
+                    items = soup.find_all(['item', 'entry'])[:max_articles]
 
                     for item in items:
                         title = item.find('title')
                         link = item.find('link')
-                        description = item.find('description')
+                        description = item.find(['description', 'summary', 'content'])
+                        published = self._entry_published(item)
 
-                        if title and link:
+                        if title and link and not self.is_stale(published):
                             title_text = title.get_text(strip=True)
-                            link_text = link.get_text(strip=True)
+                            link_text = self.claim_url(self._entry_link(link))
                             desc_text = description.get_text(strip=True) if description else ""
+                            if not link_text:
+                                continue
 
                             content = self.fetch_full_article(link_text)
                             if not content or len(content) < 50:
@@ -477,6 +642,7 @@ class NewsFetcher:
                                 'content': content[:2000],
                                 'summary': summary,
                                 'source': source_name,
+                                'published_at': to_local_iso(published),
                                 'fetched_at': datetime.now().isoformat()
                             })
 
@@ -508,7 +674,7 @@ class NewsFetcher:
             print(f"    BS抓取: {article_list_url}")
 
             headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-            response = requests.get(article_list_url, headers=headers, proxies=PROXIES, timeout=30)
+            response = self.http_get(article_list_url, headers=headers, timeout=30)
             response.raise_for_status()
 
             soup = BeautifulSoup(response.content, 'lxml')
@@ -520,12 +686,14 @@ class NewsFetcher:
                 title = a.get_text(strip=True)
 
                 if len(title) > 10:
-                    if not href.startswith('http'):
-                        base_url = scrape_config.get('base_url', '')
-                        if base_url:
-                            href = base_url.rstrip('/') + '/' + href.lstrip('/')
-
-                    news_links.append({'title': title, 'url': href})
+                    published = self._element_published(a.parent, href)
+                    if self.is_stale(published):
+                        continue
+                    base_url = scrape_config.get('base_url', '')
+                    href = self.claim_url(href, base_url.rstrip('/') + '/' if base_url else article_list_url)
+                    if not href:
+                        continue
+                    news_links.append({'title': title, 'url': href, 'published': published})
 
                     if len(news_links) >= max_articles:
                         break
@@ -546,6 +714,7 @@ class NewsFetcher:
                         'content': content[:2000],
                         'summary': summary,
                         'source': source_name,
+                        'published_at': to_local_iso(item['published']),
                         'fetched_at': datetime.now().isoformat()
                     })
 
@@ -570,7 +739,7 @@ class NewsFetcher:
             print(f"    Requests抓取: {article_list_url}")
             headers = {'User-Agent': 'Mozilla/5.0'}
 
-            response = requests.get(article_list_url, headers=headers, proxies=PROXIES, timeout=30)
+            response = self.http_get(article_list_url, headers=headers, timeout=30)
             response.raise_for_status()
 
             soup = BeautifulSoup(response.content, 'lxml')
@@ -581,6 +750,12 @@ class NewsFetcher:
                 title = a.get_text(strip=True)
 
                 if title and href and len(title) > 10:
+                    published = self._element_published(a.parent, href)
+                    if self.is_stale(published):
+                        continue
+                    href = self.claim_url(href, article_list_url)
+                    if not href:
+                        continue
                     content = self.fetch_full_article(href)
                     if content and len(content) > 100:
                         if self.is_english(title):
@@ -595,6 +770,7 @@ class NewsFetcher:
                             'content': content[:2000],
                             'summary': summary,
                             'source': source_name,
+                            'published_at': to_local_iso(published),
                             'fetched_at': datetime.now().isoformat()
                         })
 
@@ -620,7 +796,7 @@ class NewsFetcher:
             headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
 
             print(f"    访问: {url}")
-            response = requests.get(url, headers=headers, proxies=PROXIES, timeout=30)
+            response = self.http_get(url, headers=headers, timeout=30)
             print(f"    状态码: {response.status_code}")
 
             if response.status_code != 200:
@@ -634,7 +810,6 @@ class NewsFetcher:
             print(f"    找到 {len(news_links)} 个 /roll/ 链接")
 
             # 处理每个新闻链接
-            seen_urls = set()
             for link_tag in news_links:
                 if len(articles) >= max_articles:
                     break
@@ -642,20 +817,17 @@ class NewsFetcher:
                 href = link_tag.get('href', '')
                 title = link_tag.get_text(strip=True)
 
-                # 跳过空标题或已见过的URL
-                if not title or not href or href in seen_urls:
+                # 跳过空标题和非新闻链接
+                if not title or not href or 'index.d.html' in href or 'page=' in href:
                     continue
 
-                # 确保URL是完整的
-                if href.startswith('//'):
-                    href = 'https:' + href
-                elif href.startswith('/'):
-                    href = 'https://finance.sina.com.cn' + href
-
-                seen_urls.add(href)
+                published = self._element_published(link_tag.parent, href)
+                if self.is_stale(published):
+                    continue
 
-                # 跳过非新闻链接
-                if 'index.d.html' in href or 'page=' in href:
+                # 规范化为完整URL，跳过本轮已处理的
+                href = self.claim_url(href, url)
+                if not href:
                     continue
 
                 print(f"    处理: {title[:60]}...")
@@ -675,6 +847,7 @@ class NewsFetcher:
                     'content': content[:2000],
                     'summary': summary,
                     'source': source_name,
+                    'published_at': to_local_iso(published),
                     'fetched_at': datetime.now().isoformat()
                 })
 
@@ -699,7 +872,7 @@ class NewsFetcher:
             headers = {'User-Agent': 'Mozilla/5.0'}
 
             print(f"      访问: {url}")
-            response = requests.get(url, headers=headers, proxies=PROXIES, timeout=15)
+            response = self.http_get(url, headers=headers, timeout=15)
             print(f"      状态码: {response.status_code}")
 
             if response.status_code != 200:
@@ -712,7 +885,6 @@ class NewsFetcher:
             print(f"      找到 {len(all_links)} 个 /news/ 链接")
 
             # 过滤出有效的新闻链接
-            seen_urls = set()
             for link_tag in all_links:
                 if len(articles) >= max_articles:
                     break
@@ -728,16 +900,14 @@ class NewsFetcher:
                 if href.endswith('.html'):
                     continue
 
-                # 去重
-                if href in seen_urls:
+                published = self._element_published(link_tag.parent, href)
+                if self.is_stale(published):
                     continue
-                seen_urls.add(href)
 
-                # 确保URL是完整的
-                if href.startswith('//'):
-                    href = 'https:' + href
-                elif not href.startswith('http'):
-                    href = 'https://www.eastmoney.com' + href
+                # 规范化为完整URL并去重
+                href = self.claim_url(href, url)
+                if not href:
+                    continue
 
                 print(f"      处理: {title[:60]}...")
 
@@ -756,6 +926,7 @@ class NewsFetcher:
                     'content': content[:2000],
                     'summary': summary,
                     'source': source_name,
+                    'published_at': to_local_iso(published),
                     'fetched_at': datetime.now().isoformat()
                 })
 
@@ -770,7 +941,7 @@ class NewsFetcher:
         """专门获取东方财富文章内容"""
         try:
             headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, proxies=PROXIES, timeout=15)
+            response = self.http_get(url, headers=headers, timeout=15)
 
             if response.status_code != 200:
                 return ""
@@ -825,7 +996,7 @@ class NewsFetcher:
                 'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
             }
 
-            response = requests.get(url, headers=headers, proxies=PROXIES, timeout=30)
+            response = self.http_get(url, headers=headers, timeout=30)
             response.raise_for_status()
             soup = BeautifulSoup(response.content, 'lxml')
 
@@ -860,12 +1031,14 @@ class NewsFetcher:
                         href = item.get('href', '')
 
                     if title and href and len(title) > 10:
-                        # 处理相对URL
-                        if not href.startswith('http'):
-                            if href.startswith('/'):
-                                href = url.rstrip('/') + href
-                            else:
-                                href = url.rstrip('/') + '/' + href
+                        published = self._element_published(item, href)
+                        if self.is_stale(published):
+                            continue
+
+                        # 规范化（补全相对URL）并去重
+                        href = self.claim_url(href, url)
+                        if not href:
+                            continue
 
                         # 获取内容
                         content = self.fetch_full_article(href)
@@ -890,6 +1063,7 @@ class NewsFetcher:
                             'content': content[:2000],
                             'summary': summary,
                             'source': source_name,
+                            'published_at': to_local_iso(published),
                             'fetched_at': datetime.now().isoformat()
                         })
 
@@ -931,7 +1105,7 @@ class NewsFetcher:
             for url in urls_to_try:
                 try:
                     print(f"      尝试: {url[:50]}...")
-                    response = requests.get(url, headers=headers, proxies=PROXIES, timeout=30)
+                    response = self.http_get(url, headers=headers, timeout=30)
                     response.raise_for_status()
                     soup = BeautifulSoup(response.content, 'lxml')
 
@@ -971,18 +1145,17 @@ class NewsFetcher:
                             href = item.get('href', '')
 
                         if title and href and len(title) > 10:
-                            # 处理相对URL
-                            if not href.startswith('http'):
-                                if href.startswith('//'):
-                                    href = 'https:' + href
-                                elif href.startswith('/'):
-                                    href = 'https://www.10jqka.com.cn' + href
-                                else:
-                                    href = 'https://www.10jqka.com.cn/' + href
-
                             # 获取时间标签
                             time_tag = item.find(['span', 'time'], class_=lambda x: x and 'time' in str(x).lower())
                             time_str = time_tag.get_text(strip=True) if time_tag else ""
+                            published = parse_published(time_str) or parse_date_from_url(href)
+                            if self.is_stale(published):
+                                continue
+
+                            # 规范化（补全相对URL）并去重
+                            href = self.claim_url(href, url)
+                            if not href:
+                                continue
 
                             # 获取内容
                             content = self.fetch_full_article(href)
@@ -1000,6 +1173,7 @@ class NewsFetcher:
                                 'content': content[:2000],
                                 'summary': summary,
                                 'source': source_name,
+                                'published_at': to_local_iso(published),
                                 'fetched_at': datetime.now().isoformat()
                             })
 
@@ -1044,7 +1218,7 @@ class NewsFetcher:
             for url in urls_to_try:
                 try:
                     print(f"      尝试: {url[:50]}...")
-                    response = requests.get(url, headers=headers, proxies=PROXIES, timeout=30)
+                    response = self.http_get(url, headers=headers, timeout=30)
                     response.raise_for_status()
                     soup = BeautifulSoup(response.content, 'lxml')
 
@@ -1093,14 +1267,14 @@ class NewsFetcher:
                                 continue
 
                         if title and href and len(title) > 10:
-                            # 处理相对URL
-                            if not href.startswith('http'):
-                                if href.startswith('//'):
-                                    href = 'https:' + href
-                                elif href.startswith('/'):
-                                    href = 'https://www.cs.com.cn' + href
-                                else:
-                                    href = 'https://www.cs.com.cn/' + href
+                            published = self._element_published(item, href)
+                            if self.is_stale(published):
+                                continue
+
+                            # 规范化（补全相对URL）并去重
+                            href = self.claim_url(href, url)
+                            if not href:
+                                continue
 
                             # 获取内容
                             content = self.fetch_full_article(href)
@@ -1119,6 +1293,7 @@ class NewsFetcher:
                                 'content': content[:2000],
                                 'summary': summary,
                                 'source': source_name,
+                                'published_at': to_local_iso(published),
                                 'fetched_at': datetime.now().isoformat()
                             })
 
@@ -1151,7 +1326,7 @@ class NewsFetcher:
         try:
             headers = {'User-Agent': 'Mozilla/5.0'}
 
-            response = requests.get(url, headers=headers, proxies=PROXIES, timeout=30)
+            response = self.http_get(url, headers=headers, timeout=30)
             response.raise_for_status()
             soup = BeautifulSoup(response.content, 'lxml')
 
@@ -1169,8 +1344,13 @@ class NewsFetcher:
                     title = item.get_text(strip=True)
 
                     if title and href and len(title) > 10:
-                        if not href.startswith('http'):
-                            href = url.rstrip('/') + '/' + href.lstrip('/')
+                        published = self._element_published(item.parent, href)
+                        if self.is_stale(published):
+                            continue
+
+                        href = self.claim_url(href, url)
+                        if not href:
+                            continue
 
                         content = self.fetch_full_article(href)
                         if content and len(content) > 100:
@@ -1186,6 +1366,7 @@ class NewsFetcher:
                                 'content': content[:2000],
                                 'summary': summary,
                                 'source': source_name,
+                                'published_at': to_local_iso(published),
                                 'fetched_at': datetime.now().isoformat()
                             })
 
@@ -1201,11 +1382,8 @@ class NewsFetcher:
         return articles
 
     def _generate_summary(self, title: str, content: str) -> str:
-        """生成简单摘要"""
-        sentences = re.split(r'[。\n\r\.!]+', content)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 5]
-
-        key_sentences = sentences[:2] if len(sentences) >= 2 else sentences
+        """生成简单摘要（TextRank抽取2个关键句）"""
+        key_sentences = summarizer.key_sentences(content, max_sentences=2, title=title)
 
         summary = "【摘要】\n"
         for sent in key_sentences:
@@ -1220,7 +1398,7 @@ class NewsFetcher:
         return summary.strip()
 
     def fetch_all_sources(self, max_articles_per_source: int = 5) -> Dict[str, List[Dict]]:
-        """从所有配置的源获取新闻"""
+        """从所有配置的源获取新闻（多个源并发抓取，按域名交替排序，单个站点仍按限速请求）"""
         all_articles = {}
 
         print("=" * 60)
@@ -1232,23 +1410,28 @@ class NewsFetcher:
         print()
 
         enabled_sources = {k: v for k, v in self.sources.items() if v.get('enabled', False)}
+        self.begin_run()
 
         print(f"启用的源: {len(enabled_sources)}")
         print()
 
-        for source_name, source_config in enabled_sources.items():
+        def fetch_source(source_name):
             print(f"[{source_name}]")
-
-            articles = self.fetch_with_retries(source_name, source_config, max_articles_per_source)
-
+            articles = self.fetch_with_retries(source_name, enabled_sources[source_name], max_articles_per_source)
             if articles:
-                all_articles[source_name] = articles
-                print(f"  [OK] 成功: {len(articles)} 篇")
+                print(f"  [OK] {source_name} 成功: {len(articles)} 篇")
             else:
-                all_articles[source_name] = []
-                print(f"  [FAIL] 失败: 0 篇")
-
-            print()
+                print(f"  [FAIL] {source_name} 失败: 0 篇")
+            return articles
+
+        ordered = self.politeness.interleave(enabled_sources, key=lambda name: self.source_url(enabled_sources[name]))
+        workers = (config.load_yaml_config().get('pipeline') or {}).get('fetch_workers', 4)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            results = dict(zip(ordered, executor.map(fetch_source, ordered)))
+        # 结果按配置顺序排列
+        for source_name in enabled_sources:
+            all_articles[source_name] = results.get(source_name) or []
+        print()
 
         # 保存成功方法
         self.save_success_methods()
@@ -1305,7 +1488,7 @@ def test_one_news():
 
 【测试新闻】
 来源: {article['source']}
-时间: {article['fetched_at'][:16]}
+时间: {(article.get('published_at') or article['fetched_at'])[:16]}
 
 标题: {article['title']}
 
@@ -1315,25 +1498,11 @@ def test_one_news():
 {'='*50}
 """
 
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    data = {
-        "chat_id": CHAT_ID,
-        "text": message
-    }
-
-    try:
-        response = requests.post(url, json=data, proxies=PROXIES, timeout=30)
-        result = response.json()
-
-        if result.get('ok'):
-            print("[成功] 已发送到Telegram!")
-            return True
-        else:
-            print(f"[失败] {result}")
-            return False
-
-    except Exception as e:
-        print(f"[错误] {e}")
+    if get_telegram_client().send_message(CHAT_ID, message):
+        print("[成功] 已发送到Telegram!")
+        return True
+    else:
+        print("[失败] 发送失败")
         return False
 
 
@@ -1345,17 +1514,10 @@ if __name__ == '__main__':
 
     # 完整模式：抓取所有源
     else:
+        # 每个源抓取成功后即通过文章回调追加到归档（data/archive），不再整体转储JSON
         fetcher = NewsFetcher()
-        all_articles = fetcher.fetch_all_sources(max_articles_per_source=5)
-
-        # 保存结果
-        data_dir = Path(__file__).parent / 'data'
-        data_dir.mkdir(exist_ok=True)
-
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = data_dir / f'all_sources_{timestamp}.json'
-
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(all_articles, f, ensure_ascii=False, indent=2)
+        fetcher.fetch_all_sources(max_articles_per_source=5)
 
-        print(f"\n数据已保存: {filename}")
+        archive = get_news_archive()
+        stats = archive.get_stats()
+        print(f"\n数据已归档: {archive.root}（{stats['dates']} 天，{stats['records']} 条记录）")
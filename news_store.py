@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+新闻数据存储（SQLite，WAL模式）
+- 统一保存文章、抓取统计、成功方法、AI总结、发送记录、用户偏好和Bot状态（data/news.db）
+- Bot、OpenClaw Skill和定时推送可同时运行：WAL允许多个进程并发读，写入由SQLite加锁串行化
+- 每个线程使用独立的读连接；写入先进入缓冲区，攒满batch_size或超过flush_interval后一次事务批量提交
+- 首次打开时导入旧的success_methods.json、user_preferences.json和last_update_id.txt
+"""
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url_hash TEXT UNIQUE NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    summary TEXT,
+    content TEXT,
+    source TEXT,
+    published_at TEXT,
+    fetched_at TEXT,
+    tags TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source, published_at);
+CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published_at);
+CREATE TABLE IF NOT EXISTS fetch_stats (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    method TEXT,
+    success INTEGER NOT NULL,
+    articles INTEGER NOT NULL,
+    elapsed REAL,
+    error TEXT,
+    fetched_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fetch_stats_source ON fetch_stats(source, fetched_at);
+CREATE TABLE IF NOT EXISTS success_methods (
+    source TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS summaries (
+    id INTEGER PRIMARY KEY,
+    url_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_url ON summaries(url_hash, created_at);
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    url_hash TEXT,
+    chars INTEGER NOT NULL,
+    ok INTEGER NOT NULL,
+    sent_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_chat ON deliveries(chat_id, sent_at);
+CREATE TABLE IF NOT EXISTS preferences (
+    user_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (user_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+_UPSERT_ARTICLE = """
+INSERT INTO articles (url_hash, url, title, summary, content, source, published_at, fetched_at, tags)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(url_hash) DO UPDATE SET
+    title = excluded.title, summary = excluded.summary, content = excluded.content,
+    source = excluded.source, published_at = COALESCE(excluded.published_at, articles.published_at),
+    fetched_at = excluded.fetched_at, tags = excluded.tags
+"""
+
+# 用户偏好默认值（OpenClaw Skill使用）
+DEFAULT_PREFERENCES = {
+    'preferred_sources': [],  # 用户偏好的新闻源
+    'keywords': [],            # 关注的关键词
+    'language': 'zh',          # 语言偏好
+    'max_articles': 5          # 每次获取的最大文章数
+}
+
+
+def url_hash(url: str) -> str:
+    """URL的短哈希（文章主键）"""
+    return hashlib.sha1((url or '').encode('utf-8')).hexdigest()[:16]
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class NewsStore:
+    """SQLite数据访问层（线程安全）"""
+
+    def __init__(self, db_path: Optional[Path] = None, batch_size: int = 200, flush_interval: float = 1.0):
+        """
+        Args:
+            db_path: 数据库文件路径，默认data/news.db
+            batch_size: 缓冲的写入条数达到此值时立即提交
+            flush_interval: 缓冲写入最长等待秒数
+        """
+        self.db_path = Path(db_path) if db_path else Path(__file__).parent / 'data' / 'news.db'
+        self.db_path.parent.mkdir(exist_ok=True)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.local = threading.local()
+
+        # 写连接只在持有write_lock时使用
+        self.write_lock = threading.Lock()
+        self.writer = self._connect()
+        self.writer.executescript(_SCHEMA)
+        self.writer.commit()
+
+        self.pending_lock = threading.Lock()
+        self.pending = []  # [(sql, 参数)]
+        self.closed = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_loop, name='news-store-flush', daemon=True)
+        self.flusher.start()
+        atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """当前线程的读连接"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self.local.conn = conn
+        return conn
+
+    # ==================== 批量写入 ====================
+
+    def _queue(self, sql: str, rows: List[tuple]):
+        """写入缓冲区，达到batch_size时立即提交"""
+        if not rows:
+            return
+        with self.pending_lock:
+            self.pending.extend((sql, row) for row in rows)
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """提交缓冲区中的全部写入（同一事务，相同SQL合并为executemany）"""
+        with self.write_lock:
+            with self.pending_lock:
+                pending, self.pending = self.pending, []
+            if not pending:
+                return
+            groups = []
+            for sql, row in pending:
+                if groups and groups[-1][0] == sql:
+                    groups[-1][1].append(row)
+                else:
+                    groups.append((sql, [row]))
+            try:
+                with self.writer:
+                    for sql, rows in groups:
+                        self.writer.executemany(sql, rows)
+            except sqlite3.Error as e:
+                print(f"[ERROR] 写入数据库失败（{len(pending)} 条）: {e}")
+
+    def _flush_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def _execute(self, sql: str, params: tuple = ()):
+        """立即执行单条写入（先提交缓冲区，保证顺序）"""
+        self.flush()
+        with self.write_lock:
+            with self.writer:
+                self.writer.execute(sql, params)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """查询（先提交本进程的缓冲写入，保证读到自己的写入）"""
+        self.flush()
+        return self._reader().execute(sql, params).fetchall()
+
+    # ==================== 文章 ====================
+
+    def add_articles(self, articles: List[Dict]) -> int:
+        """写入文章（同一URL已存在时更新），返回写入数"""
+        rows = []
+        for article in articles:
+            url = article.get('url')
+            if not url:
+                continue
+            rows.append((url_hash(url), url, article.get('title', ''), article.get('summary', ''),
+                         article.get('content', ''), article.get('source', ''), article.get('published_at'),
+                         article.get('fetched_at') or _now(),
+                         json.dumps(article.get('tags') or {}, ensure_ascii=False)))
+        self._queue(_UPSERT_ARTICLE, rows)
+        return len(rows)
+
+    @staticmethod
+    def _article_from_row(row: sqlite3.Row) -> Dict:
+        article = dict(row)
+        article.pop('id', None)
+        article['tags'] = json.loads(article.get('tags') or '{}')
+        return article
+
+    def get_article(self, url: str) -> Optional[Dict]:
+        rows = self._query('SELECT * FROM articles WHERE url_hash = ?', (url_hash(url),))
+        return self._article_from_row(rows[0]) if rows else None
+
+    def recent_articles(self, since: Optional[datetime] = None, sources: Optional[List[str]] = None,
+                        limit: int = 100) -> List[Dict]:
+        """按发布时间（缺失时按抓取时间）倒序返回文章"""
+        filters, params = [], []
+        if since is not None:
+            filters.append('COALESCE(published_at, fetched_at) >= ?')
+            params.append(since.isoformat())
+        if sources:
+            filters.append(f"source IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        where = f"WHERE {' AND '.join(filters)}" if filters else ''
+        rows = self._query(f'SELECT * FROM articles {where} ORDER BY COALESCE(published_at, fetched_at) DESC '
+                           f'LIMIT ?', tuple(params) + (limit,))
+        return [self._article_from_row(row) for row in rows]
+
+    # ==================== 抓取统计和成功方法 ====================
+
+    def record_fetch(self, source: str, method: Optional[str], success: bool, articles: int = 0,
+                     elapsed: Optional[float] = None, error: Optional[str] = None):
+        """记录一次源抓取"""
+        self._queue('INSERT INTO fetch_stats (source, method, success, articles, elapsed, error, fetched_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(source, method, int(success), articles, elapsed, (error or '')[:200] or None, _now())])
+
+    def fetch_summary(self, days: int = 7) -> Dict[str, Dict]:
+        """近N天各源的抓取成功率、平均耗时和文章数"""
+        since = (datetime.now() - timedelta(days=days)).isoformat()
+        rows = self._query('SELECT source, COUNT(*), SUM(success), AVG(elapsed), SUM(articles) FROM fetch_stats '
+                           'WHERE fetched_at >= ? GROUP BY source', (since,))
+        return {row[0]: {'runs': row[1], 'successes': row[2], 'avg_elapsed': row[3], 'articles': row[4]}
+                for row in rows}
+
+    def get_success_methods(self) -> Dict[str, str]:
+        """各源最近成功的抓取方法名"""
+        return {row[0]: row[1] for row in self._query('SELECT source, method FROM success_methods ORDER BY source')}
+
+    def set_success_methods(self, methods: Dict[str, str]):
+        self._queue('INSERT INTO success_methods (source, method, updated_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT(source) DO UPDATE SET method = excluded.method, updated_at = excluded.updated_at',
+                    [(source, method, _now()) for source, method in methods.items()])
+
+    # ==================== 总结和发送记录 ====================
+
+    def save_summary(self, url: str, summary: str, status: str):
+        """保存文章总结（status: ai / fallback / local 等）"""
+        if url and summary:
+            self._queue('INSERT INTO summaries (url_hash, status, summary, created_at) VALUES (?, ?, ?, ?)',
+                        [(url_hash(url), status, summary, _now())])
+
+    def get_summary(self, url: str, status: Optional[str] = None,
+                    max_age_hours: Optional[float] = None) -> Optional[str]:
+        """最近一次的文章总结，可按状态和时效过滤"""
+        sql = 'SELECT summary FROM summaries WHERE url_hash = ?'
+        params = [url_hash(url)]
+        if status:
+            sql += ' AND status = ?'
+            params.append(status)
+        if max_age_hours:
+            sql += ' AND created_at >= ?'
+            params.append((datetime.now() - timedelta(hours=max_age_hours)).isoformat())
+        rows = self._query(sql + ' ORDER BY created_at DESC, id DESC LIMIT 1', tuple(params))
+        return rows[0][0] if rows else None
+
+    def record_delivery(self, chat_id: str, kind: str, ok: bool, chars: int = 0, url: Optional[str] = None):
+        """记录一条Telegram消息的发送结果（kind: digest / command / alert 等）"""
+        self._queue('INSERT INTO deliveries (chat_id, kind, url_hash, chars, ok, sent_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(str(chat_id), kind, url_hash(url) if url else None, chars, int(ok), _now())])
+
+    def delivered_urls(self, chat_id: str, since: datetime) -> set:
+        """指定时间后已成功推送给chat的文章URL哈希"""
+        rows = self._query('SELECT DISTINCT url_hash FROM deliveries WHERE chat_id = ? AND ok = 1 '
+                           'AND url_hash IS NOT NULL AND sent_at >= ?', (str(chat_id), since.isoformat()))
+        return {row[0] for row in rows}
+
+    # ==================== 用户偏好和状态 ====================
+
+    def get_preferences(self, user_id: str = '') -> Dict:
+        preferences = dict(DEFAULT_PREFERENCES)
+        for row in self._query('SELECT key, value FROM preferences WHERE user_id = ?', (str(user_id),)):
+            preferences[row[0]] = json.loads(row[1])
+        return preferences
+
+    def set_preference(self, key: str, value: Any, user_id: str = ''):
+        self._execute('INSERT INTO preferences (user_id, key, value) VALUES (?, ?, ?) '
+                      'ON CONFLICT(user_id, key) DO UPDATE SET value = excluded.value',
+                      (str(user_id), key, json.dumps(value, ensure_ascii=False)))
+
+    def get_value(self, key: str, default: Any = None) -> Any:
+        """读取状态值（JSON）"""
+        rows = self._query('SELECT value FROM kv WHERE key = ?', (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set_value(self, key: str, value: Any):
+        """立即写入状态值（JSON），不经过缓冲区"""
+        self._execute('INSERT INTO kv (key, value, updated_at) VALUES (?, ?, ?) '
+                      'ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at',
+                      (key, json.dumps(value, ensure_ascii=False), _now()))
+
+    # ==================== 维护 ====================
+
+    def migrate_legacy_files(self, data_dir: Optional[Path] = None):
+        """导入旧的JSON/文本状态文件，导入后重命名为*.migrated"""
+        data_dir = Path(data_dir) if data_dir else self.db_path.parent
+        legacy = [
+            ('success_methods.json', lambda text: self.set_success_methods(json.loads(text))),
+            ('user_preferences.json', lambda text: [self.set_preference(key, value)
+                                                   for key, value in json.loads(text).items()]),
+            ('last_update_id.txt', lambda text: self.set_value('telegram.last_update_id', int(text.strip()))),
+        ]
+        for filename, load in legacy:
+            path = data_dir / filename
+            if not path.exists():
+                continue
+            try:
+                load(path.read_text(encoding='utf-8'))
+                self.flush()
+                path.replace(path.with_name(path.name + '.migrated'))
+                print(f"已导入 {filename} 到 {self.db_path.name}")
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"[WARN] 导入 {filename} 失败: {e}")
+
+    def prune(self, retention_days: int) -> int:
+        """删除超过保留天数的文章、统计、总结和发送记录，返回删除的文章数"""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        self.flush()
+        with self.write_lock:
+            with self.writer:
+                cursor = self.writer.execute('DELETE FROM articles WHERE COALESCE(published_at, fetched_at) < ?',
+                                             (cutoff,))
+                removed = cursor.rowcount
+                self.writer.execute('DELETE FROM fetch_stats WHERE fetched_at < ?', (cutoff,))
+                self.writer.execute('DELETE FROM summaries WHERE created_at < ?', (cutoff,))
+                self.writer.execute('DELETE FROM deliveries WHERE sent_at < ?', (cutoff,))
+        return removed
+
+    def close(self):
+        self.closed.set()
+        self.flush()
+        with self.write_lock:
+            self.writer.close()
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_news_store() -> NewsStore:
+    """获取进程内共享的数据存储（首次打开时导入旧状态文件并按data_retention_days清理）"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            yaml_config = config.load_yaml_config()
+            store_config = yaml_config.get('store') or {}
+            _default_store = NewsStore(batch_size=store_config.get('batch_size', 200),
+                                       flush_interval=store_config.get('flush_interval', 1.0))
+            _default_store.migrate_legacy_files()
+            retention_days = yaml_config.get('data_retention_days')
+            if retention_days:
+                _default_store.prune(int(retention_days))
+        return _default_store
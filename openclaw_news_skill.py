@@ -4,61 +4,98 @@ OpenClaw News Skill
 金融新闻获取Skill - 可被OpenClaw调用
 """
 import sys
-import json
-import requests
-from datetime import datetime
-from pathlib import Path
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Callable
 
 # 导入新闻抓取器
 from news_fetcher_v2 import NewsFetcher
-from config import PROXIES, BOT_TOKEN, CHAT_ID
+from config import CHAT_ID, config
+from telegram_client import get_telegram_client
+from message_packer import split_text
+from snapshot_cache import SnapshotCache
+from search_index import get_search_index
+from news_store import get_news_store
+from mention_history import get_mention_history, format_mentions
+
+# 进程内共享的新闻快照（Bot命令和OpenClaw接口函数共用）
+_snapshot_cache = None
+
+
+def get_snapshot_cache() -> SnapshotCache:
+    """获取进程内共享的新闻快照缓存（按config.yaml的news_cache配置创建）"""
+    global _snapshot_cache
+    if _snapshot_cache is None:
+        cache_config = config.load_yaml_config().get('news_cache') or {}
+        _snapshot_cache = SnapshotCache(ttl=cache_config.get('ttl_seconds', 600),
+                                        max_stale=cache_config.get('max_stale_seconds', 3600))
+    return _snapshot_cache
+
 
 class OpenClawNewsSkill:
     """OpenClaw新闻Skill"""
 
     def __init__(self):
         self.fetcher = NewsFetcher()
-        self.user_preferences_file = Path(__file__).parent / 'data' / 'user_preferences.json'
+        self.store = get_news_store()
         self.user_preferences = self.load_user_preferences()
+        self.snapshots = get_snapshot_cache()
+        cache_config = config.load_yaml_config().get('news_cache') or {}
+        # 快照按此文章数抓取，一次抓取可同时满足/news和/news10
+        self.snapshot_max_articles = cache_config.get('max_articles', 10)
 
     def load_user_preferences(self) -> Dict:
-        """加载用户偏好"""
-        if self.user_preferences_file.exists():
-            try:
-                with open(self.user_preferences_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
-        return {
-            'preferred_sources': [],  # 用户偏好的新闻源
-            'keywords': [],            # 关注的关键词
-            'language': 'zh',          # 语言偏好
-            'max_articles': 5          # 每次获取的最大文章数
-        }
+        """加载用户偏好（未设置的项使用默认值）"""
+        return self.store.get_preferences()
 
     def save_user_preferences(self):
         """保存用户偏好"""
-        data_dir = Path(__file__).parent / 'data'
-        data_dir.mkdir(exist_ok=True)
-
-        with open(self.user_preferences_file, 'w', encoding='utf-8') as f:
-            json.dump(self.user_preferences, f, ensure_ascii=False, indent=2)
+        for key, value in self.user_preferences.items():
+            self.store.set_preference(key, value)
 
-    def get_news_summary(self, max_articles: int = 5, sources: Optional[List[str]] = None) -> Dict:
+    def get_news_summary(self, max_articles: int = 5, sources: Optional[List[str]] = None,
+                         use_cache: bool = True) -> Dict:
         """
         获取新闻摘要
 
+        默认从最近的新闻快照返回：快照在TTL内直接使用，过期后先返回旧快照并在后台刷新；
+        多个请求同时需要抓取时只抓取一次
+
         Args:
             max_articles: 每个源最多获取的文章数（默认5）
             sources: 指定新闻源列表（None表示使用所有启用的源）
+            use_cache: 是否使用快照，False时直接抓取
 
         Returns:
-            包含新闻数据和统计信息的字典
+            包含新闻数据和统计信息的字典（snapshot_age为快照年龄秒数）
         """
+        if not use_cache:
+            result = self._fetch_news_summary(max_articles, sources)
+            result['snapshot_age'] = 0.0
+            return result
+
+        fetch_count = max(max_articles, self.snapshot_max_articles)
+        key = tuple(sorted(sources)) if sources else None
+        snapshot, age = self.snapshots.get(
+            key,
+            lambda: self._fetch_news_summary(fetch_count, sources),
+            accept=lambda cached: cached['max_articles'] >= max_articles
+        )
+
+        # 按本次请求的文章数截取
+        all_articles = {source: articles[:max_articles] for source, articles in snapshot['articles'].items()}
+        return {
+            **snapshot,
+            'total_articles': sum(len(articles) for articles in all_articles.values()),
+            'articles': all_articles,
+            'snapshot_age': age,
+        }
+
+    def _fetch_news_summary(self, max_articles: int, sources: Optional[List[str]] = None) -> Dict:
+        """抓取新闻并统计"""
         # 获取新闻
         if sources:
             # 只获取指定源的新闻
+            self.fetcher.begin_run()
             all_articles = {}
             for source_name in sources:
                 if source_name in self.fetcher.sources:
@@ -82,39 +119,59 @@ class OpenClawNewsSkill:
             'total_sources': len(all_articles),
             'successful_sources': successful_sources,
             'total_articles': total_articles,
+            'max_articles': max_articles,
             'articles': all_articles
         }
 
-    def get_news_by_keyword(self, keyword: str, max_articles: int = 10) -> List[Dict]:
+    def get_news_by_keyword(self, keyword: str, max_articles: int = 10, sources: Optional[List[str]] = None,
+                            days: Optional[int] = None) -> List[Dict]:
         """
-        根据关键词获取新闻
+        根据关键词搜索新闻（检索历史抓取的全部文章，按BM25相关度排序）
 
         Args:
             keyword: 搜索关键词
             max_articles: 最大文章数
+            sources: 只搜索这些来源
+            days: 只搜索最近几天的文章
 
         Returns:
             匹配的文章列表
         """
-        result = self.get_news_summary(max_articles=5)
+        index = get_search_index()
+        # 索引为空时先抓取一次快照（抓取结果会写入索引）
+        if index.count() == 0:
+            self.get_news_summary(max_articles=self.snapshot_max_articles)
 
-        matching_articles = []
-        for source, articles in result['articles'].items():
-            for article in articles:
-                # 在标题和摘要中搜索关键词
-                if keyword.lower() in article['title'].lower() or keyword.lower() in article['summary'].lower():
-                    matching_articles.append({
-                        **article,
-                        'matched_source': source
-                    })
+        since = datetime.now() - timedelta(days=days) if days else None
+        results = index.search(keyword, limit=max_articles, sources=sources, since=since)
+        return [{**article, 'matched_source': article['source']} for article in results]
 
-                if len(matching_articles) >= max_articles:
-                    break
+    def get_mention_trend(self, keyword: str, days: int = 90, sources: Optional[List[str]] = None) -> Dict:
+        """
+        关键词每日提及统计（来自列式提及历史，不重新解析归档）
 
-            if len(matching_articles) >= max_articles:
-                break
+        Args:
+            keyword: config.yaml中的关键词或分类名（如NVIDIA、companies）
+            days: 统计最近几天
+            sources: 只统计这些来源
 
-        return matching_articles
+        Returns:
+            {'keyword', 'terms', 'total', 'dates', 'sources', 'per_day', 'per_source', 'counts', 'text'}
+        """
+        result = get_mention_history().mentions(keyword, days=days, sources=sources)
+        counts = result['counts']
+        source_names = {name: cfg.get('name', name) for name, cfg in self.fetcher.sources.items()}
+        return {
+            'keyword': keyword,
+            'terms': result['terms'],
+            'total': result['total'],
+            'dates': [d.isoformat() for d in result['dates']],
+            'sources': result['sources'],
+            'per_day': counts.sum(axis=1).tolist(),
+            'per_source': {source: int(n) for source, n in zip(result['sources'], counts.sum(axis=0)) if n},
+            'counts': counts.tolist(),
+            'text': format_mentions(result, source_names),
+        }
 
     def send_to_telegram(self, articles_data: Dict, chat_id: Optional[str] = None) -> bool:
         """
@@ -156,42 +213,21 @@ class OpenClawNewsSkill:
 
         message = "\n".join(message_parts)
 
-        # 分批发送（Telegram消息长度限制）
-        max_length = 4000
-        if len(message) > max_length:
-            # 分批发送
-            success = True
-            for i in range(0, len(message), max_length):
-                chunk = message[i:i+max_length]
-                if not self._send_telegram_message(chunk, chat_id):
-                    success = False
-            return success
-        else:
-            return self._send_telegram_message(message, chat_id)
+        # 分批发送（Telegram消息长度限制，在段落或行边界拆分）
+        success = True
+        for chunk in split_text(message):
+            if not self._send_telegram_message(chunk, chat_id):
+                success = False
+        return success
 
     def _send_telegram_message(self, message: str, chat_id: str) -> bool:
-        """发送单条Telegram消息"""
-        url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-        data = {"chat_id": chat_id, "text": message}
-
-        try:
-            response = requests.post(url, json=data, proxies=PROXIES, timeout=30)
-            result = response.json()
-
-            if result.get('ok'):
-                return True
-            else:
-                print(f"[ERROR] Telegram API error: {result}")
-                return False
-
-        except Exception as e:
-            print(f"[ERROR] Failed to send: {e}")
-            return False
+        """发送单条Telegram消息（经共享发送队列限速）"""
+        return get_telegram_client().send_message(chat_id, message)
 
     def set_preference(self, key: str, value):
         """设置用户偏好"""
         self.user_preferences[key] = value
-        self.save_user_preferences()
+        self.store.set_preference(key, value)
 
     def get_preference(self, key: str, default=None):
         """获取用户偏好"""
@@ -288,6 +324,22 @@ def search_news(keyword: str, max_articles: int = 10) -> str:
     return "\n".join(output)
 
 
+def mention_trend(keyword: str, days: int = 90, sources: Optional[List[str]] = None) -> str:
+    """
+    关键词每日提及统计（OpenClaw调用接口）
+
+    Args:
+        keyword: config.yaml中的关键词或分类名
+        days: 统计最近几天
+        sources: 只统计这些来源
+
+    Returns:
+        统计结果文本
+    """
+    skill = OpenClawNewsSkill()
+    return skill.get_mention_trend(keyword, days=days, sources=sources)['text']
+
+
 # ==================== 测试入口 ====================
 
 if __name__ == '__main__':
@@ -300,7 +352,7 @@ if __name__ == '__main__':
     skill = OpenClawNewsSkill()
 
     # 只获取1条新闻
-    result = skill.get_news_summary(max_articles=1, sources=['sina_finance'])
+    result = skill.get_news_summary(max_articles=1, sources=['sina_finance'], use_cache=False)
 
     print(f"状态: {result['status']}")
     print(f"文章数: {result['total_articles']}")
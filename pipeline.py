@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+流水线执行器（生产者/消费者）
+- 各阶段之间用有界队列连接，下游处理不过来时上游阻塞（背压），内存占用保持平稳
+- 每个阶段独立设置并发数
+- 总耗时接近最慢的阶段，而不是各阶段耗时之和
+- 统计每个阶段的处理量、忙碌时间、背压等待时间和首个输出时间
+- 阶段可设置优先级：输入队列中等待的条目按优先级从高到低取出
+"""
+import itertools
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# 阶段结束标记
+_DONE = object()
+
+
+class _PriorityQueue(queue.PriorityQueue):
+    """按priority(item)从高到低取出的有界队列，结束标记排在所有条目之后"""
+
+    def __init__(self, maxsize: int, priority: Callable[[Any], float]):
+        super().__init__(maxsize)
+        self.priority = priority
+        self.counter = itertools.count()
+
+    def put(self, item, block=True, timeout=None):
+        if item is _DONE:
+            key = float('inf')
+        else:
+            try:
+                key = -float(self.priority(item))
+            except Exception:
+                key = 0.0
+        # 优先级相同时按进入顺序
+        super().put((key, next(self.counter), item), block, timeout)
+
+    def get(self, block=True, timeout=None):
+        return super().get(block, timeout)[2]
+
+
+class Stage:
+    """流水线阶段"""
+
+    def __init__(self, name: str, func: Callable[[Any, Callable[[Any], None]], None], workers: int = 1,
+                 on_finish: Optional[Callable[[], None]] = None,
+                 flush: Optional[Callable[[Callable[[Any], None]], None]] = None,
+                 priority: Optional[Callable[[Any], float]] = None):
+        """
+        Args:
+            name: 阶段名称（用于日志和统计）
+            func: 处理函数 func(item, emit)，调用emit(output)把结果交给下一阶段（可调用0次或多次）
+            workers: 并发线程数
+            on_finish: 本阶段全部处理完成后的回调
+            flush: 本阶段全部输入处理完后调用flush(emit)，用于需要看到全部输入才能输出的聚合阶段
+            priority: 输入的优先级priority(item)，设置后空闲线程先处理队列中优先级最高的条目
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.on_finish = on_finish
+        self.flush = flush
+        self.priority = priority
+        self.stats = {}
+
+    def reset_stats(self):
+        self.stats = {'in': 0, 'out': 0, 'errors': 0, 'busy': 0.0, 'blocked': 0.0,
+                      'first_output': None, 'finished': None}
+
+
+class Pipeline:
+    """多阶段流水线"""
+
+    def __init__(self, stages: List[Stage], queue_size: int = 8):
+        """
+        Args:
+            stages: 阶段列表（按顺序）
+            queue_size: 阶段间队列容量
+        """
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.started = None
+        self.lock = threading.Lock()
+
+    def _worker(self, index: int, queues: List[queue.Queue], remaining: List[int]):
+        """阶段工作线程：取出输入、处理、把输出放入下一队列"""
+        stage = self.stages[index]
+        in_queue = queues[index]
+        out_queue = queues[index + 1] if index + 1 < len(self.stages) else None
+
+        def emit(output):
+            with self.lock:
+                stage.stats['out'] += 1
+                if stage.stats['first_output'] is None:
+                    stage.stats['first_output'] = time.monotonic() - self.started
+            if out_queue is not None:
+                blocked_started = time.monotonic()
+                out_queue.put(output)
+                with self.lock:
+                    stage.stats['blocked'] += time.monotonic() - blocked_started
+
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                break
+            with self.lock:
+                stage.stats['in'] += 1
+            busy_started = time.monotonic()
+            try:
+                stage.func(item, emit)
+            except Exception as e:
+                print(f"  [WARN] 流水线阶段 {stage.name} 处理失败: {str(e)[:100]}")
+                with self.lock:
+                    stage.stats['errors'] += 1
+            finally:
+                with self.lock:
+                    stage.stats['busy'] += time.monotonic() - busy_started
+
+        # 本阶段最后一个线程退出时通知下游
+        with self.lock:
+            remaining[index] -= 1
+            last = remaining[index] == 0
+            if last:
+                stage.stats['finished'] = time.monotonic() - self.started
+        if last:
+            if stage.flush:
+                busy_started = time.monotonic()
+                try:
+                    stage.flush(emit)
+                except Exception as e:
+                    print(f"  [WARN] 流水线阶段 {stage.name} 汇总输出失败: {str(e)[:100]}")
+                    with self.lock:
+                        stage.stats['errors'] += 1
+                finally:
+                    with self.lock:
+                        stage.stats['busy'] += time.monotonic() - busy_started
+                        stage.stats['finished'] = time.monotonic() - self.started
+            if stage.on_finish:
+                try:
+                    stage.on_finish()
+                except Exception as e:
+                    print(f"  [WARN] 流水线阶段 {stage.name} 完成回调失败: {e}")
+            if out_queue is not None:
+                for _ in range(self.stages[index + 1].workers):
+                    out_queue.put(_DONE)
+
+    def run(self, inputs: Iterable[Any]) -> Dict[str, Dict]:
+        """
+        运行流水线直到所有输入处理完毕
+
+        Args:
+            inputs: 第一阶段的输入
+
+        Returns:
+            各阶段统计（阶段名 -> 统计）
+        """
+        self.started = time.monotonic()
+        for stage in self.stages:
+            stage.reset_stats()
+        queues = [_PriorityQueue(self.queue_size, stage.priority) if stage.priority
+                  else queue.Queue(maxsize=self.queue_size) for stage in self.stages]
+        remaining = [stage.workers for stage in self.stages]
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(target=self._worker, args=(index, queues, remaining),
+                                          name=f"{stage.name}-{n}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        for item in inputs:
+            queues[0].put(item)
+        for _ in range(self.stages[0].workers):
+            queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+        return {stage.name: dict(stage.stats) for stage in self.stages}
+
+    def print_stats(self, stats: Dict[str, Dict]):
+        """打印各阶段统计"""
+        total = time.monotonic() - self.started
+        print("-" * 60)
+        print(f"流水线统计（总耗时 {total:.1f}s）")
+        for stage in self.stages:
+            s = stats[stage.name]
+            first = f"{s['first_output']:.1f}s" if s['first_output'] is not None else '-'
+            print(f"  {stage.name:<8} 并发{stage.workers:>2}  输入{s['in']:>4}  输出{s['out']:>4}  "
+                  f"失败{s['errors']:>3}  忙碌{s['busy'] - s['blocked']:>6.1f}s  背压等待{s['blocked']:>6.1f}s  "
+                  f"首个输出{first:>7}  完成{s['finished'] or 0:>7.1f}s")
+        print("-" * 60)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+提示词构建器
+- 估算中英文混合文本的token数
+- 清理责任编辑/来源等模板化内容，去除重复句子
+- 按输入预算压缩新闻内容（超出预算时保留TextRank关键句），按预计输出长度选择max_tokens
+"""
+import math
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import config
+from extractive_summarizer import summarizer
+from text_utils import is_boilerplate, join_sentences, remove_inline_boilerplate, split_sentences
+
+# 中日韩统一表意文字及中文标点
+_CJK_RE = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+_WORD_RE = re.compile(r'[A-Za-z0-9]+')
+
+
+class PromptBuilder:
+    """按token预算构建提示词"""
+
+    def __init__(self, max_input_tokens: int = 3000, max_output_tokens: int = 8000,
+                 min_output_tokens: int = 512, output_tokens: Optional[Dict[str, int]] = None,
+                 item_max_tokens: int = 200):
+        """
+        初始化提示词构建器
+
+        Args:
+            max_input_tokens: 单次请求的输入token预算（含提示词模板）
+            max_output_tokens: max_tokens上限
+            min_output_tokens: max_tokens下限
+            output_tokens: 各类请求的预计输出token数，如 {'summary': 2000}
+            item_max_tokens: 多条新闻合并时每条新闻的token上限
+        """
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.min_output_tokens = min_output_tokens
+        self.output_tokens = output_tokens or {}
+        self.item_max_tokens = item_max_tokens
+
+    @classmethod
+    def from_config(cls) -> 'PromptBuilder':
+        """从config.yaml的ai.prompt配置创建"""
+        ai_config = config.load_yaml_config().get('ai') or {}
+        prompt_config = ai_config.get('prompt') or {}
+        return cls(
+            max_input_tokens=prompt_config.get('max_input_tokens', 3000),
+            max_output_tokens=prompt_config.get('max_output_tokens', 8000),
+            min_output_tokens=prompt_config.get('min_output_tokens', 512),
+            output_tokens=prompt_config.get('output_tokens'),
+            item_max_tokens=prompt_config.get('item_max_tokens', 200),
+        )
+
+    # ==================== token估算 ====================
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        估算token数
+
+        中文约每字0.7 token，英文单词约每4个字母1 token，其余符号每个按0.5计，结果向上取整
+        """
+        if not text:
+            return 0
+        cjk = len(_CJK_RE.findall(text))
+        words = _WORD_RE.findall(text)
+        word_tokens = sum(max(1, len(w) / 4) for w in words)
+        word_chars = sum(len(w) for w in words)
+        others = len(text) - cjk - word_chars - text.count(' ')
+        return math.ceil(cjk * 0.7 + word_tokens + max(others, 0) * 0.5)
+
+    def choose_max_tokens(self, kind: str, default: int = 2000) -> int:
+        """根据请求类型的预计输出长度选择max_tokens"""
+        expected = self.output_tokens.get(kind, default)
+        return max(self.min_output_tokens, min(self.max_output_tokens, int(expected)))
+
+    # ==================== 内容压缩 ====================
+
+    def compress(self, text: str) -> str:
+        """清理模板化内容和多余空白，去除重复句子"""
+        if not text:
+            return ''
+        kept = []
+        seen = set()
+        for sentence in split_sentences(remove_inline_boilerplate(text)):
+            if is_boilerplate(sentence):
+                continue
+            key = re.sub(r'\W+', '', sentence).lower()
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            kept.append(sentence)
+
+        return join_sentences(kept)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        压缩到token预算内
+
+        超出预算时按TextRank得分从高到低挑选句子，按原文顺序拼接；
+        最重要的句子单独超长时按比例截断字符
+        """
+        if max_tokens <= 0 or not text:
+            return ''
+        if self.estimate_tokens(text) <= max_tokens:
+            return text
+
+        sentences = split_sentences(text)
+        costs = [self.estimate_tokens(s) for s in sentences]
+        scores = summarizer.rank_sentences(sentences)
+        chosen = []
+        used = 0
+        for index in np.argsort(-scores, kind='stable'):
+            if used + costs[index] <= max_tokens:
+                chosen.append(int(index))
+                used += costs[index]
+
+        if not chosen and sentences:
+            index = int(np.argmax(scores))
+            ratio = max_tokens / max(costs[index], 1)
+            sentence = sentences[index]
+            return sentence[:max(1, int(len(sentence) * ratio))] + '...'
+
+        return join_sentences([sentences[i] for i in sorted(chosen)])
+
+    def fit(self, template: str, placeholder: str, text: str) -> str:
+        """
+        将内容填入模板，使整个提示词不超过输入预算
+
+        Args:
+            template: 提示词模板
+            placeholder: 模板中的占位符，如 '{content}'
+            text: 填入的内容（会先压缩）
+        """
+        overhead = self.estimate_tokens(template.replace(placeholder, ''))
+        budget = self.max_input_tokens - overhead
+        return template.replace(placeholder, self.truncate(self.compress(text), budget))
+
+    def fit_many(self, texts: List[str], budget: int) -> List[str]:
+        """
+        在总预算内压缩多段内容
+
+        短内容保留原样，剩余预算平均分给较长的内容，每段不超过item_max_tokens
+        """
+        compressed = [self.compress(t) for t in texts]
+        if not compressed:
+            return []
+        costs = [self.estimate_tokens(t) for t in compressed]
+        limits = [0] * len(compressed)
+        remaining = max(budget, 0)
+        pending = sorted(range(len(compressed)), key=lambda i: costs[i])
+
+        while pending:
+            share = min(remaining // len(pending), self.item_max_tokens)
+            i = pending.pop(0)
+            limits[i] = min(costs[i], share)
+            remaining -= limits[i]
+
+        return [self.truncate(t, limit) for t, limit in zip(compressed, limits)]
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+按域名选择代理路由
+- 路由：direct（直连）或代理池中的命名代理（默认代理名为proxy，即config.py的PROXIES）
+- 规则按域名后缀匹配（config.yaml的proxy_routing.rules），如国内站点直连、Telegram和海外站点走代理；
+  auto表示在全部可用路由中自动选择
+- 每个（域名, 路由）记录延迟EWMA和连续失败次数，优先使用最快的路由；连接失败或超时自动切换到下一个路由
+- 代理连续失败达到阈值后标记为不可用，冷却期过后在后台做健康检查，检查通过才恢复使用
+- 学到的路由统计保存在数据库（kv表），下次运行直接使用
+"""
+import atexit
+import ipaddress
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from config import PROXIES, config
+from news_store import get_news_store
+
+DIRECT = 'direct'
+AUTO = 'auto'
+DEFAULT_PROXY = 'proxy'
+# 直连的requests proxies参数（值为None才能屏蔽环境变量和系统代理）
+NO_PROXIES = {'http': None, 'https': None}
+
+# 延迟EWMA平滑系数（新样本权重）
+LATENCY_ALPHA = 0.3
+# 最多保存的域名数（按最近使用淘汰）
+MAX_HOSTS = 2000
+# 统计自动保存间隔（秒）
+SAVE_INTERVAL = 60
+
+# 连接失败类异常：换一个路由可能成功
+ROUTE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+def _is_local(host: str) -> bool:
+    """本机和内网地址（本地模拟服务等）始终直连"""
+    if host in ('localhost', ''):
+        return True
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return address.is_loopback or address.is_private
+
+
+class ProxyRouter:
+    """按域名的代理路由器（线程安全）"""
+
+    def __init__(self, pool: Optional[Dict[str, str]] = None, rules: Optional[List[Dict]] = None,
+                 default_route: str = AUTO, failover: bool = True, failure_threshold: int = 3,
+                 health_check_url: str = 'https://www.gstatic.com/generate_204', health_check_interval: float = 60,
+                 connect_timeout: float = 5, store=None, state_key: str = 'proxy_router.routes'):
+        """
+        Args:
+            pool: 代理池 {名称: 代理URL}，默认 {proxy: config.py的PROXIES}
+            rules: 路由规则 [{match: 域名后缀, route: direct/auto/代理名}]，按顺序匹配第一条
+            default_route: 未匹配规则的域名使用的路由
+            failover: 首选路由连接失败时是否尝试其他路由
+            failure_threshold: 代理连续失败多少次后标记为不可用
+            health_check_url: 代理健康检查地址
+            health_check_interval: 不可用代理的冷却时间（秒），过后做健康检查
+            connect_timeout: 后面还有备选路由时使用的连接超时（秒），尽快切换
+            store: NewsStore，用于保存学到的路由统计；None表示不保存
+            state_key: 保存在kv表中的键
+        """
+        self.pool = dict(pool) if pool is not None else {DEFAULT_PROXY: PROXIES.get('https') or PROXIES.get('http')}
+        self.rules = [(str(rule['match']).lower().lstrip('.'), str(rule.get('route', AUTO)))
+                      for rule in rules or [] if rule.get('match')]
+        self.default_route = default_route
+        self.failover = failover
+        self.failure_threshold = max(1, failure_threshold)
+        self.health_check_url = health_check_url
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self.store = store
+        self.state_key = state_key
+
+        self.lock = threading.Lock()
+        # {域名: {路由: {'latency': 秒, 'ok': 成功数, 'fail': 失败数, 'streak': 连续失败数, 'used': 时间}}}
+        self.hosts = {}
+        # 代理健康状态 {代理名: {'failures': 连续失败数, 'down_until': 时间戳或0}}
+        self.health = {name: {'failures': 0, 'down_until': 0.0} for name in self.pool}
+        self.checking = set()
+        self.dirty = False
+        self.last_save = time.time()
+        self.load()
+
+    @classmethod
+    def from_config(cls, store=None) -> 'ProxyRouter':
+        """从config.yaml的proxy_routing配置创建（未启用时所有请求走默认代理，与原来一致）"""
+        routing_config = config.load_yaml_config().get('proxy_routing') or {}
+        pool = routing_config.get('pool') or None
+        if not routing_config.get('enabled', True):
+            return cls(pool=pool, rules=[], default_route=DEFAULT_PROXY, failover=False)
+        return cls(pool=pool,
+                   rules=routing_config.get('rules'),
+                   default_route=routing_config.get('default_route', AUTO),
+                   failover=routing_config.get('failover', True),
+                   failure_threshold=routing_config.get('failure_threshold', 3),
+                   health_check_url=routing_config.get('health_check_url', 'https://www.gstatic.com/generate_204'),
+                   health_check_interval=routing_config.get('health_check_interval', 60),
+                   connect_timeout=routing_config.get('connect_timeout', 5),
+                   store=store)
+
+    # ==================== 路由选择 ====================
+
+    def rule_for(self, host: str) -> str:
+        """域名匹配的路由规则"""
+        host = host.lower()
+        for suffix, route in self.rules:
+            if host == suffix or host.endswith('.' + suffix):
+                return route
+        return self.default_route
+
+    def _is_up(self, route: str) -> bool:
+        if route == DIRECT:
+            return True
+        state = self.health.get(route)
+        if state is None:
+            return False
+        if state['down_until'] and time.time() >= state['down_until']:
+            self._schedule_check(route)
+        return not state['down_until']
+
+    def _score(self, host: str, route: str) -> float:
+        """路由评分（越小越好）：未试过的路由为0（先试一次），连续失败的排在最后"""
+        stats = self.hosts.get(host, {}).get(route)
+        if stats is None:
+            return 0.0
+        if stats['streak']:
+            return 1e6 * stats['streak'] + (stats['latency'] or 0)
+        return stats['latency'] if stats['latency'] is not None else 0.0
+
+    def routes_for(self, host: str) -> List[str]:
+        """按尝试顺序返回域名的候选路由"""
+        host = (host or '').lower()
+        if _is_local(host):
+            return [DIRECT]
+        rule = self.rule_for(host)
+        with self.lock:
+            available = [DIRECT] + [name for name in self.pool if self._is_up(name)]
+            if rule == AUTO:
+                return sorted(available, key=lambda route: self._score(host, route))
+            if not self.failover:
+                return [rule]
+            others = sorted((route for route in available if route != rule), key=lambda r: self._score(host, r))
+            # 首选路由不可用（代理已标记故障）时排到最后，仍作为兜底
+            return ([rule] + others) if rule in available else (others + [rule])
+
+    def best_route(self, host: str) -> str:
+        return self.routes_for(host)[0]
+
+    def proxies(self, route: str) -> Dict[str, Optional[str]]:
+        """
+        路由对应的requests proxies参数
+
+        直连时显式设为None：空字典会被requests用环境变量（HTTPS_PROXY等）和系统代理设置补全，仍会走代理
+        """
+        if route == DIRECT or route not in self.pool:
+            return dict(NO_PROXIES)
+        return {'http': self.pool[route], 'https': self.pool[route]}
+
+    def proxies_for_url(self, url: str) -> Dict[str, Optional[str]]:
+        """URL当前最优路由的proxies参数（供长连接客户端在创建时使用）"""
+        return self.proxies(self.best_route(urlsplit(url).hostname or ''))
+
+    # ==================== 统计 ====================
+
+    def record(self, host: str, route: str, elapsed: float, ok: bool):
+        """记录一次请求结果"""
+        host = host.lower()
+        now = time.time()
+        with self.lock:
+            stats = self.hosts.setdefault(host, {}).setdefault(
+                route, {'latency': None, 'ok': 0, 'fail': 0, 'streak': 0, 'used': now})
+            stats['used'] = now
+            if ok:
+                stats['ok'] += 1
+                stats['streak'] = 0
+                stats['latency'] = elapsed if stats['latency'] is None else \
+                    LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * stats['latency']
+            else:
+                stats['fail'] += 1
+                stats['streak'] += 1
+
+            state = self.health.get(route)
+            if state is not None:
+                if ok:
+                    state['failures'] = 0
+                    state['down_until'] = 0.0
+                else:
+                    state['failures'] += 1
+                    if state['failures'] >= self.failure_threshold and not state['down_until']:
+                        state['down_until'] = now + self.health_check_interval
+                        print(f"  [WARN] 代理 {route} 连续失败 {state['failures']} 次，暂停使用")
+            self.dirty = True
+            due = now - self.last_save >= SAVE_INTERVAL
+        if due:
+            self.save()
+
+    # ==================== 健康检查 ====================
+
+    def check_proxy(self, route: str) -> bool:
+        """检查代理是否可用（通过代理请求health_check_url），并更新健康状态"""
+        started = time.time()
+        try:
+            response = requests.get(self.health_check_url, proxies=self.proxies(route), timeout=self.connect_timeout)
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        with self.lock:
+            state = self.health[route]
+            if ok:
+                state['failures'] = 0
+                state['down_until'] = 0.0
+            else:
+                state['down_until'] = time.time() + self.health_check_interval
+            self.checking.discard(route)
+        if ok:
+            print(f"  代理 {route} 健康检查通过（{time.time() - started:.2f}s），恢复使用")
+        return ok
+
+    def _schedule_check(self, route: str):
+        """后台检查冷却期已过的代理（调用方持有self.lock）"""
+        if route in self.checking:
+            return
+        self.checking.add(route)
+        threading.Thread(target=self.check_proxy, args=(route,), daemon=True).start()
+
+    # ==================== 请求 ====================
+
+    def get(self, url: str, session: Optional[requests.Session] = None, timeout: float = 30,
+            **kwargs) -> requests.Response:
+        """
+        按路由发送GET请求，连接失败或超时时切换到下一个路由
+
+        Args:
+            url: 请求地址
+            session: 使用的Session，默认requests模块函数
+            timeout: 请求超时（秒）
+            **kwargs: 传给requests的其他参数（headers、params等）
+
+        Raises:
+            最后一个路由的异常（全部路由失败时）
+        """
+        host = urlsplit(url).hostname or ''
+        routes = self.routes_for(host)
+        getter = session.get if session is not None else requests.get
+        last_error = None
+        for index, route in enumerate(routes):
+            # 还有备选路由时缩短连接超时，尽快切换
+            route_timeout = (min(self.connect_timeout, timeout), timeout) if index < len(routes) - 1 else timeout
+            started = time.time()
+            try:
+                response = getter(url, proxies=self.proxies(route), timeout=route_timeout, **kwargs)
+            except ROUTE_ERRORS as e:
+                self.record(host, route, time.time() - started, False)
+                last_error = e
+                continue
+            self.record(host, route, time.time() - started, True)
+            return response
+        raise last_error
+
+    # ==================== 持久化 ====================
+
+    def load(self):
+        """从数据库加载路由统计"""
+        if self.store is None:
+            return
+        try:
+            saved = self.store.get_value(self.state_key) or {}
+        except Exception as e:
+            print(f"  [WARN] 加载路由统计失败: {str(e)[:80]}")
+            return
+        with self.lock:
+            self.hosts = {host: {route: stats for route, stats in routes.items()
+                                 if route == DIRECT or route in self.pool}
+                          for host, routes in saved.items()}
+
+    def save(self):
+        """保存路由统计（只保留最近使用的MAX_HOSTS个域名）"""
+        if self.store is None:
+            return
+        with self.lock:
+            if not self.dirty:
+                return
+            if len(self.hosts) > MAX_HOSTS:
+                recent = sorted(self.hosts, key=lambda h: max(s['used'] for s in self.hosts[h].values()),
+                                reverse=True)[:MAX_HOSTS]
+                self.hosts = {host: self.hosts[host] for host in recent}
+            snapshot = {host: {route: dict(stats) for route, stats in routes.items()}
+                        for host, routes in self.hosts.items()}
+            self.dirty = False
+            self.last_save = time.time()
+        try:
+            self.store.set_value(self.state_key, snapshot)
+        except Exception as e:
+            print(f"  [WARN] 保存路由统计失败: {str(e)[:80]}")
+
+    def get_table(self) -> List[Dict]:
+        """各域名的路由统计（按域名排序）"""
+        with self.lock:
+            rows = []
+            for host in sorted(self.hosts):
+                for route, stats in sorted(self.hosts[host].items()):
+                    rows.append({'host': host, 'route': route, 'rule': self.rule_for(host), **stats})
+            return rows
+
+
+_default_router = None
+_default_lock = threading.Lock()
+
+
+def get_proxy_router() -> ProxyRouter:
+    """获取默认路由器（统计保存在默认数据库，退出时保存）"""
+    global _default_router
+    with _default_lock:
+        if _default_router is None:
+            _default_router = ProxyRouter.from_config(store=get_news_store())
+            atexit.register(_default_router.save)
+        return _default_router
+
+
+def main():
+    """检查代理池并显示学到的路由"""
+    router = get_proxy_router()
+    print("代理健康检查:")
+    for name, url in router.pool.items():
+        ok = router.check_proxy(name)
+        print(f"  {name:<12} {url:<32} {'可用' if ok else '不可用'}")
+    print()
+    print(f"{'域名':<32} {'规则':<8} {'路由':<10} {'延迟':>8} {'成功':>6} {'失败':>6}")
+    for row in router.get_table():
+        latency = f"{row['latency']:.2f}s" if row['latency'] is not None else '-'
+        print(f"{row['host'][:32]:<32} {row['rule']:<8} {row['route']:<10} {latency:>8} {row['ok']:>6} {row['fail']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+新闻全文检索索引
+- 持久化倒排索引（SQLite，data/search_index.db），覆盖历史抓取的全部文章
+- 分词与摘要模块一致：中文二元组 + 英文单词（text_utils.tokenize）；文章另外索引中文单字，单字查询（如"金"）也能命中
+- 文章抓取后增量写入，同一URL重复抓取时更新
+- BM25排序，支持按来源和日期过滤
+"""
+import math
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import config
+from text_utils import tokenize
+
+# 标题词频权重（标题命中比正文更重要）
+TITLE_WEIGHT = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    url TEXT UNIQUE NOT NULL,
+    title TEXT,
+    summary TEXT,
+    source TEXT,
+    published_at TEXT,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_docs_source ON docs(source);
+CREATE INDEX IF NOT EXISTS idx_docs_published ON docs(published_at);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id);
+"""
+
+
+class SearchIndex:
+    """BM25倒排索引（线程安全）"""
+
+    def __init__(self, db_path: Optional[Path] = None, k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            db_path: 索引文件路径，默认data/search_index.db
+            k1: BM25词频饱和参数
+            b: BM25文档长度归一化参数
+        """
+        self.db_path = Path(db_path) if db_path else Path(__file__).parent / 'data' / 'search_index.db'
+        self.db_path.parent.mkdir(exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    @staticmethod
+    def _article_terms(article: Dict) -> Counter:
+        """文章词频（标题加权）"""
+        terms = Counter(tokenize(article.get('content') or article.get('summary') or '', unigrams=True))
+        for term in tokenize(article.get('title', ''), unigrams=True):
+            terms[term] += TITLE_WEIGHT
+        return terms
+
+    def add_articles(self, articles: List[Dict]) -> int:
+        """
+        增量写入文章（同一URL已存在时更新）
+
+        Returns:
+            写入的文章数
+        """
+        rows = []
+        for article in articles:
+            url = article.get('url')
+            if not url:
+                continue
+            terms = self._article_terms(article)
+            if not terms:
+                continue
+            rows.append((article, terms))
+        if not rows:
+            return 0
+
+        with self.lock:
+            cursor = self.conn.cursor()
+            for article, terms in rows:
+                cursor.execute('SELECT id FROM docs WHERE url = ?', (article['url'],))
+                existing = cursor.fetchone()
+                if existing:
+                    cursor.execute('DELETE FROM postings WHERE doc_id = ?', (existing[0],))
+                    cursor.execute('DELETE FROM docs WHERE id = ?', (existing[0],))
+                cursor.execute(
+                    'INSERT INTO docs (url, title, summary, source, published_at, length) VALUES (?, ?, ?, ?, ?, ?)',
+                    (article['url'], article.get('title', ''), article.get('summary', ''), article.get('source', ''),
+                     article.get('published_at') or article.get('fetched_at') or datetime.now().isoformat(),
+                     sum(terms.values()))
+                )
+                doc_id = cursor.lastrowid
+                cursor.executemany('INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)',
+                                   [(term, doc_id, tf) for term, tf in terms.items()])
+            self.conn.commit()
+        return len(rows)
+
+    def search(self, query: str, limit: int = 10, sources: Optional[List[str]] = None,
+               since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict]:
+        """
+        BM25检索
+
+        Args:
+            query: 查询文本
+            limit: 返回条数
+            sources: 只返回这些来源的文章
+            since: 只返回此时间之后发布的文章
+            until: 只返回此时间之前发布的文章
+
+        Returns:
+            按相关度排序的文章列表（含score）
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+
+        filters = []
+        params = []
+        if sources:
+            filters.append(f"d.source IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        if since is not None:
+            filters.append('d.published_at >= ?')
+            params.append(since.isoformat())
+        if until is not None:
+            filters.append('d.published_at <= ?')
+            params.append(until.isoformat())
+        where = ''.join(f' AND {f}' for f in filters)
+        placeholders = ','.join('?' * len(terms))
+
+        with self.lock:
+            cursor = self.conn.cursor()
+            doc_count, total_length = cursor.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs').fetchone()
+            if not doc_count:
+                return []
+            doc_freq = dict(cursor.execute(
+                f'SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term', terms
+            ).fetchall())
+            postings = cursor.execute(
+                f'SELECT p.term, p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id '
+                f'WHERE p.term IN ({placeholders}){where}', terms + params
+            ).fetchall()
+
+            avg_length = total_length / doc_count
+            scores = {}
+            for term, doc_id, tf, length in postings:
+                df = doc_freq.get(term, 0)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            if not top:
+                return []
+            rows = cursor.execute(
+                f"SELECT id, url, title, summary, source, published_at FROM docs "
+                f"WHERE id IN ({','.join('?' * len(top))})", [doc_id for doc_id, _ in top]
+            ).fetchall()
+
+        docs = {row[0]: row for row in rows}
+        results = []
+        for doc_id, score in top:
+            _, url, title, summary, source, published_at = docs[doc_id]
+            results.append({'title': title, 'url': url, 'summary': summary, 'source': source,
+                            'published_at': published_at, 'score': round(score, 4)})
+        return results
+
+    def prune(self, retention_days: int) -> int:
+        """删除超过保留天数的文章，返回删除数"""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute('DELETE FROM postings WHERE doc_id IN (SELECT id FROM docs WHERE published_at < ?)',
+                           (cutoff,))
+            cursor.execute('DELETE FROM docs WHERE published_at < ?', (cutoff,))
+            removed = cursor.rowcount
+            self.conn.commit()
+        return removed
+
+    def count(self) -> int:
+        """索引中的文章数"""
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """获取进程内共享的检索索引（首次打开时按data_retention_days清理过期文章）"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = SearchIndex()
+            retention_days = config.load_yaml_config().get('data_retention_days')
+            if retention_days:
+                _default_index.prune(int(retention_days))
+        return _default_index
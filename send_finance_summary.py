@@ -1,24 +1,80 @@
 # -*- coding: utf-8 -*-
 """
 财经新闻总结 - 完整AI分析版本
-严格按照summary_finance.md格式输出，每10条新闻合并为一个Telegram消息
+严格按照summary_finance.md格式输出，新闻按Telegram长度限制合并为尽量少的消息
+抓取、正文翻译、总结、发送以流水线方式并行执行
+预生成模式：--prepare在发送前生成并保存全部总结和重要消息分析（可多次执行增量补充），
+--send-prepared到发送时间只打包发送
 """
-import requests
+import argparse
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, List, Optional
 from news_fetcher_v2 import NewsFetcher
 from ai_analyzer import AIAnalyzer
-from config import PROXIES, BOT_TOKEN, CHAT_ID
+from ai_scheduler import AIBudgetScheduler
+from telegram_client import get_telegram_client
+from message_packer import MessagePacker, split_text
+from pipeline import Pipeline, Stage
+from story_clusterer import StoryClusterer
+from config import CHAT_ID, config
+
+# 预生成摘要在数据库kv表中的键
+PREPARED_DIGEST_KEY = 'digest.prepared'
+
+# 未配置API密钥、分析失败或超时时使用的重要消息内容
+DEFAULT_IMPORTANT_ANALYSIS = """【重要消息】
+
+基于当前获取的新闻，本次获取的新闻暂无特别重要的行业影响消息。
+
+建议关注：
+- AI和半导体行业动态
+- 科技公司业绩表现
+- 全球股市走势分析"""
 
 
 class FinanceSummarySender:
     """财经新闻总结发送器 - 严格按照summary_finance.md格式"""
 
+    # 要抓取的源（国内+国外）
+    sources_to_fetch = [
+        # 国内中文财经网站
+        'sina_finance',
+        'eastmoney',
+        'xueqiu',
+        'tonghuashun',
+        'china_securities',
+        'yicai',
+        # 国外财经网站
+        'cnbc',
+        'yahoo_finance',
+        'techcrunch',
+        'nvidia_news',
+        'arstechnica',
+        'marketwatch'
+    ]
+
     def __init__(self):
         self.fetcher = NewsFetcher()
-        self.analyzer = AIAnalyzer(proxies=PROXIES)
-        self.url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+        self.analyzer = AIAnalyzer()
+        # 智谱API按路由规则选择直连或代理
+        self.analyzer.proxies = self.fetcher.router.proxies_for_url(self.analyzer.api_url)
+        self.telegram = get_telegram_client()
+        self.store = self.fetcher.store
+        # AI总结并发数
+        ai_config = config.load_yaml_config().get('ai') or {}
+        self.summary_workers = max(1, int(ai_config.get('summary_workers', 4)))
+        # 最近一次AI总结调度报告
+        self.last_summary_report = None
+        # 已补全正文和翻译的文章 {url: article}，预生成摘要的多次补充之间复用，发送后清空
+        self.enriched_articles = {}
+        # 抓取流水线共用fetcher的本轮URL去重状态，同一时间只运行一条
+        self.pipeline_lock = threading.Lock()
 
         # 新闻源显示名称映射
         self.source_display_map = {
@@ -40,27 +96,10 @@ class FinanceSummarySender:
         }
 
     def send_message(self, text: str) -> bool:
-        """发送消息到Telegram"""
-        data = {"chat_id": CHAT_ID, "text": text}
-
-        try:
-            response = requests.post(
-                self.url,
-                json=data,
-                proxies=PROXIES,
-                timeout=30
-            )
-            result = response.json()
-
-            if result.get('ok'):
-                return True
-            else:
-                print(f"[FAIL] 发送失败: {result}")
-                return False
-
-        except Exception as e:
-            print(f"[ERROR] {e}")
-            return False
+        """发送消息到Telegram（经共享发送队列限速），发送结果写入deliveries"""
+        ok = self.telegram.send_message(CHAT_ID, text)
+        self.store.record_delivery(CHAT_ID, 'digest', ok, len(text))
+        return ok
 
     def generate_ai_summary(self, article: dict) -> str:
         """为文章生成AI详细总结"""
@@ -68,263 +107,485 @@ class FinanceSummarySender:
 
         # 检查是否配置了API密钥
         if not os.getenv('ZHIPU_API_KEY'):
-            print(f"  [INFO] 未配置智谱API密钥，使用原始内容")
-            content = article.get('content') or article.get('summary', '')
-            return f"""【总结】
-核心观点：{article['title']}
+            print(f"  [INFO] 未配置智谱API密钥，使用本地摘要")
+            return self.analyzer.build_fallback_summary(article)
 
-事件背景：{article.get('source', '')}
-
-关键细节：{content[:300]}
+        try:
+            return self._summarize_or_raise(article)
+        except Exception as e:
+            print(f"  [WARN] AI分析失败: {e}，使用本地摘要")
+            # 降级：使用本地抽取式摘要
+            return self.analyzer.build_fallback_summary(article)
+
+    def _summarize_or_raise(self, article: dict) -> str:
+        """调用AI分析器生成总结并补全格式，失败时抛出异常"""
+        ai_summary = self.analyzer.summarize_news(article)
+        # 确保以【总结】开头
+        if not ai_summary.startswith("【总结】"):
+            ai_summary = "【总结】\n" + ai_summary
+        # 添加参考链接
+        if "【参考链接】" not in ai_summary:
+            ai_summary += f"\n【参考链接】\n{article.get('url', '')}"
+        return ai_summary
+
+    def with_story_sources(self, summary: str, article: dict) -> str:
+        """合并事件的总结：参考链接替换为事件内全部来源"""
+        story_sources = article.get('story_sources')
+        if not story_sources:
+            return summary
+        summary = summary.split("【参考链接】", 1)[0].rstrip()
+        links = [f"{self.source_display_map.get(source, source)}：{url}" for source, _, url in story_sources]
+        return summary + "\n【参考链接】\n" + "\n".join(links)
+
+    def generate_ai_summaries(self, articles: List[dict], deadline: Optional[float] = None) -> List[str]:
+        """
+        批量生成AI总结，返回顺序与输入一致
+
+        按重要性优先的顺序并发调用AI，超出截止时间或token预算（config.yaml的ai.scheduler）
+        的新闻使用本地摘要
+
+        Args:
+            articles: 新闻列表
+            deadline: 截止时间戳，None表示按配置从现在起计算
+        """
+        if not os.getenv('ZHIPU_API_KEY'):
+            return [self.generate_ai_summary(article) for article in articles]
 
-影响分析：
-- 对市场的影响：详见原文
-- 对行业的影响：详见原文
-- 对企业的影响：详见原文
+        scheduler = AIBudgetScheduler.from_config(self.analyzer, deadline=deadline, workers=self.summary_workers)
+        summaries, report = scheduler.run(articles, self._summarize_or_raise, self.analyzer.build_fallback_summary)
+        self.last_summary_report = report
+        AIBudgetScheduler.print_report(report)
+        return summaries
 
-未来展望：请关注后续发展
+    def build_important_analysis(self, all_articles: List[dict]) -> str:
+        """生成重要消息分析（未配置API密钥或分析失败时返回默认内容）"""
+        default_analysis = DEFAULT_IMPORTANT_ANALYSIS
 
-【参考链接】
-{article.get('url', '')}"""
+        # 检查是否配置了API密钥
+        if not os.getenv('ZHIPU_API_KEY') or os.getenv('ZHIPU_API_KEY') == 'your_zhipu_api_key_here':
+            print(f"  [INFO] 未配置智谱API密钥，跳过AI分析")
+            return default_analysis
 
         try:
-            # 调用AI分析器
-            ai_summary = self.analyzer.generate_news_summary(article)
-            # 确保以【总结】开头
-            if not ai_summary.startswith("【总结】"):
-                ai_summary = "【总结】\n" + ai_summary
-            # 添加参考链接
-            if "【参考链接】" not in ai_summary:
-                ai_summary += f"\n【参考链接】\n{article.get('url', '')}"
-            return ai_summary
+            important_analysis = self.analyzer.analyze_important_news(all_articles)
+            # 确保以【重要消息】开头
+            if not important_analysis.startswith("【重要消息】"):
+                important_analysis = "【重要消息】\n\n" + important_analysis
+            return important_analysis
         except Exception as e:
-            print(f"  [WARN] AI分析失败: {e}，使用原始内容")
-            # 降级：使用原始内容
-            content = article.get('content') or article.get('summary', '')
-            return f"""【总结】
-核心观点：{article['title']}
+            print(f"[WARN] AI分析失败: {e}")
+            return default_analysis
+
+    def _important_for(self, articles: List[dict], previous: Optional[dict] = None) -> str:
+        """重要消息分析；新闻集合与上次预生成的摘要相同时直接复用上次的分析"""
+        if previous and previous.get('important') and \
+                sorted(article['url'] for article in articles) == previous.get('urls'):
+            print("新闻未变化，复用已生成的重要消息分析")
+            return previous['important']
+        return self.build_important_analysis(articles)
+
+    def _run_digest_pipeline(self, deliver: Callable[[str, dict], None], deadline: Optional[float] = None,
+                             previous: Optional[dict] = None, cluster: bool = False) -> dict:
+        """
+        抓取 -> 正文/翻译 -> (聚类) -> 总结 流水线，每条新闻的完整文本和文章交给deliver(text, article)
+        （单线程按完成顺序调用）
+
+        阶段间用有界队列连接：第一个源抓取完成后即开始总结，重要消息分析在抓取结束后与总结并行进行
+        总结阶段按重要性得分（AIBudgetScheduler.score）优先处理等待中的新闻，预算用尽时降级的是最不重要的新闻
+        cluster为True时在总结前插入聚类阶段：同一事件的多篇报道合并为一条总结，
+        该阶段需要看到全部文章，总结在全部正文补全后开始（首条消息延后），事件按重要性顺序输出
+
+        Args:
+            deliver: 处理一条新闻文本（立即发送或收集到预生成摘要）
+            deadline: AI总结截止时间戳，None表示按配置从现在起计算；指定时重要消息分析也在此时截止，
+                超时使用上次预生成的分析（没有时用默认内容）
+            previous: 上次预生成的摘要（复用正文和重要消息分析）
+            cluster: 是否聚类
+
+        Returns:
+            {'articles_by_source', 'articles', 'statuses', 'important', 'important_urls', 'scores', 'scheduler',
+             'report'}，important_urls为重要消息分析实际覆盖的文章链接，scores为各文章的重要性得分
+        """
+        with self.pipeline_lock:
+            self.fetcher.begin_run()
+            return self._run_digest_pipeline_locked(deliver, deadline, previous, cluster)
+
+    def _run_digest_pipeline_locked(self, deliver: Callable[[str, dict], None], deadline: Optional[float],
+                                    previous: Optional[dict], cluster: bool) -> dict:
+        """_run_digest_pipeline的实现（调用方持有pipeline_lock）"""
+        pipeline_config = config.load_yaml_config().get('pipeline') or {}
+
+        lock = threading.Lock()
+        all_articles_by_source = {}
+        all_articles = []
+        statuses = []
+
+        summary_entries = []
+
+        # 有API密钥时按截止时间和token预算逐条调度AI总结；没有时也按重要性排序
+        ranker = AIBudgetScheduler.from_config(self.analyzer, deadline=deadline, workers=self.summary_workers)
+        scheduler = ranker if os.getenv('ZHIPU_API_KEY') else None
+        scores = {}
+        started = time.time()
+        usage_before = dict(self.analyzer.usage)
+
+        def score_of(article):
+            key = article['url']
+            if key not in scores:
+                scores[key] = ranker.score(article)
+            return scores[key]
+
+        important_executor = ThreadPoolExecutor(max_workers=1)
+        important_future = []
+
+        def fetch_stage(source, emit):
+            print(f"正在获取 {source} 的新闻...")
+            articles = self.fetcher.fetch_with_retries(source, self.fetcher.sources[source], max_articles=3)
+            if not articles:
+                print(f"  {source} 未获取到新闻")
+                return
+            print(f"  {source} 成功: {len(articles)} 篇")
+            with lock:
+                all_articles_by_source[source] = articles
+                all_articles.extend(articles)
+            display_name = self.source_display_map.get(source, source)
+            for article in articles[:5]:
+                emit((display_name, article))
+
+        def fetch_finished():
+            # 抓取结束后即开始重要消息分析，与总结、发送并行
+            print(f"抓取完成，共 {len(all_articles)} 篇新闻，开始分析重要消息...")
+            if all_articles:
+                important_future.append(important_executor.submit(self._important_for, list(all_articles), previous))
+
+        def enrich_stage(item, emit):
+            display_name, article = item
+            # 预生成期间已补全过的文章不再重复抓取全文和翻译
+            enriched = self.enriched_articles.get(article['url'])
+            if enriched is None:
+                enriched = self.fetcher.enrich_article(article)
+                self.enriched_articles[article['url']] = enriched
+            emit((display_name, enriched))
+
+        story_items = []
+
+        def cluster_stage(item, emit):
+            story_items.append(item)
+
+        def cluster_flush(emit):
+            clusterer = StoryClusterer.from_config()
+            articles = [article for _, article in story_items]
+            groups = clusterer.cluster(articles)
+            print(f"聚类完成: {len(articles)} 篇新闻 -> {len(groups)} 个事件")
+            stories = []
+            for group in groups:
+                display_names = []
+                for index in group:
+                    if story_items[index][0] not in display_names:
+                        display_names.append(story_items[index][0])
+                merged = clusterer.merge(articles, group)
+                # 事件的重要性取成员中的最高分；全部文章都已到齐，按重要性顺序交给总结阶段
+                scores[merged['url']] = max(score_of(articles[index]) for index in group)
+                stories.append(('、'.join(display_names), merged))
+            stories.sort(key=lambda story: scores[story[1]['url']], reverse=True)
+            for story in stories:
+                emit(story)
+
+        def summarize_stage(item, emit):
+            display_name, article = item
+            print(f"[{display_name}] 处理中...")
+            # 合并事件的正文由多篇文章拼成，按事件内全部链接缓存
+            story_sources = article.get('story_sources')
+            cache_key = 'story:' + '|'.join(sorted(url for _, _, url in story_sources)) if story_sources \
+                else article['url']
+            # 同一文章（事件）24小时内已有AI总结时直接复用（其他进程、之前的预生成也可复用）
+            ai_summary = self.store.get_summary(cache_key, status='ai', max_age_hours=24)
+            if ai_summary:
+                status = 'cached'
+            elif scheduler is not None:
+                ai_summary, status = scheduler.process(article, self._summarize_or_raise,
+                                                       self.analyzer.build_fallback_summary)
+            else:
+                ai_summary, status = self.generate_ai_summary(article), 'local'
+            if status != 'cached':
+                self.store.save_summary(cache_key, ai_summary, status)
+            ai_summary = self.with_story_sources(ai_summary, article)
+            with lock:
+                statuses.append(status)
+                summary_entries.append((article, score_of(article), status))
+            # 严格按照summary_finance.md格式构建新闻消息
+            # 格式：【来源网站】# 标题
+            emit((f"""【{display_name}】#{article['title']}
+
+{ai_summary}""", article))
+
+        def deliver_stage(item, emit):
+            deliver(*item)
+
+        stages = [
+            Stage('抓取', fetch_stage, workers=pipeline_config.get('fetch_workers', 4), on_finish=fetch_finished),
+            Stage('正文翻译', enrich_stage, workers=pipeline_config.get('enrich_workers', 4)),
+            Stage('总结', summarize_stage, workers=self.summary_workers, priority=lambda item: score_of(item[1])),
+            Stage('发送', deliver_stage, workers=1),
+        ]
+        if cluster:
+            stages.insert(2, Stage('聚类', cluster_stage, workers=1, flush=cluster_flush))
+        pipeline = Pipeline(stages, queue_size=pipeline_config.get('queue_size', 8))
 
-事件背景：{article.get('source', '')}
+        print("开始获取新闻...")
+        print("-" * 60)
+        stats = pipeline.run([s for s in self.sources_to_fetch if s in self.fetcher.sources])
+        pipeline.print_stats(stats)
+        self.fetcher.politeness.print_stats()
 
-关键细节：{content[:300]}
+        important = None
+        important_urls = sorted(article['url'] for article in all_articles)
+        if important_future:
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - time.time())
+                important = important_future[0].result(timeout=timeout)
+            except FutureTimeoutError:
+                print("[WARN] 重要消息分析超过截止时间，使用上次的分析")
+                important = (previous or {}).get('important') or DEFAULT_IMPORTANT_ANALYSIS
+                important_urls = (previous or {}).get('urls') or []
+        important_executor.shutdown(wait=False)
+        report = ranker.build_report([entry[0] for entry in summary_entries], [entry[1] for entry in summary_entries],
+                                     [entry[2] for entry in summary_entries], started, usage_before)
+        return {
+            'articles_by_source': all_articles_by_source,
+            'articles': all_articles,
+            'statuses': statuses,
+            'important': important,
+            'important_urls': important_urls,
+            'scores': scores,
+            'scheduler': scheduler,
+            'report': report,
+        }
 
-影响分析：
-- 对市场的影响：详见原文
-- 对行业的影响：详见原文
-- 对企业的影响：详见原文
+    def _print_summary_counts(self, result: dict, sent: Optional[int] = None):
+        """打印新闻数、总结数和AI/本地摘要比例"""
+        statuses = result['statuses']
+        line = f"总共获取: {len(result['articles'])} 篇新闻，生成 {len(statuses)} 条总结"
+        print(line + (f"，发送 {sent} 条消息" if sent is not None else ""))
+        if result['scheduler'] is not None:
+            ai_count = statuses.count('ai') + statuses.count('cached')
+            print(f"AI总结: {ai_count} 条（复用 {statuses.count('cached')} 条），本地摘要: {len(statuses) - ai_count} 条")
+            # 按重要性排名列出每条新闻是否获得了AI总结
+            self.last_summary_report = result['report']
+            AIBudgetScheduler.print_report(result['report'])
+
+    def _digest_header(self) -> str:
+        """摘要消息头（发送时的日期和时间）"""
+        now = datetime.now()
+        return "\n".join([
+            f"【财经新闻总结】",
+            f"📅 {now.strftime('%Y年%m月%d日')}  {now.strftime('%H:%M')}",
+            "",
+            "=" * 60,
+            ""
+        ]) + "\n"
+
+    def _digest_footer(self, important_analysis: str, sources: List[str]) -> List[str]:
+        """重要消息分析和数据来源（分析较长时按Telegram长度限制拆成多条消息）"""
+        return split_text(f"""==================================================
 
-未来展望：请关注后续发展
+{important_analysis}
 
-【参考链接】
-{article.get('url', '')}"""
+==================================================
+数据来源: {', '.join(sources)}
+""")
 
     def send_finance_summary(self):
-        """发送财经新闻总结 - 严格按照summary_finance.md格式"""
+        """
+        发送财经新闻总结 - 严格按照summary_finance.md格式
+
+        抓取 -> 正文/翻译 -> 总结 -> 发送 四个阶段组成流水线，总结完成的新闻立即打包发送，
+        重要消息分析在抓取结束后与总结、发送并行进行
+        """
         print("=" * 60)
         print("财经新闻总结")
         print("=" * 60)
         print()
+        self.telegram.reset_stats()
+        self.enriched_articles.clear()
 
-        # 定义要抓取的源（国内+国外）
-        sources_to_fetch = [
-            # 国内中文财经网站
-            'sina_finance',
-            'eastmoney',
-            'xueqiu',
-            'tonghuashun',
-            'china_securities',
-            'yicai',
-            # 国外财经网站
-            'cnbc',
-            'yahoo_finance',
-            'techcrunch',
-            'nvidia_news',
-            'arstechnica',
-            'marketwatch'
-        ]
-
-        all_articles_by_source = {}
-        all_articles = []
-
-        print("开始获取新闻...")
-        print("-" * 60)
-
-        # 获取每个源的新闻
-        for source in sources_to_fetch:
-            print(f"正在获取 {source} 的新闻（5条，注意，这里实际是3条，因为我改了下面max_articles的参数）...")
-
-            if source in self.fetcher.sources:
-                try:
-                    articles = self.fetcher.fetch_with_retries(
-                        source,
-                        self.fetcher.sources[source],
-                        max_articles=3
-                    )
+        # 按Telegram长度限制打包，消息数尽量少，只在新闻条目或段落处拆分
+        packer = MessagePacker(header=self._digest_header(), item_footer="\n\n————————\n\n")
+        sent_messages = []
 
-                    if articles:
-                        all_articles_by_source[source] = articles
-                        all_articles.extend(articles)
-                        print(f"  成功: {len(articles)} 篇")
-                    else:
-                        print(f"  未获取到新闻")
+        def deliver(news_item, article):
+            for message in packer.add(news_item):
+                print(f"发送第 {len(sent_messages) + 1} 条消息...")
+                sent_messages.append(self.send_message(message))
 
-                except Exception as e:
-                    print(f"  [ERROR] {e}")
+        # 直接发送时默认不聚类，总结完成的新闻立即发送
+        cluster_config = config.load_yaml_config().get('clustering') or {}
+        result = self._run_digest_pipeline(deliver, cluster=cluster_config.get('enabled', False))
 
-            print()
+        # 发送最后一条未装满的消息
+        for message in packer.flush():
+            print(f"发送第 {len(sent_messages) + 1} 条消息...")
+            sent_messages.append(self.send_message(message))
 
-        if not all_articles_by_source:
+        if not result['articles_by_source']:
             print("[FAIL] 未获取到任何新闻")
             return False
 
-        print("-" * 60)
-        print(f"总共获取: {sum(len(v) for v in all_articles_by_source.values())} 篇新闻")
-        print("-" * 60)
+        self._print_summary_counts(result, sent=len(sent_messages))
         print()
+        print("[OK] 新闻摘要发送完成")
 
-        # 获取当前时间
-        now = datetime.now()
-        date_str = now.strftime('%Y年%m月%d日')
-        time_str = now.strftime('%H:%M')
-
-        # ==================== 第一部分：新闻摘要（每10条合并）====================
+        # ==================== 重要消息分析 ====================
+        print()
         print("=" * 60)
-        print("第一部分：新闻摘要")
+        print("重要消息分析")
         print("=" * 60)
         print()
 
-        # 按源组织新闻，但打乱顺序发送
-        news_batch = []
-        for source_name, articles in all_articles_by_source.items():
-            display_name = self.source_display_map.get(source_name, source_name)
-
-            for article in articles[:5]:
-                print(f"[{display_name}] 处理中...")
-                # 生成AI详细总结
-                ai_summary = self.generate_ai_summary(article)
-
-                # 严格按照summary_finance.md格式构建新闻消息
-                # 格式：【来源网站】# 标题
-                news_item = f"""【{display_name}】#{article['title']}
-
-{ai_summary}"""
-
-                news_batch.append(news_item)
-
-        print()
-        print(f"总共生成 {len(news_batch)} 条新闻")
-
-        # 每10条新闻合并发送
-        batch_size = 10
-        for i in range(0, len(news_batch), batch_size):
-            batch = news_batch[i:i + batch_size]
-            print(f"发送第 {i // batch_size + 1} 批消息 ({len(batch)} 条新闻)...")
-
-            # 构建合并消息
-            message_parts = [
-                f"【财经新闻总结】",
-                f"📅 {date_str}  {time_str}",
-                "",
-                "=" * 60,
-                ""
-            ]
-
-            # 添加新闻（每条之间用————————分隔）
-            for idx, news_item in enumerate(batch, 1):
-                message_parts.append(news_item)
-                message_parts.append("")
-                message_parts.append("————————")
-                message_parts.append("")
-
-            # 合并发送
-            full_message = "\n".join(message_parts)
-
-            # 检查消息长度，Telegram限制4096字符
-            if len(full_message) > 4000:
-                # 如果太长，拆分为更小的批次
-                smaller_batch_size = 1
-                for j in range(0, len(batch), smaller_batch_size):
-                    smaller_batch = batch[j:j + smaller_batch_size]
-                    smaller_parts = [
-                        f"【财经新闻总结】",
-                        f"📅 {date_str}  {time_str}",
-                        "",
-                        "=" * 60,
-                        ""
-                    ]
-                    for news in smaller_batch:
-                        smaller_parts.append(news)
-                        smaller_parts.append("")
-                        smaller_parts.append("————————")
-                        smaller_parts.append("")
-                    self.send_message("\n".join(smaller_parts))
-            else:
-                self.send_message(full_message)
-
-        print()
-        print("[OK] 新闻摘要发送完成")
+        # 发送重要消息分析
+        sources = list(set(self.source_display_map.get(s, s) for s in result['articles_by_source'].keys()))
+        print("发送重要消息分析...")
+        for message in self._digest_footer(result['important'], sources):
+            self.send_message(message)
+        self.telegram.print_stats()
 
-        # ==================== 第二部分：重要消息分析 ====================
         print()
         print("=" * 60)
-        print("第二部分：重要消息分析")
+        print("财经新闻总结完成！")
         print("=" * 60)
         print()
 
-        print("正在分析重要消息...")
-
-        # 检查是否配置了API密钥
-        if not os.getenv('ZHIPU_API_KEY') or os.getenv('ZHIPU_API_KEY') == 'your_zhipu_api_key_here':
-            print(f"  [INFO] 未配置智谱API密钥，跳过AI分析")
-            important_analysis = """【重要消息】
-
-基于当前获取的新闻，本次获取的新闻暂无特别重要的行业影响消息。
-
-建议关注：
-- AI和半导体行业动态
-- 科技公司业绩表现
-- 全球股市走势分析"""
-        else:
-            try:
-                important_analysis = self.analyzer.analyze_important_news(all_articles)
-                # 确保以【重要消息】开头
-                if not important_analysis.startswith("【重要消息】"):
-                    important_analysis = "【重要消息】\n\n" + important_analysis
-            except Exception as e:
-                print(f"[WARN] AI分析失败: {e}")
-                important_analysis = """【重要消息】
-
-基于当前获取的新闻，本次获取的新闻暂无特别重要的行业影响消息。
+        return True
 
-建议关注：
-- AI和半导体行业动态
-- 科技公司业绩表现
-- 全球股市走势分析"""
+    # ==================== 预生成摘要 ====================
 
-        # 发送重要消息分析
-        footer = f"""==================================================
+    def load_prepared_digest(self, max_age_minutes: Optional[float] = None) -> Optional[dict]:
+        """读取预生成的摘要，不存在或早于max_age_minutes时返回None"""
+        digest = self.store.get_value(PREPARED_DIGEST_KEY)
+        if not digest or not all(isinstance(item, dict) for item in digest.get('items') or []):
+            return None
+        if max_age_minutes and time.time() - digest.get('prepared_at', 0) > max_age_minutes * 60:
+            return None
+        return digest
 
-{important_analysis}
+    def prepare_digest(self, deadline: Optional[float] = None, stop_at: Optional[float] = None) -> Optional[dict]:
+        """
+        预生成摘要：抓取、补全、聚类、总结和重要消息分析全部提前完成，结果保存到数据库，不发送
 
-==================================================
-数据来源: {', '.join(set(self.source_display_map.get(s, s) for s in all_articles_by_source.keys()))}
-"""
+        可以在发送前多次执行（增量补充）：已补全的正文复用进程内缓存，已生成的AI总结复用数据库缓存，
+        新闻集合未变化时复用重要消息分析，只有新出现的新闻需要抓取全文和调用AI；
+        本次抓取失败的源保留上次预生成的条目
 
-        print("发送重要消息分析...")
-        self.send_message(footer)
+        Args:
+            deadline: AI总结和重要消息分析的截止时间戳（最后一次补充时设为发送时间之前）
+            stop_at: 发送时间戳，超过时丢弃本次结果（发送已使用上次预生成的摘要）
 
-        print()
+        Returns:
+            预生成的摘要；未获取到任何新闻或超过stop_at时返回None
+        """
         print("=" * 60)
-        print("财经新闻总结完成！")
+        print("预生成财经新闻总结")
         print("=" * 60)
-        print()
+        started = time.time()
+        previous = self.load_prepared_digest()
+
+        items = []
+
+        def collect(text, article):
+            story_sources = article.get('story_sources')
+            items.append({
+                'text': text,
+                'sources': sorted({source for source, _, _ in story_sources}) if story_sources
+                else [article.get('source', '')],
+                'url': article['url'],
+            })
+
+        # 预生成不影响发送时延，默认聚类
+        cluster_config = config.load_yaml_config().get('clustering') or {}
+        result = self._run_digest_pipeline(collect, deadline=deadline, previous=previous,
+                                           cluster=cluster_config.get('prepared', True))
+        if stop_at is not None and time.time() > stop_at:
+            print("[WARN] 预生成超过发送时间，丢弃本次结果")
+            return None
+        if not result['articles_by_source']:
+            print("[FAIL] 未获取到任何新闻，保留上次预生成的摘要")
+            return None
+
+        # 本次没有抓到的源沿用上次预生成的条目
+        fetched = set(result['articles_by_source'])
+        kept = [item for item in (previous or {}).get('items') or []
+                if item['sources'] and not fetched.intersection(item['sources'])]
+        if kept:
+            print(f"沿用上次预生成的 {len(kept)} 条新闻（来源本次未抓取成功）")
+        for item in items:
+            item['score'] = result['scores'].get(item['url'], 0.0)
+        # 按重要性排序，发送时最重要的新闻在前
+        items = sorted(items + kept, key=lambda item: item['score'], reverse=True)
+        sources = fetched.union(source for item in kept for source in item['sources'])
+
+        digest = {
+            'prepared_at': time.time(),
+            'items': items,
+            'important': result['important'],
+            'sources': sorted(set(self.source_display_map.get(s, s) for s in sources)),
+            'urls': result['important_urls'],
+            'statuses': result['statuses'],
+        }
+        self.store.set_value(PREPARED_DIGEST_KEY, digest)
+        self._print_summary_counts(result)
+        urls = [article['url'] for article in result['articles']]
+        new_count = len(set(urls) - set((previous or {}).get('urls') or []))
+        print(f"[OK] 预生成完成: {len(items)} 条新闻（新增文章 {new_count} 篇），用时 {time.time() - started:.0f}s")
+        return digest
+
+    def send_prepared_digest(self, max_age_minutes: Optional[float] = None) -> bool:
+        """
+        发送预生成的摘要（只打包和发送，不抓取、不调用AI），全部发送成功后清除
+
+        Returns:
+            是否全部发送成功；没有可用的预生成摘要或有消息发送失败时返回False（保留摘要）
+        """
+        digest = self.load_prepared_digest(max_age_minutes)
+        if not digest or not digest.get('items'):
+            print("[WARN] 没有可用的预生成摘要")
+            return False
 
+        age = (time.time() - digest['prepared_at']) / 60
+        print(f"发送预生成的摘要: {len(digest['items'])} 条新闻（{age:.0f} 分钟前生成）")
+        self.telegram.reset_stats()
+        packer = MessagePacker(header=self._digest_header(), item_footer="\n\n————————\n\n")
+        messages = []
+        for item in digest['items']:
+            messages.extend(packer.add(item['text']))
+        messages.extend(packer.flush())
+        messages.extend(self._digest_footer(digest['important'], digest['sources']))
+        sent = [self.send_message(message) for message in messages]
+        self.telegram.print_stats()
+
+        if not all(sent):
+            print(f"[FAIL] 预生成摘要发送失败: {sum(sent)}/{len(sent)} 条消息成功，保留摘要")
+            return False
+        # 已发送的摘要不再重复发送，下一轮重新预生成
+        self.store.set_value(PREPARED_DIGEST_KEY, None)
+        self.enriched_articles.clear()
+        print(f"[OK] 预生成摘要发送完成: {len(sent)} 条消息")
         return True
 
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='财经新闻总结')
+    parser.add_argument('--prepare', action='store_true', help='只预生成摘要并保存，不发送')
+    parser.add_argument('--send-prepared', action='store_true',
+                        help='发送预生成的摘要（没有可用的预生成摘要时完整执行一次）')
+    parser.add_argument('--max-age', type=float, default=60, help='预生成摘要的最长有效时间（分钟）')
+    args = parser.parse_args()
+
     sender = FinanceSummarySender()
+    if args.prepare:
+        return sender.prepare_digest() is not None
+    if args.send_prepared and sender.send_prepared_digest(args.max_age):
+        return True
     success = sender.send_finance_summary()
     return success
 
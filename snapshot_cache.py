@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+快照缓存
+- 快照未超过TTL时直接返回
+- 超过TTL但未超过最大过期时间时返回旧快照，并在后台刷新（stale-while-revalidate）
+- 同一个key的并发加载合并为一次（single-flight），其余调用等待同一结果
+"""
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SnapshotCache:
+    """带TTL和并发合并的快照缓存（线程安全）"""
+
+    def __init__(self, ttl: float = 600, max_stale: float = 3600):
+        """
+        Args:
+            ttl: 快照新鲜期（秒），期内直接返回
+            max_stale: 快照最长可用时间（秒），超过TTL但未超过此值时先返回旧快照再后台刷新
+        """
+        self.ttl = ttl
+        self.max_stale = max(max_stale, ttl)
+        self.lock = threading.Lock()
+        self.entries = {}   # key -> (value, 生成时间)
+        self.inflight = {}  # key -> Future
+        self.stats = {'hits': 0, 'stale_hits': 0, 'loads': 0, 'coalesced': 0, 'errors': 0}
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """快照年龄（秒），不存在时返回None"""
+        with self.lock:
+            entry = self.entries.get(key)
+        return time.time() - entry[1] if entry else None
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """删除指定快照，key为None时清空全部"""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def _join_or_start(self, key: Hashable) -> Tuple[Future, bool]:
+        """发起或加入一次加载，返回(Future, 是否由本次调用负责执行)"""
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future, False
+            future = Future()
+            self.inflight[key] = future
+            self.stats['loads'] += 1
+        return future, True
+
+    def _run(self, key: Hashable, loader: Callable[[], Any], future: Future):
+        """执行加载并保存快照"""
+        try:
+            value = loader()
+        except Exception as e:
+            with self.lock:
+                self.stats['errors'] += 1
+                self.inflight.pop(key, None)
+            future.set_exception(e)
+            return
+        with self.lock:
+            self.entries[key] = (value, time.time())
+            self.inflight.pop(key, None)
+        future.set_result(value)
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Any]):
+        """后台刷新（已有刷新在进行时不重复发起）"""
+        future, owner = self._join_or_start(key)
+        if owner:
+            thread = threading.Thread(target=self._run, args=(key, loader, future),
+                                      name='snapshot-refresh', daemon=True)
+            thread.start()
+
+    def get(self, key: Hashable, loader: Callable[[], Any],
+            accept: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, float]:
+        """
+        获取快照
+
+        Args:
+            key: 快照key
+            loader: 生成快照的函数（可能耗时很长）
+            accept: 判断已有快照能否满足本次请求，返回False时视为没有快照
+
+        Returns:
+            (快照, 快照年龄秒数)
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and (accept is None or accept(entry[0])):
+            value, created = entry
+            age = time.time() - created
+            if age <= self.ttl:
+                with self.lock:
+                    self.stats['hits'] += 1
+                return value, age
+            if age <= self.max_stale:
+                with self.lock:
+                    self.stats['stale_hits'] += 1
+                self._refresh_in_background(key, loader)
+                return value, age
+
+        # 没有可用快照：合并并发请求，由第一个调用者执行加载
+        future, owner = self._join_or_start(key)
+        if owner:
+            self._run(key, loader, future)
+        value = future.result()
+        if accept is not None and not accept(value):
+            # 加入的是不满足条件的加载（如文章数更少），单独再加载一次
+            future, owner = self._join_or_start(key)
+            if owner:
+                self._run(key, loader, future)
+            value = future.result()
+        return value, 0.0
+
+    def get_stats(self) -> Dict:
+        """返回命中统计"""
+        with self.lock:
+            return dict(self.stats)
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""
+统计工具
+- 百分位数（延迟统计的p50/p95等）
+"""
+from typing import List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算百分位数（最近秩法），空列表返回0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+新闻事件聚类
+- 同一事件的多篇报道（不同来源、不同角度）合并为一个事件，只生成一条总结、发送一个条目
+- 文章向量：稀疏TF-IDF（中文二元组 + 英文单词，标题加权），L2归一化
+- 余弦相似度通过一次稀疏矩阵乘法 X·Xᵀ 计算，只保留超过阈值的元素
+- 按相似度做领头者聚类（每篇文章并入最相似的已有事件领头文章，否则自成事件），避免单链接聚类的链式合并
+- 事件内每篇文章抽取关键句合并为事件正文，并保留全部来源链接
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from config import config
+from extractive_summarizer import summarizer
+from text_utils import join_sentences, tokenize
+
+# 标题词频权重
+TITLE_WEIGHT = 3
+
+
+class StoryClusterer:
+    """TF-IDF余弦相似度聚类"""
+
+    def __init__(self, threshold: float = 0.4, max_df: float = 0.5, key_sentences: int = 2,
+                 max_story_size: int = 8):
+        """
+        Args:
+            threshold: 与事件领头文章的余弦相似度达到该值时并入同一事件
+            max_df: 出现在超过该比例文章中的词不参与计算（文章数不少于10篇时生效）
+            key_sentences: 合并事件正文时每篇文章抽取的关键句数
+            max_story_size: 每个事件最多合并的文章数
+        """
+        self.threshold = threshold
+        self.max_df = max_df
+        self.key_sentences = key_sentences
+        self.max_story_size = max(1, max_story_size)
+
+    @classmethod
+    def from_config(cls) -> 'StoryClusterer':
+        """从config.yaml的clustering配置创建"""
+        cluster_config = config.load_yaml_config().get('clustering') or {}
+        return cls(threshold=cluster_config.get('threshold', 0.4),
+                   max_df=cluster_config.get('max_df', 0.5),
+                   key_sentences=cluster_config.get('key_sentences', 2),
+                   max_story_size=cluster_config.get('max_story_size', 8))
+
+    def vectorize(self, articles: List[Dict]) -> sparse.csr_matrix:
+        """文章 -> L2归一化的稀疏TF-IDF矩阵（行：文章，列：词）"""
+        vocab = {}
+        rows, cols, values = [], [], []
+        for row, article in enumerate(articles):
+            counts = {}
+            for token in tokenize(article.get('content') or article.get('summary') or ''):
+                counts[token] = counts.get(token, 0) + 1
+            for token in tokenize(article.get('title') or ''):
+                counts[token] = counts.get(token, 0) + TITLE_WEIGHT
+            for token, count in counts.items():
+                rows.append(row)
+                cols.append(vocab.setdefault(token, len(vocab)))
+                values.append(count)
+
+        n = len(articles)
+        matrix = sparse.csr_matrix((np.array(values, dtype=np.float32), (rows, cols)),
+                                   shape=(n, max(len(vocab), 1)))
+        # 对数词频 × 平滑IDF
+        matrix.data = np.log1p(matrix.data)
+        df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        idf = np.log((1 + n) / (1 + df)).astype(np.float32) + 1.0
+        if n >= 10:
+            idf[df > self.max_df * n] = 0.0
+        matrix = matrix.multiply(idf[np.newaxis, :]).tocsr()
+        matrix.eliminate_zeros()
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+    def similarity(self, matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+        """稀疏余弦相似度矩阵（只保留达到阈值的元素，不含对角线）"""
+        similarity = (matrix @ matrix.T).tocsr()
+        similarity.setdiag(0)
+        similarity.data[similarity.data < self.threshold] = 0
+        similarity.eliminate_zeros()
+        return similarity
+
+    def cluster(self, articles: List[Dict]) -> List[List[int]]:
+        """
+        聚类
+
+        Returns:
+            事件列表，每个事件为文章下标列表（领头文章在前；事件按领头文章的原始顺序排列）
+        """
+        n = len(articles)
+        if n <= 1:
+            return [[i] for i in range(n)]
+
+        similarity = self.similarity(self.vectorize(articles))
+        leader_of = np.full(n, -1, dtype=np.int64)
+        stories = {}
+        for i in range(n):
+            start, end = similarity.indptr[i], similarity.indptr[i + 1]
+            best, best_score = -1, 0.0
+            for j, score in zip(similarity.indices[start:end], similarity.data[start:end]):
+                # 只能并入排在前面、且尚未满员的事件领头文章
+                if j < i and leader_of[j] == j and score > best_score and len(stories[j]) < self.max_story_size:
+                    best, best_score = j, score
+            if best >= 0:
+                leader_of[i] = best
+                stories[best].append(i)
+            else:
+                leader_of[i] = i
+                stories[i] = [i]
+        return [stories[leader] for leader in sorted(stories)]
+
+    def merge(self, articles: List[Dict], group: List[int]) -> Dict:
+        """
+        合并一个事件的文章：标题用领头文章，正文为各文章关键句，保留全部来源
+
+        Returns:
+            新文章字典，额外包含story_sources: [(来源, 标题, 链接)]
+        """
+        leader = articles[group[0]]
+        if len(group) == 1:
+            return leader
+
+        parts = []
+        story_sources = []
+        for index in group:
+            article = articles[index]
+            sentences = summarizer.key_sentences(article.get('content') or article.get('summary') or '',
+                                                 max_sentences=self.key_sentences, title=article.get('title', ''))
+            if sentences:
+                parts.append(f"【{article.get('source', '')}】{join_sentences(sentences)}")
+            story_sources.append((article.get('source', ''), article.get('title', ''), article.get('url', '')))
+
+        merged = dict(leader)
+        merged['content'] = "\n".join(parts)
+        merged['summary'] = leader.get('summary', '')
+        merged['story_sources'] = story_sources
+        return merged
+
+    def group_articles(self, articles: List[Dict]) -> List[Dict]:
+        """聚类并合并，返回事件列表（单篇文章的事件原样返回）"""
+        return [self.merge(articles, group) for group in self.cluster(articles)]
+
+
+def benchmark(count: int = 3000, stories: Optional[int] = None):
+    """用合成文章测试聚类速度"""
+    import random
+    import time
+
+    random.seed(1)
+    stories = stories or max(1, count // 3)
+    vocabulary = [f"w{i}" for i in range(5000)] + [chr(0x4e00 + i) for i in range(3000)]
+    topics = [random.sample(vocabulary, 30) for _ in range(stories)]
+    articles = []
+    for i in range(count):
+        topic = topics[random.randrange(stories)]
+        words = random.sample(topic, 25) + random.sample(vocabulary, 15)
+        articles.append({'title': ' '.join(words[:8]), 'content': ' '.join(words), 'source': f"s{i % 10}",
+                         'url': f"http://example.com/{i}"})
+
+    clusterer = StoryClusterer()
+    started = time.time()
+    groups = clusterer.cluster(articles)
+    elapsed = time.time() - started
+    sizes = [len(g) for g in groups]
+    print(f"{count} 篇文章 -> {len(groups)} 个事件（最大 {max(sizes)} 篇），耗时 {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    benchmark()
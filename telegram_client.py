@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Telegram发送客户端（全局共享）
+- 复用连接池（requests.Session）
+- 每个chat一个有序发送队列，保证同一chat内消息顺序
+- 全局和单chat限速（Telegram限制：全局约30条/秒，单chat约1条/秒，群组约20条/分钟）
+- 处理429 retry_after，网络错误和5xx自动重试
+- 统计每次运行的吞吐量和重试次数
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import BOT_TOKEN, config
+from proxy_router import NO_PROXIES, get_proxy_router
+
+
+class RateLimiter:
+    """令牌桶限速器（线程安全）"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发量），默认等于rate
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds: float):
+        """暂停发放令牌（收到429时使用）"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        """阻塞直到取得一个令牌"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    self.updated = now
+                    wait = self.paused_until - now
+            time.sleep(wait)
+
+
+class TelegramClient:
+    """Telegram Bot API发送客户端"""
+
+    def __init__(self, bot_token: str = None, proxies: Dict = None, api_base: str = None,
+                 global_per_second: float = 30, per_chat_per_second: float = 1, group_per_minute: float = 20,
+                 max_retries: int = 5, timeout: float = 30, idle_timeout: float = 30):
+        """
+        初始化发送客户端
+
+        Args:
+            bot_token: Bot令牌，默认使用config中的BOT_TOKEN
+            proxies: 代理设置，默认按proxy_routing规则为api_base选择路由
+            api_base: Bot API地址，默认从环境变量TELEGRAM_API_URL读取（可指向本地模拟服务）
+            global_per_second: 全局每秒最多发送条数
+            per_chat_per_second: 单个私聊每秒最多发送条数
+            group_per_minute: 单个群组每分钟最多发送条数
+            max_retries: 单条消息最大重试次数
+            timeout: 单次请求超时（秒）
+            idle_timeout: chat发送线程空闲多久后退出（秒）
+        """
+        self.bot_token = bot_token if bot_token is not None else BOT_TOKEN
+        self.api_base = (api_base or os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')).rstrip('/')
+        # 未指定代理时按路由规则选择
+        self.proxies = proxies if proxies is not None else get_proxy_router().proxies_for_url(self.api_base)
+        # 本地模拟服务不走代理
+        if urlparse(self.api_base).hostname in ('127.0.0.1', 'localhost'):
+            self.proxies = dict(NO_PROXIES)
+        self.per_chat_per_second = per_chat_per_second
+        self.group_per_minute = group_per_minute
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.global_limiter = RateLimiter(global_per_second)
+        self.chat_limiters = {}
+        self.chat_queues = {}
+        self.chat_threads = {}
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.reset_stats()
+
+    @classmethod
+    def from_config(cls) -> 'TelegramClient':
+        """从config.yaml的telegram.delivery配置创建"""
+        telegram_config = config.load_yaml_config().get('telegram') or {}
+        delivery = telegram_config.get('delivery') or {}
+        return cls(
+            global_per_second=delivery.get('global_per_second', 30),
+            per_chat_per_second=delivery.get('per_chat_per_second', 1),
+            group_per_minute=delivery.get('group_per_minute', 20),
+            max_retries=delivery.get('max_retries', 5),
+            timeout=delivery.get('timeout', 30),
+        )
+
+    # ==================== 统计 ====================
+
+    def reset_stats(self):
+        """开始新一轮统计"""
+        with self.lock:
+            self.stats = {'sent': 0, 'failed': 0, 'retries': 0, 'rate_limited': 0,
+                          'requests': 0, 'started': time.monotonic()}
+
+    def _count(self, key: str, value: int = 1):
+        with self.lock:
+            self.stats[key] += value
+
+    def get_stats(self) -> Dict:
+        """返回本轮统计（含吞吐量）"""
+        with self.lock:
+            stats = dict(self.stats)
+        elapsed = max(time.monotonic() - stats.pop('started'), 1e-6)
+        stats['elapsed'] = elapsed
+        stats['per_second'] = stats['sent'] / elapsed
+        return stats
+
+    def print_stats(self):
+        """打印本轮发送统计"""
+        stats = self.get_stats()
+        print(f"Telegram发送统计: 成功 {stats['sent']} 条，失败 {stats['failed']} 条，"
+              f"请求 {stats['requests']} 次，重试 {stats['retries']} 次（其中429限流 {stats['rate_limited']} 次），"
+              f"耗时 {stats['elapsed']:.1f}s，吞吐 {stats['per_second']:.2f} 条/秒")
+
+    # ==================== Bot API调用 ====================
+
+    def call(self, method: str, payload: Optional[Dict] = None, timeout: Optional[float] = None) -> Dict:
+        """
+        直接调用Bot API方法（不经过发送队列和限速）
+
+        Returns:
+            API返回的JSON；网络错误时抛出异常
+        """
+        url = f"{self.api_base}/bot{self.bot_token}/{method}"
+        self._count('requests')
+        response = self.session.post(url, json=payload or {}, proxies=self.proxies,
+                                     timeout=timeout or self.timeout)
+        try:
+            return response.json()
+        except ValueError:
+            return {'ok': False, 'error_code': response.status_code, 'description': response.text[:200]}
+
+    def _chat_limiter(self, chat_id: str) -> RateLimiter:
+        """获取chat的限速器（群组ID为负数，按每分钟限速）"""
+        with self.lock:
+            limiter = self.chat_limiters.get(chat_id)
+            if limiter is None:
+                if str(chat_id).startswith('-'):
+                    limiter = RateLimiter(self.group_per_minute / 60, capacity=1)
+                else:
+                    limiter = RateLimiter(self.per_chat_per_second, capacity=1)
+                self.chat_limiters[chat_id] = limiter
+            return limiter
+
+    def _deliver(self, chat_id: str, payload: Dict) -> bool:
+        """限速发送一条消息，处理429和可重试错误"""
+        chat_limiter = self._chat_limiter(chat_id)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count('retries')
+            chat_limiter.acquire()
+            self.global_limiter.acquire()
+
+            try:
+                result = self.call('sendMessage', payload)
+            except requests.exceptions.RequestException as e:
+                print(f"[WARN] Telegram请求失败: {str(e)[:80]}（尝试 {attempt + 1}/{self.max_retries + 1}）")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            if result.get('ok'):
+                self._count('sent')
+                return True
+
+            error_code = result.get('error_code')
+            if error_code == 429:
+                retry_after = (result.get('parameters') or {}).get('retry_after', 1)
+                self._count('rate_limited')
+                print(f"[WARN] Telegram限流，{retry_after}秒后重试")
+                chat_limiter.pause(retry_after)
+                self.global_limiter.pause(retry_after)
+                continue
+            if error_code and error_code >= 500:
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            print(f"[FAIL] 发送失败: {result}")
+            break
+
+        self._count('failed')
+        return False
+
+    def _chat_worker(self, chat_id: str, chat_queue: queue.Queue):
+        """单个chat的发送线程：按入队顺序逐条发送，空闲超时后退出"""
+        while True:
+            try:
+                payload, future = chat_queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self.lock:
+                    if chat_queue.empty():
+                        self.chat_queues.pop(chat_id, None)
+                        self.chat_threads.pop(chat_id, None)
+                        return
+                continue
+
+            try:
+                future.set_result(self._deliver(chat_id, payload))
+            except Exception as e:
+                print(f"[ERROR] {e}")
+                self._count('failed')
+                future.set_result(False)
+            finally:
+                chat_queue.task_done()
+
+    # ==================== 发送接口 ====================
+
+    def send_async(self, chat_id: str, text: str, **params) -> Future:
+        """
+        将消息加入chat的发送队列
+
+        Args:
+            chat_id: 目标chat
+            text: 消息文本
+            **params: 其他sendMessage参数（如parse_mode、disable_web_page_preview）
+
+        Returns:
+            Future，结果为是否发送成功
+        """
+        chat_id = str(chat_id)
+        future = Future()
+        payload = {'chat_id': chat_id, 'text': text, **params}
+        with self.lock:
+            chat_queue = self.chat_queues.get(chat_id)
+            if chat_queue is None:
+                chat_queue = queue.Queue()
+                self.chat_queues[chat_id] = chat_queue
+                thread = threading.Thread(target=self._chat_worker, args=(chat_id, chat_queue), daemon=True)
+                self.chat_threads[chat_id] = thread
+                thread.start()
+            chat_queue.put((payload, future))
+        return future
+
+    def send_message(self, chat_id: str, text: str, **params) -> bool:
+        """发送消息并等待结果"""
+        return self.send_async(chat_id, text, **params).result()
+
+    def flush(self):
+        """等待所有已入队消息发送完成"""
+        with self.lock:
+            queues = list(self.chat_queues.values())
+        for chat_queue in queues:
+            chat_queue.join()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_telegram_client() -> TelegramClient:
+    """获取进程内共享的Telegram客户端"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = TelegramClient.from_config()
+        return _default_client
@@ -4,49 +4,47 @@ Telegram新闻Bot
 在Telegram聊天框中直接使用命令获取金融新闻
 """
 import sys
-import json
-import requests
 from datetime import datetime
-from pathlib import Path
-from typing import Dict
+from concurrent.futures import Future
+from typing import Dict, List
 
 # 导入配置
-from config import PROXIES, BOT_TOKEN, CHAT_ID
+from config import CHAT_ID
 from openclaw_news_skill import OpenClawNewsSkill
+from telegram_client import get_telegram_client
+from message_packer import split_text
 
 class TelegramNewsBot:
     """Telegram新闻Bot"""
 
+    # 不需要抓取新闻、可立即回复的命令
+    QUICK_COMMANDS = {'/help', '/start', 'help', '帮助', '/status', '状态'}
+
     def __init__(self):
         self.skill = OpenClawNewsSkill()
-        self.last_update_file = Path(__file__).parent / 'data' / 'last_update_id.txt'
+        self.telegram = get_telegram_client()
+        self.store = self.skill.store
+
+    def queue_message(self, chat_id: str, text: str) -> List[Future]:
+        """将消息加入共享发送队列（长消息在段落或行边界拆分），返回各分片的Future"""
+        chunks = split_text(text) or [text]
+        futures = []
+        for chunk in chunks:
+            future = self.telegram.send_async(chat_id, chunk)
+            future.add_done_callback(
+                lambda f, size=len(chunk): self.store.record_delivery(chat_id, 'command', f.result(), size))
+            futures.append(future)
+        return futures
 
     def send_message(self, chat_id: str, text: str) -> bool:
-        """发送消息到Telegram"""
-        url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-
-        # 处理长消息
-        max_length = 4000
-        if len(text) > max_length:
-            # 分批发送
-            for i in range(0, len(text), max_length):
-                chunk = text[i:i+max_length]
-                data = {"chat_id": chat_id, "text": chunk}
-                try:
-                    requests.post(url, json=data, proxies=PROXIES, timeout=30)
-                except:
-                    pass
-            return True
-
-        data = {"chat_id": chat_id, "text": text}
+        """发送消息到Telegram（经共享发送队列限速，长消息分批按顺序发送）"""
+        # 全部入队后再等待结果，任一分片失败即返回False
+        futures = self.queue_message(chat_id, text)
+        return all([future.result() for future in futures])
 
-        try:
-            response = requests.post(url, json=data, proxies=PROXIES, timeout=30)
-            result = response.json()
-            return result.get('ok', False)
-        except Exception as e:
-            print(f"发送失败: {e}")
-            return False
+    def is_quick_command(self, text: str) -> bool:
+        """是否为无需抓取新闻的即时命令"""
+        return text.strip() in self.QUICK_COMMANDS
 
     def get_news_message(self, max_articles: int = 5) -> str:
         """获取新闻摘要消息"""
@@ -58,6 +56,8 @@ class TelegramNewsBot:
         lines.append(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}")
         lines.append(f"📊 成功源: {result['successful_sources']}/{result['total_sources']}")
         lines.append(f"📝 总文章数: {result['total_articles']}")
+        if result.get('snapshot_age', 0) >= 60:
+            lines.append(f"🕒 数据更新于 {int(result['snapshot_age'] // 60)} 分钟前")
         lines.append("")
 
         # 按源显示新闻
@@ -94,7 +94,8 @@ class TelegramNewsBot:
 /news 或 新闻 - 获取最新新闻摘要
 /news5 - 获取5篇新闻
 /news10 - 获取10篇
-/search 关键词 - 搜索新闻
+/search 关键词 - 搜索新闻（可加 source:来源 days:天数）
+/trend 关键词 - 关键词每日提及统计（默认90天，可加 source:来源 days:天数）
 /sina - 只获取新浪新闻
 /status - 查看系统状态
 
@@ -102,6 +103,8 @@ class TelegramNewsBot:
 • /news
 • /news5
 • /search AI
+• /search 英伟达 source:cnbc days:7
+• /trend NVIDIA days:30
 • /sina
 """
 
@@ -120,13 +123,20 @@ class TelegramNewsBot:
             return self._format_source_news(result, '新浪财经')
 
         elif text.startswith('/search ') or text.startswith('搜索 '):
-            keyword = text.split(' ', 1)[1] if ' ' in text else ''
+            keyword, sources, days = self._parse_search_args(text.split(' ', 1)[1] if ' ' in text else '')
             if keyword:
-                articles = self.skill.get_news_by_keyword(keyword, max_articles=10)
+                articles = self.skill.get_news_by_keyword(keyword, max_articles=10, sources=sources, days=days)
                 return self._format_search_results(keyword, articles)
             else:
                 return "请提供搜索关键词，例如：/search AI"
 
+        elif text.startswith('/trend ') or text.startswith('趋势 '):
+            keyword, sources, days = self._parse_search_args(text.split(' ', 1)[1] if ' ' in text else '')
+            if keyword:
+                return self.skill.get_mention_trend(keyword, days=days or 90, sources=sources)['text']
+            else:
+                return "请提供关键词，例如：/trend NVIDIA"
+
         elif text in ['/status', '状态']:
             sources = self.skill.fetcher.sources
             enabled = [s for s in sources.values() if s.get('enabled', False)]
@@ -160,6 +170,22 @@ class TelegramNewsBot:
         lines.append("=" * 40)
         return "\n".join(lines)
 
+    @staticmethod
+    def _parse_search_args(args: str):
+        """解析搜索参数，返回(关键词, 来源列表, 天数)，如：AI source:cnbc days:7"""
+        words = []
+        sources = []
+        days = None
+        for part in args.split():
+            name, _, value = part.partition(':')
+            if value and name.lower() in ('source', '来源'):
+                sources.extend(v for v in value.split(',') if v)
+            elif value and name.lower() in ('days', '天') and value.isdigit():
+                days = int(value)
+            else:
+                words.append(part)
+        return ' '.join(words), sources or None, days
+
     def _format_search_results(self, keyword: str, articles: list) -> str:
         """格式化搜索结果"""
         lines = []
@@ -171,7 +197,8 @@ class TelegramNewsBot:
         else:
             for i, article in enumerate(articles[:10], 1):
                 lines.append(f"{i}. {article['title']}")
-                lines.append(f"   来源: {article['matched_source']}")
+                published = (article.get('published_at') or '')[:10]
+                lines.append(f"   来源: {article['matched_source']}{'  ' + published if published else ''}")
                 lines.append(f"   {article['summary'][:60]}...")
                 lines.append("")
 
@@ -181,11 +208,8 @@ class TelegramNewsBot:
     def _get_success_methods_status(self) -> str:
         """获取成功方法状态"""
         try:
-            methods_file = Path(__file__).parent / 'data' / 'success_methods.json'
-            if methods_file.exists():
-                with open(methods_file, 'r', encoding='utf-8') as f:
-                    methods = json.load(f)
-
+            methods = self.store.get_success_methods()
+            if methods:
                 lines = []
                 for source, method in list(methods.items())[:10]:
                     lines.append(f"  {source}: {method}")
@@ -200,10 +224,10 @@ class TelegramNewsBot:
         return "  暂无记录"
 
 
-def run_webhook_mode():
-    """Webhook模式（需要部署到服务器）"""
-    print("Webhook模式需要服务器部署，暂不支持")
-    print("请使用 polling 模式或直接命令测试")
+def run_webhook_mode(public_url: str = None):
+    """Webhook模式（本地HTTP服务接收update，公网地址需通过反向代理转发到本地端口）"""
+    from bot_runtime import run_webhook_mode as run_webhook_runtime
+    run_webhook_runtime(public_url)
 
 
 def run_test_message():
@@ -217,7 +241,7 @@ def run_test_message():
 
     # 获取1条新闻
     print("正在获取新闻...")
-    result = bot.skill.get_news_summary(max_articles=1, sources=['sina_finance'])
+    result = bot.skill.get_news_summary(max_articles=1, sources=['sina_finance'], use_cache=False)
     if result['total_articles'] > 0:
         # 格式化消息
         source = result['articles']['sina_finance'][0]['source']
@@ -246,6 +270,15 @@ if __name__ == '__main__':
         success = run_test_message()
         sys.exit(0 if success else 1)
 
+    # 常驻模式：长轮询接收命令
+    elif len(sys.argv) > 1 and sys.argv[1] == '--poll':
+        from bot_runtime import run_polling_mode
+        run_polling_mode()
+
+    # 常驻模式：Webhook接收命令（可选参数为注册到Telegram的公网地址）
+    elif len(sys.argv) > 1 and sys.argv[1] == '--webhook':
+        run_webhook_mode(sys.argv[2] if len(sys.argv) > 2 else None)
+
     # 交互模式：处理命令
     elif len(sys.argv) > 1 and sys.argv[1] == '--cmd':
         if len(sys.argv) < 3:
@@ -280,7 +313,13 @@ Telegram新闻Bot使用说明：
    python telegram_news_bot.py --cmd '/sina'
    python telegram_news_bot.py --cmd '/search AI'
 
-3. 在Telegram中使用:
+3. 常驻模式（长轮询接收Telegram命令，Ctrl+C停止）:
+   python telegram_news_bot.py --poll
+
+4. Webhook模式（本地HTTP服务，可选注册公网地址）:
+   python telegram_news_bot.py --webhook https://example.com/telegram/webhook
+
+5. 在Telegram中使用:
    直接向Bot发送以下命令：
    • /news - 获取新闻摘要
    • /news5 - 获取5篇新闻
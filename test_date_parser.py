@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+测试脚本：验证发布时间解析（离线，不访问网络）
+- 相对时间（刚刚、N分钟前、昨天）用固定的当前时间
+- RFC 822时区（+0000、GMT、EST、CST）、ISO 8601、Unix时间戳、URL中的日期
+"""
+from datetime import datetime, timedelta, timezone
+
+from date_parser import CHINA_TZ, parse_date_from_url, parse_published
+
+NOW = datetime(2026, 10, 19, 12, 0, 0, tzinfo=CHINA_TZ)
+
+
+def test_relative():
+    """相对时间按NOW计算"""
+    assert parse_published('刚刚', now=NOW) == NOW
+    assert parse_published('5分钟前', now=NOW) == NOW - timedelta(minutes=5)
+    assert parse_published('3小时前', now=NOW) == NOW - timedelta(hours=3)
+    assert parse_published('2天前', now=NOW) == NOW - timedelta(days=2)
+    assert parse_published('今天 08:30', now=NOW) == datetime(2026, 10, 19, 8, 30, tzinfo=CHINA_TZ)
+    assert parse_published('昨天 23:10', now=NOW) == datetime(2026, 10, 18, 23, 10, tzinfo=CHINA_TZ)
+    assert parse_published('前天', now=NOW) == datetime(2026, 10, 17, tzinfo=CHINA_TZ)
+    # 比当前时间晚的只有时分的时间视为昨天
+    assert parse_published('08:00', now=NOW) == datetime(2026, 10, 19, 8, 0, tzinfo=CHINA_TZ)
+    assert parse_published('23:00', now=NOW) == datetime(2026, 10, 18, 23, 0, tzinfo=CHINA_TZ)
+
+
+def test_month_day():
+    """只有月日时推断年份"""
+    assert parse_published('10月17日 08:30', now=NOW) == datetime(2026, 10, 17, 8, 30, tzinfo=CHINA_TZ)
+    assert parse_published('12-31 09:00', now=NOW) == datetime(2025, 12, 31, 9, 0, tzinfo=CHINA_TZ)
+
+
+def test_rfc822():
+    """RFC 822时区：CST按北京时间处理"""
+    utc = datetime(2026, 10, 17, 8, 30, tzinfo=timezone.utc)
+    assert parse_published('Sat, 17 Oct 2026 08:30:00 +0000') == utc
+    assert parse_published('Sat, 17 Oct 2026 08:30:00 GMT') == utc
+    assert parse_published('Sat, 17 Oct 2026 16:30:00 +0800') == utc
+    assert parse_published('Sat, 17 Oct 2026 03:30:00 EST') == utc
+    assert parse_published('Sat, 17 Oct 2026 16:30:00 CST') == utc
+    assert parse_published('Sat, 17 Oct 2026 08:30:00') == utc
+    assert parse_published('17 Oct 26 08:30 GMT') == utc
+
+
+def test_numeric():
+    """ISO 8601和中文网站数字日期"""
+    utc = datetime(2026, 10, 17, 8, 30, tzinfo=timezone.utc)
+    assert parse_published('2026-10-17T08:30:00Z') == utc
+    assert parse_published('2026-10-17T16:30:00+08:00') == utc
+    assert parse_published('2026-10-17 16:30') == utc
+    assert parse_published('2026年10月17日 16:30') == utc
+    assert parse_published('2026/10/17') == datetime(2026, 10, 17, tzinfo=CHINA_TZ)
+
+
+def test_timestamp():
+    """Unix时间戳（秒和毫秒）"""
+    utc = datetime(2026, 10, 17, 8, 30, tzinfo=timezone.utc)
+    seconds = int(utc.timestamp())
+    assert parse_published(seconds) == utc
+    assert parse_published(str(seconds * 1000)) == utc
+
+
+def test_invalid():
+    """无法解析时返回None"""
+    assert parse_published(None) is None
+    assert parse_published('') is None
+    assert parse_published('不是时间') is None
+    assert parse_published('2026-13-40') is None
+
+
+def test_url_date():
+    """URL中的日期"""
+    expected = datetime(2026, 10, 17, tzinfo=CHINA_TZ)
+    assert parse_date_from_url('https://finance.sina.com.cn/stock/2026-10-17/doc-abc.shtml') == expected
+    assert parse_date_from_url('https://www.cnbc.com/2026/10/17/markets.html') == expected
+    assert parse_date_from_url('https://www.yicai.com/news/20261017/123.html') == expected
+    assert parse_date_from_url('https://www.yicai.com/news/102026101799.html') is None
+
+
+def main():
+    print("=" * 60)
+    print("发布时间解析测试")
+    print("=" * 60)
+    tests = [test_relative, test_month_day, test_rfc822, test_numeric, test_timestamp, test_invalid, test_url_date]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[FAIL] {test.__doc__}: {e}")
+    print("=" * 60)
+    print(f"通过 {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+测试脚本：验证Telegram消息打包（离线，不访问网络）
+- 长度按UTF-16码元计算：emoji等辅助平面字符占2个
+- 条目按顺序贪心装满每条消息，超长条目按段落/行/句子拆分，拼接后与原文一致
+- 增量打包器MessagePacker与pack_messages结果相同
+"""
+from message_packer import MessagePacker, TELEGRAM_MAX_CHARS, pack_messages, split_text, text_length
+
+HEADER = "📰 财经新闻\n\n"
+FOOTER = "\n" + "-" * 20 + "\n\n"
+
+
+def _items():
+    items = []
+    for i in range(60):
+        body = "\n\n".join(f"第{i}条第{p}段：市场消息📈😀，" + "涨跌互现。" * (i % 7 * 20) for p in range(i % 4 + 1))
+        items.append(f"【{i}】标题🚀\n{body}")
+    return items
+
+
+def test_text_length():
+    """按UTF-16码元计数"""
+    assert text_length('abc') == 3
+    assert text_length('新闻') == 2
+    assert text_length('😀') == 2
+    assert text_length('📈a') == 3
+
+
+def test_utf16_limit():
+    """每条消息不超过UTF-16长度限制，条目顺序不变"""
+    items = _items()
+    messages = pack_messages(items, header=HEADER, item_footer=FOOTER)
+    assert all(text_length(m) <= TELEGRAM_MAX_CHARS for m in messages)
+    assert all(m.startswith(HEADER) for m in messages)
+    # Python字符数未超限但UTF-16超限的情况
+    emoji = '😀' * 3000
+    assert len(emoji) <= TELEGRAM_MAX_CHARS < text_length(emoji)
+    parts = split_text(emoji)
+    assert len(parts) == 2 and ''.join(parts) == emoji
+    assert all(text_length(p) <= TELEGRAM_MAX_CHARS for p in parts)
+    joined = ''.join(m[len(HEADER):] for m in messages)
+    positions = [joined.find(f"【{i}】") for i in range(len(items))]
+    assert all(p >= 0 for p in positions) and positions == sorted(positions)
+
+
+def test_max_bytes():
+    """同时限制UTF-8字节数"""
+    messages = pack_messages(_items(), header=HEADER, item_footer=FOOTER, max_bytes=4000)
+    assert all(len(m.encode('utf-8')) <= 4000 and text_length(m) <= TELEGRAM_MAX_CHARS for m in messages)
+
+
+def test_split_boundaries():
+    """超长文本在段落边界拆分"""
+    paragraphs = [f"第{i}段" + "内容" * 40 for i in range(10)]
+    text = "\n\n".join(paragraphs)
+    parts = split_text(text, max_chars=200)
+    # 消息末尾的换行会去掉，拼接时补回段落分隔
+    assert "\n\n".join(parts) == text
+    assert all(text_length(p) <= 200 for p in parts)
+    assert all(p.startswith("第") for p in parts)
+    # 没有边界时按字符硬切，不会切开代理对
+    parts = split_text('😀' * 150, max_chars=101)
+    assert ''.join(parts) == '😀' * 150
+    assert [text_length(p) for p in parts] == [100, 100, 100]
+
+
+def test_greedy_packing():
+    """短条目合并到尽量少的消息"""
+    items = ['a' * 30] * 10
+    messages = pack_messages(items, item_footer='\n', max_chars=100)
+    assert messages == ['\n'.join(['a' * 30] * 3)] * 3 + ['a' * 30]
+    assert pack_messages([]) == []
+
+
+def test_incremental():
+    """MessagePacker逐条加入与pack_messages结果相同"""
+    items = _items()
+    packer = MessagePacker(HEADER, FOOTER)
+    messages = []
+    for item in items:
+        messages.extend(packer.add(item))
+    messages.extend(packer.flush())
+    assert messages == pack_messages(items, header=HEADER, item_footer=FOOTER)
+
+
+def test_header_too_long():
+    """标题超过限制时报错"""
+    try:
+        pack_messages(['a'], header='😀' * 50, max_chars=100)
+    except ValueError:
+        return
+    raise AssertionError("未抛出ValueError")
+
+
+def main():
+    print("=" * 60)
+    print("消息打包测试")
+    print("=" * 60)
+    tests = [test_text_length, test_utf16_limit, test_max_bytes, test_split_boundaries, test_greedy_packing,
+             test_incremental, test_header_too_long]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[FAIL] {test.__doc__}: {e}")
+    print("=" * 60)
+    print(f"通过 {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+测试脚本：验证新闻全文检索（离线，使用临时索引文件）
+- 中文二元组、单字查询和英文单词查询
+- BM25排序、来源和日期过滤、同一URL更新
+"""
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from search_index import SearchIndex
+
+ARTICLES = [
+    {'url': 'https://a.com/1', 'title': '国际金价创历史新高', 'content': '黄金期货上涨，避险需求升温。',
+     'source': 'sina_finance', 'published_at': '2026-10-18T09:00:00'},
+    {'url': 'https://a.com/2', 'title': '原油库存下降', 'content': 'OPEC减产，布伦特油价走高。',
+     'source': 'cnbc', 'published_at': '2026-10-19T09:00:00'},
+    {'url': 'https://a.com/3', 'title': 'Apple earnings beat', 'content': 'Apple reported record iPhone sales.',
+     'source': 'cnbc', 'published_at': '2026-10-19T10:00:00'},
+]
+
+
+def _index(directory: str) -> SearchIndex:
+    index = SearchIndex(Path(directory) / 'search_index.db')
+    index.add_articles(ARTICLES)
+    return index
+
+
+def _urls(results):
+    return [r['url'] for r in results]
+
+
+def test_single_char_query():
+    """单字查询命中包含该字的文章"""
+    with tempfile.TemporaryDirectory() as directory:
+        index = _index(directory)
+        assert _urls(index.search('金')) == ['https://a.com/1']
+        assert _urls(index.search('油')) == ['https://a.com/2']
+        assert index.search('铜') == []
+        index.close()
+
+
+def test_bigram_and_words():
+    """中文词和英文单词查询，标题命中排在前面"""
+    with tempfile.TemporaryDirectory() as directory:
+        index = _index(directory)
+        assert _urls(index.search('黄金')) == ['https://a.com/1']
+        assert _urls(index.search('原油 库存')) == ['https://a.com/2']
+        assert _urls(index.search('APPLE iphone')) == ['https://a.com/3']
+        assert index.search('') == []
+        index.close()
+
+
+def test_filters():
+    """来源和日期过滤"""
+    with tempfile.TemporaryDirectory() as directory:
+        index = _index(directory)
+        assert _urls(index.search('油', sources=['sina_finance'])) == []
+        assert _urls(index.search('金', since=datetime(2026, 10, 19))) == []
+        assert _urls(index.search('Apple', until=datetime(2026, 10, 19, 9, 30))) == []
+        index.close()
+
+
+def test_update():
+    """同一URL重复写入时更新"""
+    with tempfile.TemporaryDirectory() as directory:
+        index = _index(directory)
+        index.add_articles([dict(ARTICLES[0], title='白银走弱', content='白银价格回落。')])
+        assert index.count() == 3
+        assert index.search('金') == []
+        assert _urls(index.search('银')) == ['https://a.com/1']
+        index.close()
+
+
+def main():
+    print("=" * 60)
+    print("全文检索测试")
+    print("=" * 60)
+    tests = [test_single_char_query, test_bigram_and_words, test_filters, test_update]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[FAIL] {test.__doc__}: {e}")
+    print("=" * 60)
+    print(f"通过 {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = main()
+    exit(0 if success else 1)
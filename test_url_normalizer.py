@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+测试脚本：验证URL规范化（离线，不访问网络）
+- 跟踪参数删除和参数排序、站点保留/删除参数规则
+- 协议和端口：80/443改为https后省略，非标准端口、localhost和IP保留原协议
+- 域名别名、协议相对链接和相对路径
+"""
+from url_normalizer import UrlCanonicalizer
+
+canonicalizer = UrlCanonicalizer(sites={
+    'www.cnbc.com': {'keep_params': ['id']},
+    'www.yicai.com': {'strip_params': ['channel']},
+})
+
+
+def test_tracking_params():
+    """删除跟踪参数，剩余参数排序"""
+    c = canonicalizer.canonicalize
+    assert c('https://techcrunch.com/a?utm_source=x&utm_medium=rss&b=2&a=1') == 'https://techcrunch.com/a?a=1&b=2'
+    assert c('https://techcrunch.com/a?fbclid=1&spm=2&__twitter_impression=true') == 'https://techcrunch.com/a'
+    assert c('https://techcrunch.com/a?UTM_Source=x&q=1#comments') == 'https://techcrunch.com/a?q=1'
+
+
+def test_site_rules():
+    """站点规则：只保留参数、额外删除参数"""
+    c = canonicalizer.canonicalize
+    assert c('https://www.cnbc.com/a?id=7&page=2&utm_source=x') == 'https://www.cnbc.com/a?id=7'
+    assert c('https://www.yicai.com/news/1.html?channel=rss&page=2') == 'https://www.yicai.com/news/1.html?page=2'
+
+
+def test_scheme_and_port():
+    """协议统一为https，默认端口省略，非标准端口保留原协议"""
+    c = canonicalizer.canonicalize
+    assert c('http://techcrunch.com/a') == 'https://techcrunch.com/a'
+    assert c('HTTP://WWW.CNBC.COM:443/A') == 'https://www.cnbc.com/A'
+    assert c('http://www.cnbc.com:80/a') == 'https://www.cnbc.com/a'
+    assert c('https://www.cnbc.com:443/a') == 'https://www.cnbc.com/a'
+    assert c('http://www.cnbc.com:8080/a') == 'http://www.cnbc.com:8080/a'
+    assert c('https://www.cnbc.com:8443/a') == 'https://www.cnbc.com:8443/a'
+    assert c('http://localhost:8000/a') == 'http://localhost:8000/a'
+    assert c('http://127.0.0.1/a') == 'http://127.0.0.1/a'
+    assert UrlCanonicalizer(force_https=False).canonicalize('http://www.cnbc.com/a') == 'http://www.cnbc.com/a'
+
+
+def test_hosts_and_paths():
+    """域名别名、协议相对链接、相对路径、重复斜杠"""
+    c = canonicalizer.canonicalize
+    assert c('https://m.cnbc.com/a') == 'https://www.cnbc.com/a'
+    assert c('//m.cnbc.com/a') == 'https://www.cnbc.com/a'
+    assert c('https://www.techcrunch.com./a') == 'https://techcrunch.com/a'
+    assert c('https://yahoo.com/a') == 'https://yahoo.com/a'
+    assert c('/news/1.html', base='https://m.yicai.com/list/') == 'https://www.yicai.com/news/1.html'
+    assert c('https://techcrunch.com//a//b') == 'https://techcrunch.com/a/b'
+    assert c('https://techcrunch.com') == 'https://techcrunch.com/'
+
+
+def test_passthrough():
+    """非http(s)链接和非法链接原样返回"""
+    c = canonicalizer.canonicalize
+    assert c('') == ''
+    assert c('  mailto:a@b.com ') == 'mailto:a@b.com'
+    assert c('http://www.cnbc.com:99999/a') == 'http://www.cnbc.com:99999/a'
+
+
+def main():
+    print("=" * 60)
+    print("URL规范化测试")
+    print("=" * 60)
+    tests = [test_tracking_params, test_site_rules, test_scheme_and_port, test_hosts_and_paths, test_passthrough]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[FAIL] {test.__doc__}: {e}")
+    print("=" * 60)
+    print(f"通过 {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+文本处理工具
+- 中英文混合分句
+- 中英文混合分词（中文二元组 + 英文单词）
+- 模板化内容（责任编辑、来源、免责声明等）识别
+- 空白字符规整
+"""
+import re
+from typing import List
+
+# 中文句末标点直接断句；英文句号/问号/感叹号后需跟空白才断句，避免切开小数和缩写
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[。！？；!?;])|(?<=[.!?])\s+|[\r\n]+')
+_WHITESPACE_RE = re.compile(r'[ \t\u3000\xa0]+')
+_CJK_RUN_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff]+')
+_LATIN_WORD_RE = re.compile(r'[A-Za-z][A-Za-z0-9\-\.&]*[A-Za-z0-9]|[A-Za-z]|\d+(?:\.\d+)?%?')
+
+# 英文常见停用词（中文使用二元组，不单独处理停用词）
+_EN_STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have he her his in is it its of on or
+that the their they this to was were which will with would said says not also after
+""".split())
+
+# 整句删除的模板化内容
+_BOILERPLATE_SENTENCE_RES = [
+    re.compile(p) for p in [
+        r'^责任编辑[：:]',
+        r'^(文章)?来源[：:]',
+        r'^(编辑|校对|审核|作者|记者)[：:]',
+        r'^原标题[：:]',
+        r'^(免责声明|风险提示|特别声明|声明)[：:]',
+        r'新浪声明',
+        r'海量资讯、精准解读',
+        r'尽在新浪财经APP',
+        r'(扫描|扫码|长按).{0,10}(二维码|关注)',
+        r'关注.{0,10}(微信)?公众号',
+        r'点击(进入|查看|阅读)',
+        r'(?i)^(read more|click here|sign up|subscribe)\b',
+        r'(?i)all rights reserved',
+        r'^©',
+    ]
+]
+
+# 句内删除的模板化片段
+_BOILERPLATE_INLINE_RES = [
+    re.compile(p) for p in [
+        r'责任编辑[：:]\s*[^\s。；;，,）)]{1,10}',
+        r'[（(](文章)?来源[：:][^）)]*[）)]',
+        r'<[^<]+?>',
+    ]
+]
+
+
+def normalize_whitespace(text: str) -> str:
+    """合并连续空白（含全角空格、不间断空格），去掉首尾空白"""
+    if not text:
+        return ''
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def split_sentences(text: str, min_length: int = 2) -> List[str]:
+    """
+    中英文混合分句
+
+    Args:
+        text: 原文
+        min_length: 短于该长度的片段会被丢弃
+
+    Returns:
+        句子列表（保留句末标点）
+    """
+    if not text:
+        return []
+    sentences = []
+    for part in _SENTENCE_SPLIT_RE.split(text):
+        if not part:
+            continue
+        part = normalize_whitespace(part)
+        if len(part) >= min_length:
+            sentences.append(part)
+    return sentences
+
+
+def tokenize(text: str, unigrams: bool = False) -> List[str]:
+    """
+    中英文混合分词
+
+    中文按连续汉字的二元组切分（单字词保留单字），英文按单词切分并转小写，去掉常见停用词
+
+    Args:
+        text: 原文
+        unigrams: 中文同时输出每个单字（检索索引用，使单字查询也能命中）
+    """
+    if not text:
+        return []
+    tokens = []
+    for run in _CJK_RUN_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            if unigrams:
+                tokens.extend(run)
+    for word in _LATIN_WORD_RE.findall(text):
+        word = word.lower()
+        if word not in _EN_STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+
+def remove_inline_boilerplate(text: str) -> str:
+    """删除句内的模板化片段（责任编辑、括号内来源、残留HTML标签）"""
+    if not text:
+        return ''
+    for pattern in _BOILERPLATE_INLINE_RES:
+        text = pattern.sub(' ', text)
+    return text
+
+
+def is_boilerplate(sentence: str) -> bool:
+    """判断整句是否为模板化内容"""
+    return any(p.search(sentence) for p in _BOILERPLATE_SENTENCE_RES)
+
+
+def join_sentences(sentences: List[str]) -> str:
+    """拼接句子：中文句子直接相连，英文句子之间加空格"""
+    result = ''
+    for sentence in sentences:
+        if result and (result[-1].isascii() or sentence[0].isascii()):
+            result += ' '
+        result += sentence
+    return normalize_whitespace(result)
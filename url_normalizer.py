@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+URL规范化
+- 同一篇文章常以不同URL出现：http/https（抓取器自己也会改写协议）、跟踪参数（utm_*、spm、from…）、
+  锚点、协议相对链接（//host/path）、相对路径、移动版域名（m.cnbc.com）
+- canonicalize()把这些变体统一为一个规范URL，抓取入口用它去重，同一次运行中同一规范URL只处理一次
+- 规则：协议统一为https、域名小写并按别名表映射、去掉默认端口和锚点、删除跟踪参数、剩余参数排序；
+  每个站点可配置只保留的参数或额外删除的参数（config.yaml的url_normalization.sites）
+"""
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from config import config
+
+CONFIG_FILE = Path(__file__).parent / 'config' / 'config.yaml'
+
+# 通用跟踪参数（小写比较）
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', 'igshid',
+    'spm', 'scm', 'from', 'ref', 'ref_src', 'referrer', 'share', 'share_token', 'shareid', 'sharesource',
+    'cmpid', 'ncid', 'soc_src', 'soc_trk', 'sr_share', 'tt_from', 'wfr', 'yptr', '.tsrc',
+    'guccounter', 'guce_referrer', 'guce_referrer_sig',
+}
+# 以这些前缀开头的参数都视为跟踪参数
+TRACKING_PREFIXES = ('utm_', '__', 'hmsr', 'hmpl', 'hmcu', 'hmkw', 'hmci')
+
+# 默认的移动版/别名域名
+DEFAULT_HOST_ALIASES = {
+    'm.cnbc.com': 'www.cnbc.com',
+    'cnbc.com': 'www.cnbc.com',
+    'm.techcrunch.com': 'techcrunch.com',
+    'www.techcrunch.com': 'techcrunch.com',
+    'm.marketwatch.com': 'www.marketwatch.com',
+    'marketwatch.com': 'www.marketwatch.com',
+    'm.theverge.com': 'www.theverge.com',
+    'theverge.com': 'www.theverge.com',
+    'www.arstechnica.com': 'arstechnica.com',
+    'uk.finance.yahoo.com': 'finance.yahoo.com',
+    'm.yicai.com': 'www.yicai.com',
+    'yicai.com': 'www.yicai.com',
+    'm.cs.com.cn': 'www.cs.com.cn',
+    'cs.com.cn': 'www.cs.com.cn',
+    '10jqka.com.cn': 'www.10jqka.com.cn',
+}
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+_MULTI_SLASH_RE = re.compile(r'/{2,}')
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+class UrlCanonicalizer:
+    """URL规范化器"""
+
+    def __init__(self, host_aliases: Optional[Dict[str, str]] = None, sites: Optional[Dict[str, Dict]] = None,
+                 force_https: bool = True):
+        """
+        Args:
+            host_aliases: 域名别名 {别名: 规范域名}，在默认别名表基础上覆盖
+            sites: 站点规则 {规范域名: {keep_params: [...], strip_params: [...]}}
+                keep_params: 只保留这些参数（空列表表示去掉全部参数）
+                strip_params: 在通用跟踪参数之外额外删除的参数
+            force_https: http统一改为https
+        """
+        self.host_aliases = dict(DEFAULT_HOST_ALIASES)
+        self.host_aliases.update({k.lower(): v.lower() for k, v in (host_aliases or {}).items()})
+        self.sites = {}
+        for host, rule in (sites or {}).items():
+            rule = rule or {}
+            keep = rule.get('keep_params')
+            self.sites[host.lower()] = {
+                'keep': None if keep is None else {p.lower() for p in keep},
+                'strip': {p.lower() for p in rule.get('strip_params') or []},
+            }
+        self.force_https = force_https
+
+    @classmethod
+    def from_config(cls) -> 'UrlCanonicalizer':
+        """从config.yaml的url_normalization配置创建"""
+        url_config = config.load_yaml_config().get('url_normalization') or {}
+        return cls(host_aliases=url_config.get('host_aliases'),
+                   sites=url_config.get('sites'),
+                   force_https=url_config.get('force_https', True))
+
+    def canonicalize(self, url: str, base: str = '') -> str:
+        """
+        规范化URL
+
+        Args:
+            url: 原始链接（可为协议相对链接或相对路径）
+            base: 相对链接的基准URL（列表页地址）
+
+        Returns:
+            规范URL；不是http(s)链接时原样返回（去掉首尾空白）
+        """
+        url = (url or '').strip()
+        if not url:
+            return url
+        if url.startswith('//'):
+            url = 'https:' + url
+        elif base and not re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*:', url):
+            url = urljoin(base, url)
+
+        try:
+            parts = urlsplit(url)
+            port = parts.port
+        except ValueError:
+            return url
+        scheme = parts.scheme.lower()
+        if scheme not in _DEFAULT_PORTS:
+            return url
+
+        host = (parts.hostname or '').rstrip('.')
+        host = self.host_aliases.get(host, host)
+        # IP地址、localhost（本地模拟服务）和非标准端口保留原协议；80/443端口改为https后省略
+        local = host == 'localhost' or host.replace('.', '').isdigit() or ':' in host
+        if self.force_https and not local and port in (None, 443, _DEFAULT_PORTS[scheme]):
+            scheme = 'https'
+            port = None
+        if port and port != _DEFAULT_PORTS[scheme]:
+            host = f"{host}:{port}"
+
+        path = _MULTI_SLASH_RE.sub('/', parts.path) or '/'
+
+        query = ''
+        if parts.query:
+            rule = self.sites.get(host)
+            params = []
+            for name, value in parse_qsl(parts.query, keep_blank_values=True):
+                lowered = name.lower()
+                if rule is not None:
+                    if rule['keep'] is not None:
+                        if lowered in rule['keep']:
+                            params.append((name, value))
+                        continue
+                    if lowered in rule['strip']:
+                        continue
+                if not _is_tracking(name):
+                    params.append((name, value))
+            query = urlencode(sorted(params))
+
+        return urlunsplit((scheme, host, path, query, ''))
+
+
+_default_canonicalizer = None
+_default_mtime = None
+_default_lock = threading.Lock()
+
+
+def get_url_canonicalizer() -> UrlCanonicalizer:
+    """获取按当前config.yaml创建的规范化器（配置文件修改后重建）"""
+    global _default_canonicalizer, _default_mtime
+    try:
+        mtime = CONFIG_FILE.stat().st_mtime
+    except OSError:
+        mtime = None
+    with _default_lock:
+        if _default_canonicalizer is None or mtime != _default_mtime:
+            _default_canonicalizer = UrlCanonicalizer.from_config()
+            _default_mtime = mtime
+        return _default_canonicalizer
+
+
+def canonicalize_url(url: str, base: str = '') -> str:
+    """用默认规范化器规范化URL"""
+    return get_url_canonicalizer().canonicalize(url, base)